@@ -0,0 +1,152 @@
+"""Startup time of the DAG files as seen by the Airflow DAG processor.
+
+Every measurement runs in a fresh interpreter. For the DAG files, Airflow
+itself is imported before the clock starts, so the timing covers only
+the work the DAG file adds to a parse. For comparison, the eager work the
+DAG files used to do at import time (importing the pipeline modules and
+loading the config) is timed the same way, e.g.
+
+    python -m benchmarks.bench_dag_parse --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# modules a DAG parse should not have to import
+HEAVY_MODULES = (
+    "requests",
+    "pydantic",
+    "pydantic_settings",
+    "yaml",
+    "pyarrow",
+)
+
+# code timed in the child interpreter, keyed by measurement name
+SNIPPETS = {
+    "dags/dag.py": (
+        "import airflow.decorators",
+        "import runpy; runpy.run_path('dags/dag.py')",
+    ),
+    "dags/fused_dag.py": (
+        "import airflow.decorators",
+        "import runpy; runpy.run_path('dags/fused_dag.py')",
+    ),
+    "dags/backfill_dag.py": (
+        "import airflow.decorators",
+        "import runpy; runpy.run_path('dags/backfill_dag.py')",
+    ),
+    "dags/replay_dag.py": (
+        "import airflow.decorators",
+        "import runpy; runpy.run_path('dags/replay_dag.py')",
+    ),
+    "dags/sharded_dag.py": (
+        "import airflow.decorators",
+        "import runpy; runpy.run_path('dags/sharded_dag.py')",
+    ),
+    "eager config and imports": (
+        "pass",
+        "import etl_pipeline.cleanup, etl_pipeline.extract, "
+        "etl_pipeline.load, etl_pipeline.transform\n"
+        "from etl_pipeline.config import Config\n"
+        "Config.from_file('config.yaml')",
+    ),
+}
+
+CHILD = """
+import json, sys, time
+{setup}
+before = set(sys.modules)
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules and m not in before]
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def time_snippet(setup: str, code: str) -> dict:
+    """
+    Run a snippet in a fresh interpreter from the project root, with a
+    dummy API key in the environment so the config validates.
+
+    Args:
+        setup (str): Code run before the clock starts.
+        code (str): Code to time.
+
+    Raises:
+        subprocess.CalledProcessError: If the snippet fails.
+
+    Returns:
+        dict: Seconds taken and the heavy modules the snippet imported.
+    """
+    child = CHILD.format(setup=setup, code=code, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", child],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "API_KEY": "x" * 32},
+    )
+    return json.loads(out.stdout)
+
+
+def run_benchmarks(repeat: int) -> list[dict]:
+    """
+    Time every snippet `repeat` times.
+
+    Args:
+        repeat (int): Number of fresh interpreters per snippet.
+
+    Returns:
+        list[dict]: Median time and imported heavy modules per snippet.
+        Snippets that cannot run, e.g. DAG files without Airflow
+        installed, carry an `error` instead.
+    """
+    results = []
+    for name, (setup, code) in SNIPPETS.items():
+        try:
+            runs = [time_snippet(setup, code) for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.strip().splitlines()[-1]
+            results.append({"name": name, "error": error})
+            continue
+        results.append(
+            {
+                "name": name,
+                "repeat": repeat,
+                "median_ms": statistics.median(
+                    r["seconds"] * 1000 for r in runs
+                ),
+                "loaded": runs[0]["loaded"],
+            }
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for r in run_benchmarks(args.repeat):
+        if "error" in r:
+            print(f"{r['name']:<26} skipped: {r['error']}")
+        else:
+            loaded = ", ".join(r["loaded"]) or "-"
+            print(
+                f"{r['name']:<26} {r['median_ms']:9.2f} ms  "
+                f"heavy imports: {loaded}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Throughput and latency benchmarks of the pipeline stages.
+
+Runs every stage against a local OpenWeatherMap stub at several location
+counts and writes the timings as JSON, e.g.
+
+    python -m benchmarks.bench_pipeline --locations 1 100 10000
+    python -m benchmarks.bench_pipeline --baseline benchmarks/results/a.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from etl_pipeline.archive import RawArchive
+from etl_pipeline.backfill import run_backfill
+from etl_pipeline.columnar import ColumnarSinkWriter
+from etl_pipeline.config import Config, SecretsConfig, WriterConfig
+from etl_pipeline.extract import fetch_weather_batch, fetch_weather_data
+from etl_pipeline.load import append_weather_records, save_weather_data
+from etl_pipeline.pipeline import run_fused_pipeline
+from etl_pipeline.replay import run_replay
+from etl_pipeline.transform import (
+    format_weather_record,
+    process_weather_batch_data,
+    process_weather_data,
+)
+from pydantic import SecretStr
+
+from .stub_server import StubSettings, run_stub_server, weather_payload
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# archived copies of every payload replayed by the replay stages
+REPLAY_COPIES = 50
+
+
+def make_config(workdir: Path, base_url: str, count: int) -> Config:
+    """
+    Create a config for `count` distinct locations below `workdir`, with
+    the rate limiter opened up for the local stub.
+
+    Args:
+        workdir (Path): Directory for all files of the run.
+        base_url (str): Base URL of the stub server.
+        count (int): Number of locations.
+
+    Returns:
+        Config: The configuration.
+    """
+    return Config(
+        locations=[
+            {
+                "name": f"site-{i}",
+                "latitude": -60 + (i // 360) * 0.25,
+                "longitude": -180 + (i % 360),
+            }
+            for i in range(count)
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        fetch={
+            "base_url": base_url,
+            "max_concurrency": 32,
+            "requests_per_minute": 1e9,
+            "burst": 1_000_000,
+            "max_retries": 0,
+        },
+        raw_path=workdir / "raw" / "raw.json",
+        raw_batch_path=workdir / "raw" / "raw.jsonl",
+        processed_path=workdir / "processed" / "processed.csv",
+        sink_path=workdir / "data.csv",
+        columnar={"path": workdir / "columnar"},
+        sqlite={"path": workdir / "weather.sqlite"},
+        backfill={
+            "base_url": base_url,
+            "progress_path": workdir / "backfill" / "progress.json",
+        },
+    )
+
+
+def measure(
+    stage: str,
+    count: int,
+    repeat: int,
+    run: Callable[[Path], None],
+    setup: Callable[[Path], None] | None = None,
+    records: int | None = None,
+) -> dict:
+    """
+    Time a stage `repeat` times, each in a fresh working directory.
+
+    Args:
+        stage (str): Name of the stage.
+        count (int): Number of locations processed per run.
+        repeat (int): Number of timed runs.
+        run (Callable[[Path], None]): Runs the stage in a working
+        directory.
+        setup (Callable[[Path], None] | None): Prepares the working
+        directory, not timed.
+        records (int | None): Number of records processed per run, equal
+        to `count` if None.
+
+    Returns:
+        dict: Timing summary of the stage.
+    """
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            if setup is not None:
+                setup(workdir)
+            start = time.perf_counter()
+            run(workdir)
+            timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    if records is None:
+        records = count
+    return {
+        "stage": stage,
+        "locations": count,
+        "repeat": repeat,
+        "seconds": {
+            "min": min(timings),
+            "median": median,
+            "max": max(timings),
+        },
+        "records": records,
+        "records_per_second": records / median if median else None,
+        "ms_per_record": median / records * 1000,
+    }
+
+
+def bench_count(base_url: str, count: int, repeat: int) -> list[dict]:
+    """
+    Benchmark all stages at one location count.
+
+    Args:
+        base_url (str): Base URL of the stub server.
+        count (int): Number of locations.
+        repeat (int): Number of timed runs per stage.
+
+    Returns:
+        list[dict]: Timing summaries.
+    """
+    payloads = [
+        weather_payload(loc.latitude, loc.longitude, 1_700_000_000)
+        for loc in make_config(Path(), base_url, count).locations
+    ]
+
+    def config(workdir: Path) -> Config:
+        return make_config(workdir, base_url, count)
+
+    def write_raw_batch(workdir: Path) -> None:
+        path = config(workdir).raw_batch_path
+        path.parent.mkdir(parents=True)
+        path.write_text("".join(json.dumps(p) + "\n" for p in payloads))
+
+    def write_processed(workdir: Path) -> None:
+        path = config(workdir).processed_path
+        path.parent.mkdir(parents=True)
+        path.write_text("".join(format_weather_record(p) for p in payloads))
+
+    def fetch_single(workdir: Path) -> None:
+        cfg = config(workdir)
+        for loc in cfg.locations:
+            fetch_weather_data(cfg.model_copy(update={"locations": [loc]}))
+
+    def transform_single(workdir: Path) -> None:
+        cfg = config(workdir)
+        cfg.raw_path.parent.mkdir(parents=True)
+        for payload in payloads:
+            cfg.raw_path.write_text(json.dumps(payload))
+            process_weather_data(cfg)
+
+    def load_parquet(workdir: Path) -> None:
+        cfg = config(workdir)
+        save_weather_data(cfg.model_copy(update={"sink_backend": "parquet"}))
+
+    def load_sqlite(workdir: Path) -> None:
+        cfg = config(workdir)
+        save_weather_data(cfg.model_copy(update={"sink_backend": "sqlite"}))
+
+    def chain_staged(workdir: Path) -> None:
+        cfg = config(workdir)
+        fetch_weather_batch(cfg)
+        with ColumnarSinkWriter(cfg.columnar.path) as writer:
+            writer.append(process_weather_batch_data(cfg))
+
+    def chain_fused_parquet(workdir: Path) -> None:
+        cfg = config(workdir)
+        run_fused_pipeline(cfg.model_copy(update={"sink_backend": "parquet"}))
+
+    def append_fsync(batch_records: int) -> Callable[[Path], None]:
+        lines = [format_weather_record(p) for p in payloads]
+        writer = WriterConfig(durability="fsync", batch_records=batch_records)
+        return lambda w: append_weather_records(
+            config(w).sink_path, lines, writer=writer
+        )
+
+    def backfill_week(workdir: Path) -> None:
+        end = datetime(2024, 1, 8, tzinfo=UTC)
+        run_backfill(config(workdir), end - timedelta(days=7), end)
+
+    def write_archive(workdir: Path) -> None:
+        with RawArchive(workdir / "archive") as archive:
+            for i in range(REPLAY_COPIES):
+                archive.append(p | {"dt": p["dt"] + i} for p in payloads)
+
+    def replay(workers: int) -> Callable[[Path], None]:
+        def run(workdir: Path) -> None:
+            cfg = config(workdir)
+            run_replay(
+                cfg.model_copy(
+                    update={
+                        "replay": cfg.replay.model_copy(
+                            update={"workers": workers}
+                        )
+                    }
+                )
+            )
+
+        return run
+
+    return [
+        measure("fetch_weather_data", count, repeat, fetch_single),
+        measure(
+            "fetch_weather_batch",
+            count,
+            repeat,
+            lambda w: fetch_weather_batch(config(w)),
+        ),
+        measure("process_weather_data", count, repeat, transform_single),
+        measure(
+            "process_weather_batch_data",
+            count,
+            repeat,
+            lambda w: process_weather_batch_data(config(w)),
+            setup=write_raw_batch,
+        ),
+        measure(
+            "save_weather_data[csv]",
+            count,
+            repeat,
+            lambda w: save_weather_data(config(w)),
+            setup=write_processed,
+        ),
+        measure(
+            "save_weather_data[parquet]",
+            count,
+            repeat,
+            load_parquet,
+            setup=write_processed,
+        ),
+        measure(
+            "save_weather_data[sqlite]",
+            count,
+            repeat,
+            load_sqlite,
+            setup=write_processed,
+        ),
+        measure("append[fsync per line]", count, repeat, append_fsync(1)),
+        measure("append[fsync grouped]", count, repeat, append_fsync(1000)),
+        measure("chain[staged batch]", count, repeat, chain_staged),
+        measure(
+            "chain[fused csv]",
+            count,
+            repeat,
+            lambda w: run_fused_pipeline(config(w)),
+        ),
+        measure("chain[fused parquet]", count, repeat, chain_fused_parquet),
+        measure(
+            "run_backfill[7d]",
+            count,
+            repeat,
+            backfill_week,
+            records=count * 168,
+        ),
+        measure(
+            "replay[1 worker]",
+            count,
+            repeat,
+            replay(1),
+            setup=write_archive,
+            records=count * REPLAY_COPIES,
+        ),
+        measure(
+            "replay[all cores]",
+            count,
+            repeat,
+            replay(os.cpu_count() or 1),
+            setup=write_archive,
+            records=count * REPLAY_COPIES,
+        ),
+    ]
+
+
+def git_revision() -> str:
+    """Return the current git revision, or "unknown" outside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(
+    location_counts: list[int], repeat: int, settings: StubSettings
+) -> dict:
+    """
+    Run the benchmarks against a freshly started stub server.
+
+    Args:
+        location_counts (list[int]): Location counts to benchmark.
+        repeat (int): Number of timed runs per stage.
+        settings (StubSettings): Behaviour of the stub server.
+
+    Returns:
+        dict: Metadata and timing summaries.
+    """
+    results = []
+    with run_stub_server(settings) as server:
+        for count in location_counts:
+            results.extend(bench_count(server.base_url, count, repeat))
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub": vars(settings),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """
+    Compare median timings against a previous run.
+
+    Args:
+        current (dict): Result of `run_benchmarks`.
+        baseline (dict): A previously saved result.
+
+    Returns:
+        list[str]: One line per stage present in both runs, with the
+        ratio of current to baseline median time.
+    """
+    previous = {
+        (r["stage"], r["locations"]): r["seconds"]["median"]
+        for r in baseline["results"]
+    }
+    lines = []
+    for r in current["results"]:
+        before = previous.get((r["stage"], r["locations"]))
+        if before:
+            ratio = r["seconds"]["median"] / before
+            lines.append(f"{r['stage']:<30} {r['locations']:>6}  x{ratio:.2f}")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locations", type=int, nargs="+", default=[1, 100, 10_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-size", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.locations,
+        args.repeat,
+        StubSettings(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            payload_size=args.payload_size,
+        ),
+    )
+
+    # save the results
+    output = args.output or RESULTS_DIR / (
+        f"bench-{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    # print a summary
+    for r in report["results"]:
+        print(
+            f"{r['stage']:<30} {r['locations']:>6}  "
+            f"{r['seconds']['median']:9.4f}s  "
+            f"{r['records_per_second'] or 0:12.1f} rec/s"
+        )
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            print("\n".join(compare(report, json.load(f))))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
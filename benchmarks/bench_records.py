@@ -0,0 +1,160 @@
+"""Memory held per weather record by the in-memory batch representations.
+
+Every representation is built from freshly decoded payloads, which are
+dropped afterwards, so the measurement covers what stays resident after
+the transform, strings included, e.g.
+
+    python -m benchmarks.bench_records --locations 10000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from collections.abc import Callable
+
+import pyarrow as pa
+from etl_pipeline.records import WeatherBatch
+from etl_pipeline.schema import DEFAULT_SCHEMA
+from etl_pipeline.transform import process_weather_batch
+
+# descriptions cycled through the generated payloads
+DESCRIPTIONS = ("clear sky", "few clouds", "light rain", "overcast clouds")
+
+
+def payload_lines(count: int, hours: int) -> list[str]:
+    """
+    Generate JSON payloads of `count` locations observed over `hours`.
+
+    Args:
+        count (int): Number of locations.
+        hours (int): Number of hourly observations per location.
+
+    Returns:
+        list[str]: One JSON document per record.
+    """
+    return [
+        json.dumps(
+            {
+                "name": f"Station {i:05d}",
+                "dt": 1_700_000_000 + hour * 3600,
+                "weather": [{"description": DESCRIPTIONS[(i + hour) % 4]}],
+                "main": {
+                    "temp": 20.0 + i % 10,
+                    "humidity": 50,
+                    "pressure": 1012,
+                },
+                "clouds": {"all": 40},
+                "wind": {"speed": 5.5},
+            }
+        )
+        for i in range(count)
+        for hour in range(hours)
+    ]
+
+
+def as_dicts(payloads: list[dict]) -> list[dict]:
+    """Hold every record as a dict of its fields."""
+    names = DEFAULT_SCHEMA.names
+    extract = DEFAULT_SCHEMA.extract
+    return [dict(zip(names, extract(p), strict=True)) for p in payloads]
+
+
+def as_records(payloads: list[dict]) -> list:
+    """Hold every record as a `__slots__` record."""
+    record = DEFAULT_SCHEMA.record
+    extract = DEFAULT_SCHEMA.extract
+    return [record(*extract(p)) for p in payloads]
+
+
+def as_lines(payloads: list[dict]) -> list[str]:
+    """Hold every record as its CSV line."""
+    return [DEFAULT_SCHEMA.format_line(p) for p in payloads]
+
+
+# representations measured, keyed by name
+REPRESENTATIONS: dict[str, Callable[[list[dict]], object]] = {
+    "dict per record": as_dicts,
+    "slots record": as_records,
+    "csv line": as_lines,
+    "WeatherBatch": WeatherBatch.from_payloads,
+    "arrow table": process_weather_batch,
+}
+
+
+def resident_bytes(
+    lines: list[str], build: Callable[[list[dict]], object]
+) -> int:
+    """
+    Measure the memory a representation keeps after the payloads it was
+    built from are dropped.
+
+    Args:
+        lines (list[str]): JSON payloads.
+        build (Callable[[list[dict]], object]): Builds the representation.
+
+    Returns:
+        int: Bytes allocated through Python or the Arrow memory pool and
+        still held.
+    """
+    gc.collect()
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    try:
+        payloads = [json.loads(line) for line in lines]
+        held = build(payloads)
+        del payloads
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        size += pa.total_allocated_bytes() - arrow_before
+    finally:
+        tracemalloc.stop()
+    del held
+    return size
+
+
+def run_benchmarks(count: int, hours: int) -> list[dict]:
+    """
+    Measure every representation for the same records.
+
+    Args:
+        count (int): Number of locations.
+        hours (int): Number of hourly observations per location.
+
+    Returns:
+        list[dict]: Resident bytes in total and per record for each
+        representation.
+    """
+    lines = payload_lines(count, hours)
+    results = []
+    for name, build in REPRESENTATIONS.items():
+        size = resident_bytes(lines, build)
+        results.append(
+            {
+                "name": name,
+                "records": len(lines),
+                "bytes": size,
+                "bytes_per_record": size / len(lines),
+            }
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--hours", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.locations, args.hours)
+    baseline = results[0]["bytes_per_record"]
+    for r in results:
+        print(
+            f"{r['name']:<16} {r['bytes_per_record']:9.1f} B/record  "
+            f"{r['bytes_per_record'] / baseline:6.1%} of dicts"
+        )
+
+
+if __name__ == "__main__":
+    main()
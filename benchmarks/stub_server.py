@@ -0,0 +1,227 @@
+import json
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StubSettings:
+    """Behaviour of the OpenWeatherMap stub server.
+
+    Attributes:
+        latency (float): Delay before every response in seconds.
+        error_rate (float): Fraction of requests answered with a 503.
+        payload_size (int): Minimum size of a response body in bytes,
+            reached by padding the payload.
+        update_interval (int): Seconds between two upstream observations,
+            `dt` is the current time rounded down to it.
+    """
+
+    latency: float = 0.0
+    error_rate: float = 0.0
+    payload_size: int = 0
+    update_interval: int = 600
+
+
+def weather_payload(
+    lat: float, lon: float, dt: int, payload_size: int = 0
+) -> dict:
+    """
+    Build a response in the shape of the `/data/2.5/weather` endpoint.
+
+    Args:
+        lat (float): Latitude of the request.
+        lon (float): Longitude of the request.
+        dt (int): Observation time in Unix seconds.
+        payload_size (int): Minimum size of the encoded payload in bytes.
+
+    Returns:
+        dict: The payload.
+    """
+    # derive stable but varying values from the coordinates and time
+    seed = hash((round(lat, 4), round(lon, 4), dt)) & 0xFFFF
+    payload = {
+        "coord": {"lon": lon, "lat": lat},
+        "weather": [
+            {
+                "id": 800,
+                "main": "Clear",
+                "description": "clear sky",
+                "icon": "01d",
+            }
+        ],
+        "base": "stations",
+        "main": {
+            "temp": round(-10 + seed % 400 / 10, 2),
+            "feels_like": round(-12 + seed % 400 / 10, 2),
+            "pressure": 980 + seed % 60,
+            "humidity": seed % 101,
+        },
+        "visibility": 10000,
+        "wind": {"speed": round(seed % 150 / 10, 1), "deg": seed % 360},
+        "clouds": {"all": seed % 101},
+        "dt": dt,
+        "timezone": 0,
+        "id": seed,
+        "name": f"Station {lat:.4f},{lon:.4f}",
+        "cod": 200,
+    }
+
+    # pad the payload to the requested size
+    missing = payload_size - len(json.dumps(payload))
+    if missing > 0:
+        payload["padding"] = "x" * missing
+    return payload
+
+
+# fields of a current weather payload that history observations carry
+HISTORY_FIELDS = ("dt", "main", "wind", "clouds", "weather", "padding")
+
+
+def history_payload(
+    lat: float, lon: float, start: int, end: int, payload_size: int = 0
+) -> dict:
+    """
+    Build a response in the shape of the `/data/2.5/history/city`
+    endpoint with one observation per full hour in [start, end).
+
+    Args:
+        lat (float): Latitude of the request.
+        lon (float): Longitude of the request.
+        start (int): Start of the range in Unix seconds.
+        end (int): End of the range in Unix seconds.
+        payload_size (int): Minimum size of every observation in bytes.
+
+    Returns:
+        dict: The payload.
+    """
+    first = -(-start // 3600) * 3600
+    observations = []
+    for dt in range(first, end, 3600):
+        payload = weather_payload(lat, lon, dt, payload_size)
+        observations.append(
+            {k: v for k, v in payload.items() if k in HISTORY_FIELDS}
+        )
+    return {
+        "message": "",
+        "cod": "200",
+        "city_id": 0,
+        "calctime": 0.01,
+        "cnt": len(observations),
+        "list": observations,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler imitating the OpenWeatherMap weather and history
+    endpoints."""
+
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        settings = self.server.settings
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.count_request()
+
+        if settings.latency:
+            time.sleep(settings.latency)
+
+        # route the request
+        if url.path not in ("/data/2.5/weather", "/data/2.5/history/city"):
+            self.respond(404, {"cod": 404, "message": "not found"})
+        elif random.random() < settings.error_rate:
+            self.respond(503, {"cod": 503, "message": "unavailable"})
+        elif url.path == "/data/2.5/history/city":
+            self.respond(
+                200,
+                history_payload(
+                    float(query["lat"][0]),
+                    float(query["lon"][0]),
+                    int(query["start"][0]),
+                    int(query["end"][0]),
+                    settings.payload_size,
+                ),
+            )
+        else:
+            dt = int(time.time()) // settings.update_interval
+            self.respond(
+                200,
+                weather_payload(
+                    float(query["lat"][0]),
+                    float(query["lon"][0]),
+                    dt * settings.update_interval,
+                    settings.payload_size,
+                ),
+            )
+
+    def respond(self, status: int, payload: dict) -> None:
+        """Send a JSON response with a Content-Length for keep-alive."""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Keep benchmark and test output quiet."""
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub settings and a request count.
+
+    Attributes:
+        settings (StubSettings): Behaviour of the stub.
+        requests (int): Number of requests received.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: tuple[str, int], settings: StubSettings):
+        super().__init__(address, StubHandler)
+        self.settings = settings
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        """Increment the request counter."""
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to put into FetchConfig.base_url."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+@contextmanager
+def run_stub_server(
+    settings: StubSettings | None = None,
+) -> Iterator[StubServer]:
+    """
+    Run the stub server on a free local port in a background thread.
+
+    Args:
+        settings (StubSettings | None): Behaviour of the stub.
+
+    Yields:
+        StubServer: The running server.
+    """
+    server = StubServer(("127.0.0.1", 0), settings or StubSettings())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from airflow.decorators import dag, task
+from airflow.sdk import Param
+
+# path to the configuration file, loaded when the task runs
+CONFIG_PATH = Path("./config.yaml")
+
+
+@dag(
+    dag_id="weather_backfill",
+    schedule=None,
+    catchup=False,
+    params={
+        "start": Param(type="string", format="date"),
+        "end": Param(type="string", format="date"),
+        "locations": Param(default=[], type="array"),
+    },
+)
+def backfill_weather():
+    """
+    DAG to load the hourly weather history of a date range.
+
+    Triggered manually with a `start` and `end` date (end exclusive) and
+    optionally the names of the configured locations to backfill. Runs
+    with the same range resume where an earlier run stopped.
+    """
+
+    @task()
+    def backfill(params: dict) -> dict:
+        """
+        Fetches the history of the requested range in parallel chunks and
+        writes it into the configured sink.
+
+        Args:
+            params (dict): DAG run parameters `start`, `end` and
+            `locations`.
+
+        Returns:
+            dict: Number of records and chunks written, and failed chunks.
+        """
+        from dataclasses import asdict
+        from datetime import UTC, date, datetime, time
+
+        from etl_pipeline.backfill import run_backfill
+        from etl_pipeline.config import load_config
+
+        config = load_config(CONFIG_PATH)
+        locations = [
+            location
+            for location in config.locations
+            if not params["locations"] or location.key in params["locations"]
+        ]
+        start, end = (
+            datetime.combine(date.fromisoformat(params[key]), time(), UTC)
+            for key in ("start", "end")
+        )
+        return asdict(run_backfill(config, start, end, locations))
+
+    backfill()
+
+
+dag = backfill_weather()
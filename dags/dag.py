@@ -1,87 +1,147 @@
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from airflow.decorators import dag, task
-from etl_pipeline.cleanup import cleanup_weather_files
-from etl_pipeline.config import Config
-from etl_pipeline.extract import fetch_weather_data
-from etl_pipeline.load import save_weather_data
-from etl_pipeline.transform import process_weather_data
 
-# fetch parameters from configuration file
+if TYPE_CHECKING:
+    from etl_pipeline.config import Config
+
+# path to the configuration file; it is loaded when a task runs, not when
+# the scheduler parses this file, and the pipeline modules are imported
+# inside the tasks for the same reason
 CONFIG_PATH = Path("./config.yaml")
-config = Config.from_file(path=CONFIG_PATH)
+
+
+def push_metrics(stage: str) -> None:
+    """
+    Push the metrics of a stage to XCom under the key "metrics", if the
+    stage recorded any.
+
+    Args:
+        stage (str): Name of the stage.
+    """
+    from airflow.sdk import get_current_context
+    from etl_pipeline.metrics import REGISTRY
+
+    if stage in REGISTRY:
+        get_current_context()["ti"].xcom_push(
+            key="metrics", value=REGISTRY.pop(stage).to_dict()
+        )
+
+
+def load_run_config() -> "Config":
+    """
+    Load the configuration with the working files of the current run in
+    its own directory, so overlapping runs do not share them.
+
+    Returns:
+        Config: The configuration of the current run.
+    """
+    from airflow.sdk import get_current_context
+    from etl_pipeline.config import load_config
+    from etl_pipeline.runs import run_config
+
+    return run_config(
+        load_config(CONFIG_PATH), get_current_context()["run_id"]
+    )
 
 
 @dag(dag_id="weather_etl", schedule="*/5 * * * *", catchup=False)
 def process_weather():
     """
     DAG to perform ETL operations for weather data.
+
+    Every run works in its own directory below `runs_dir` and loads into
+    the sink under its lock, so a run that overlaps the next one is safe.
     """
 
-    @task()
-    def extract(config: Config) -> None:
+    @task.short_circuit()
+    def extract() -> bool:
         """
         Extracts weather data from OpenWeatherMap API and saves it to
-        a raw file.
-
-        Args:
-            config (Config): Configuration object containing API key
-            and coordinates.
+        a raw file. Skips the downstream tasks if the observation did not
+        change since the last run. The observation time is pushed to XCom
+        under the key "observed", for the load to commit.
 
         Returns:
-            None: Writes the weather data to a JSON file.
+            bool: False if the observation is unchanged. Writes new
+            weather data to a JSON file.
         """
-        fetch_weather_data(config=config)
+        from airflow.sdk import get_current_context
+        from etl_pipeline.extract import FetchResult, fetch_weather_data
+
+        report = FetchResult()
+        changed = fetch_weather_data(config=load_run_config(), report=report)
+        get_current_context()["ti"].xcom_push(
+            key="observed", value=report.observed
+        )
+        push_metrics("extract")
+        return changed
 
     @task()
-    def transform(config: Config) -> None:
+    def transform() -> None:
         """
         Processes the raw weather data and saves it to a new file.
 
-        Args:
-            config (Config): Configuration object containing paths
-            for raw and processed data.
-
         Returns:
             None: Writes the processed weather data line to a CSV file.
         """
-        process_weather_data(config=config)
+        from etl_pipeline.transform import process_weather_data
+
+        process_weather_data(config=load_run_config())
+        push_metrics("transform")
 
     @task()
-    def load(config: Config) -> None:
+    def validate() -> None:
+        """
+        Checks the processed weather data and moves rejected records to
+        the quarantine file.
+
+        Returns:
+            None: Rewrites the processed file with the valid records.
         """
-        Saves the processed weather data to a specified sink path.
+        from etl_pipeline.validate import validate_weather_data
 
-        Args:
-            config (Config): Configuration object containing paths
-            for processed data and sink.
+        validate_weather_data(config=load_run_config())
+        push_metrics("validate")
+
+    @task()
+    def load() -> None:
+        """
+        Saves the processed weather data to a specified sink path and
+        marks the observation fetched by this run as seen in the response
+        cache, leaving those of other runs pending.
 
         Returns:
             None: Appends the processed data to the sink file.
         """
+        from airflow.sdk import get_current_context
+        from etl_pipeline.cache import commit_observations
+        from etl_pipeline.load import save_weather_data
+
+        config = load_run_config()
         save_weather_data(config=config)
+        observed = get_current_context()["ti"].xcom_pull(
+            task_ids="extract", key="observed"
+        )
+        commit_observations(config.cache, observed or {})
+        push_metrics("load")
 
     @task()
-    def cleanup(config: Config) -> None:
+    def cleanup() -> None:
         """
         Cleans up the weather data files by removing the raw and
         processed files.
 
-        Args:
-            config (Config): Configuration object containing paths
-            for raw and processed data.
-
         Returns:
             None: Deletes the raw and processed weather data files.
         """
-        cleanup_weather_files(config=config)
+        from etl_pipeline.cleanup import cleanup_weather_files
 
-    (
-        extract(config=config)
-        >> transform(config=config)
-        >> load(config=config)
-        >> cleanup(config=config)
-    )
+        cleanup_weather_files(config=load_run_config())
+        push_metrics("cleanup")
+
+    extract() >> transform() >> validate() >> load() >> cleanup()
 
 
 dag = process_weather()
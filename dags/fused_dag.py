@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from airflow.decorators import dag, task
+
+# path to the configuration file, loaded when the task runs
+CONFIG_PATH = Path("./config.yaml")
+
+
+@dag(
+    dag_id="weather_etl_fused",
+    schedule="*/5 * * * *",
+    catchup=False,
+    is_paused_upon_creation=True,
+)
+def process_weather_fused():
+    """
+    DAG to perform ETL operations for weather data in a single task.
+
+    Runs the same stages as `weather_etl` in memory without intermediate
+    files. It starts paused; unpause it and pause `weather_etl` to switch
+    over, and keep `weather_etl` around for debugging the staged files.
+    """
+
+    @task()
+    def run() -> dict[str, str]:
+        """
+        Fetches, processes and saves the weather data of all locations
+        in one pass.
+
+        Returns:
+            dict[str, str]: Error messages of failed locations.
+        """
+        from airflow.sdk import get_current_context
+        from etl_pipeline.config import load_config
+        from etl_pipeline.metrics import REGISTRY
+        from etl_pipeline.pipeline import run_fused_pipeline
+
+        result = run_fused_pipeline(config=load_config(CONFIG_PATH))
+
+        # expose the stage metrics next to the return value
+        if "fused" in REGISTRY:
+            get_current_context()["ti"].xcom_push(
+                key="metrics", value=REGISTRY.pop("fused").to_dict()
+            )
+        return result.failures
+
+    run()
+
+
+dag = process_weather_fused()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from airflow.decorators import dag, task
+from airflow.sdk import Param
+
+# path to the configuration file, loaded when the task runs
+CONFIG_PATH = Path("./config.yaml")
+
+
+@dag(
+    dag_id="weather_replay",
+    schedule=None,
+    catchup=False,
+    params={
+        "target": Param(default="sink", enum=["sink", "processed"]),
+        "since": Param(default=None, type=["null", "string"], format="date"),
+        "until": Param(default=None, type=["null", "string"], format="date"),
+    },
+)
+def replay_weather():
+    """
+    DAG to re-run the transform over the archived raw responses.
+
+    Triggered manually after a fix to the transform. With the `sink`
+    target the sink and its indexes are rebuilt from the whole archive;
+    with the `processed` target the responses archived between `since`
+    and `until` (until exclusive) are written to the processed file.
+    """
+
+    @task()
+    def replay(params: dict) -> dict:
+        """
+        Transforms the archive in a process pool and swaps the rebuilt
+        output in.
+
+        Args:
+            params (dict): DAG run parameters `target`, `since` and
+            `until`.
+
+        Returns:
+            dict: Number of responses read, records written and responses
+            skipped.
+        """
+        from dataclasses import asdict
+        from datetime import UTC, date, datetime, time
+
+        from etl_pipeline.config import load_config
+        from etl_pipeline.replay import run_replay
+
+        config = load_config(CONFIG_PATH)
+        since, until = (
+            datetime.combine(date.fromisoformat(params[key]), time(), UTC)
+            if params[key]
+            else None
+            for key in ("since", "until")
+        )
+        return asdict(run_replay(config, params["target"], since, until))
+
+    replay()
+
+
+dag = replay_weather()
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from airflow.decorators import dag, task
+
+# path to the configuration file, loaded when the task runs
+CONFIG_PATH = Path("./config.yaml")
+
+
+@dag(dag_id="weather_retention", schedule="@hourly", catchup=False)
+def retain_weather_files():
+    """
+    DAG to remove working files that exceed the retention budgets.
+
+    Sweeps the directories of `retention.paths`, e.g. files of failed or
+    abandoned runs that their cleanup task never removed.
+    """
+
+    @task()
+    def sweep() -> dict:
+        """
+        Removes the oldest working files beyond the age, size and count
+        budgets.
+
+        Returns:
+            dict: Number of files scanned and removed, bytes reclaimed
+            and paths that could not be removed.
+        """
+        from dataclasses import asdict
+
+        from etl_pipeline.config import load_config
+        from etl_pipeline.retention import apply_retention
+
+        return asdict(apply_retention(load_config(CONFIG_PATH)))
+
+    sweep()
+
+
+dag = retain_weather_files()
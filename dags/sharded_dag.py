@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from airflow.decorators import dag, task
+
+# path to the configuration file, loaded when the task runs
+CONFIG_PATH = Path("./config.yaml")
+
+
+@dag(
+    dag_id="weather_etl_sharded",
+    schedule="*/5 * * * *",
+    catchup=False,
+    max_active_runs=1,
+    is_paused_upon_creation=True,
+)
+def process_weather_sharded():
+    """
+    DAG to perform ETL operations for weather data split into shards.
+
+    The locations are split into `shards.count` shards by a stable hash.
+    Every shard is fetched and transformed by its own mapped task in its
+    own working directory, so shards run in parallel on as many worker
+    slots as are free. A final task merges the shard outputs into the
+    sink. Only one run is active at a time, as runs share the shard
+    directories.
+    """
+
+    @task()
+    def plan() -> list[int]:
+        """
+        Lists the shards that have at least one location.
+
+        Returns:
+            list[int]: Numbers of the shards to run.
+        """
+        from etl_pipeline.config import load_config
+        from etl_pipeline.shards import plan_shards
+
+        return plan_shards(load_config(CONFIG_PATH))
+
+    @task()
+    def process_shard(shard: int) -> dict:
+        """
+        Fetches and transforms the locations of one shard.
+
+        Args:
+            shard (int): Number of the shard.
+
+        Returns:
+            dict: Number of records, failed and unchanged locations.
+        """
+        from dataclasses import asdict
+
+        from etl_pipeline.config import load_config
+        from etl_pipeline.shards import run_shard
+
+        return asdict(run_shard(load_config(CONFIG_PATH), shard))
+
+    @task(trigger_rule="all_done")
+    def merge(shards: list[int]) -> int:
+        """
+        Loads the outputs of all finished shards into the sink, also if
+        some shards failed.
+
+        Args:
+            shards (list[int]): Numbers of the shards.
+
+        Returns:
+            int: Number of records merged.
+        """
+        from etl_pipeline.config import load_config
+        from etl_pipeline.shards import merge_shards
+
+        return merge_shards(load_config(CONFIG_PATH), shards)
+
+    shards = plan()
+    process_shard.expand(shard=shards) >> merge(shards)
+
+
+dag = process_weather_sharded()
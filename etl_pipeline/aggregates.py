@@ -0,0 +1,270 @@
+import math
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .config import Config
+
+# length of the aggregation periods in seconds
+PERIODS = {"hour": 3600, "day": 86400}
+
+# weather columns that are aggregated
+AGGREGATED_COLUMNS = ("temp", "humidity", "pressure", "wind_speed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS aggregates (
+    location TEXT NOT NULL,
+    period TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    sumsq REAL NOT NULL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (location, period, start, metric)
+) WITHOUT ROWID
+"""
+
+# merge a partial aggregate into the stored one
+UPSERT = """
+INSERT INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (location, period, start, metric) DO UPDATE SET
+    count = count + excluded.count,
+    sum = sum + excluded.sum,
+    sumsq = sumsq + excluded.sumsq,
+    min = min(min, excluded.min),
+    max = max(max, excluded.max)
+"""
+
+
+@dataclass
+class Aggregate:
+    """Mergeable summary of the values of one metric in one period.
+
+    Attributes:
+        count (int): Number of values.
+        sum (float): Sum of the values.
+        sumsq (float): Sum of the squared values.
+        min (float | None): Smallest value.
+        max (float | None): Largest value.
+    """
+
+    count: int = 0
+    sum: float = 0.0
+    sumsq: float = 0.0
+    min: float | None = None
+    max: float | None = None
+
+    @property
+    def mean(self) -> float | None:
+        """Mean of the values, None if there are none."""
+        return self.sum / self.count if self.count else None
+
+    @property
+    def std(self) -> float | None:
+        """Population standard deviation, None if there are no values."""
+        if not self.count:
+            return None
+        variance = self.sumsq / self.count - self.mean**2
+        return math.sqrt(max(variance, 0.0))
+
+    def merge(self, other: "Aggregate") -> "Aggregate":
+        """
+        Combine two aggregates, e.g. the hours of a custom range.
+
+        Args:
+            other (Aggregate): Aggregate of other values.
+
+        Returns:
+            Aggregate: Aggregate of the values of both.
+        """
+        return Aggregate(
+            count=self.count + other.count,
+            sum=self.sum + other.sum,
+            sumsq=self.sumsq + other.sumsq,
+            min=min(
+                (v for v in (self.min, other.min) if v is not None),
+                default=None,
+            ),
+            max=max(
+                (v for v in (self.max, other.max) if v is not None),
+                default=None,
+            ),
+        )
+
+
+def summarize(table: pa.Table | pa.RecordBatch) -> list[tuple]:
+    """
+    Compute the partial aggregates of a batch of weather records.
+
+    Args:
+        table (pa.Table | pa.RecordBatch): Weather records; aggregated
+        columns missing from the configured fields are skipped.
+
+    Returns:
+        list[tuple]: Rows of (location, period, start, metric, count, sum,
+        sumsq, min, max) for every period and metric with values.
+    """
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    dt = pc.cast(table.column("dt"), pa.int64())
+    metrics = [n for n in AGGREGATED_COLUMNS if n in table.column_names]
+    values = {
+        name: pc.cast(table.column(name), pa.float64()) for name in metrics
+    }
+
+    rows = []
+    for period, seconds in PERIODS.items():
+        # group by location and the start of the period
+        start = pc.multiply(pc.divide(dt, seconds), seconds)
+        columns = {"location": table.column("location"), "start": start}
+        for name, column in values.items():
+            columns[name] = column
+            columns[f"{name}_sq"] = pc.multiply(column, column)
+        grouped = (
+            pa.table(columns)
+            .group_by(["location", "start"])
+            .aggregate(
+                [
+                    (name, fn)
+                    for name in metrics
+                    for fn in ("count", "sum", "min", "max")
+                ]
+                + [(f"{name}_sq", "sum") for name in metrics]
+            )
+            .to_pydict()
+        )
+        for i, location in enumerate(grouped["location"]):
+            for name in metrics:
+                if not grouped[f"{name}_count"][i]:
+                    continue
+                rows.append(
+                    (
+                        location,
+                        period,
+                        grouped["start"][i],
+                        name,
+                        grouped[f"{name}_count"][i],
+                        grouped[f"{name}_sum"][i],
+                        grouped[f"{name}_sq_sum"][i],
+                        grouped[f"{name}_min"][i],
+                        grouped[f"{name}_max"][i],
+                    )
+                )
+    return rows
+
+
+class AggregateStore:
+    """SQLite store of hourly and daily aggregates per location.
+
+    Every (location, period, start, metric) holds one mergeable
+    Aggregate, so new records are folded in without rereading the sink
+    and a lookup is a single primary key read. Use it as a context
+    manager to close the database.
+
+    Attributes:
+        path (Path): Path to the SQLite database.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(SCHEMA)
+
+    def __enter__(self) -> "AggregateStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def update(self, table: pa.Table | pa.RecordBatch) -> int:
+        """
+        Fold a batch of newly loaded records into the aggregates.
+
+        Args:
+            table (pa.Table | pa.RecordBatch): Records with the
+            WEATHER_SCHEMA columns.
+
+        Returns:
+            int: Number of aggregates touched.
+        """
+        rows = summarize(table)
+        with self._db:
+            self._db.executemany(UPSERT, rows)
+        return len(rows)
+
+    def get(
+        self, location: str, period: str, at: datetime, metric: str
+    ) -> Aggregate | None:
+        """
+        Read the aggregate of the period containing a point in time.
+
+        Args:
+            location (str): Location of the records.
+            period (str): "hour" or "day".
+            at (datetime): Any time within the period.
+            metric (str): One of AGGREGATED_COLUMNS.
+
+        Returns:
+            Aggregate | None: The aggregate, None if no values were
+            loaded for the period.
+        """
+        seconds = PERIODS[period]
+        start = int(at.timestamp()) // seconds * seconds
+        row = self._db.execute(
+            "SELECT count, sum, sumsq, min, max FROM aggregates "
+            "WHERE location = ? AND period = ? AND start = ? AND metric = ?",
+            (location, period, start, metric),
+        ).fetchone()
+        return Aggregate(*row) if row is not None else None
+
+
+def update_aggregates(config: Config, table: pa.Table) -> None:
+    """
+    Fold loaded records into the aggregate store if one is configured.
+
+    Args:
+        config (Config): Configuration object containing the aggregates
+        path.
+        table (pa.Table): The records written to the sink.
+    """
+    if config.aggregates_path is None or not table.num_rows:
+        return
+    with AggregateStore(config.aggregates_path) as store:
+        store.update(table)
+
+
+def rebuild_aggregates(
+    path: Path, tables: Iterable[pa.Table | pa.RecordBatch]
+) -> int:
+    """
+    Rebuild the store from all records of a sink, e.g.
+    `[columnar.read_weather_csv(sink_path)]` or the batches of
+    `columnar.open_weather_dataset(root)`.
+
+    Args:
+        path (Path): Path to the SQLite database, replaced entirely.
+        tables (Iterable[pa.Table | pa.RecordBatch]): All records of the
+        sink.
+
+    Returns:
+        int: Number of records aggregated.
+    """
+    path.unlink(missing_ok=True)
+    records = 0
+    with AggregateStore(path) as store:
+        for table in tables:
+            store.update(table)
+            records += table.num_rows
+    return records
@@ -0,0 +1,300 @@
+import gzip
+import json
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from .config import ArchiveConfig, Config
+from .writer import append_bytes, file_lock, truncate_torn_tail
+
+# name of the offset index inside the archive directory
+INDEX_NAME = "index.csv"
+
+# name of the lock file serializing appends of several processes
+LOCK_NAME = "archive.lock"
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """One compressed group of raw responses within a segment.
+
+    Attributes:
+        segment (str): File name of the segment.
+        offset (int): Byte offset of the group in the segment.
+        length (int): Compressed size of the group in bytes.
+        records (int): Number of responses in the group.
+        archived_at (int): Unix time the group was archived at.
+    """
+
+    segment: str
+    offset: int
+    length: int
+    records: int
+    archived_at: int
+
+    def to_line(self) -> str:
+        """Format the entry as a line of the index."""
+        return (
+            f"{self.segment};{self.offset};{self.length};"
+            f"{self.records};{self.archived_at}\n"
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> "ArchiveEntry":
+        """Parse a line of the index."""
+        segment, offset, length, records, archived_at = line.split(";")
+        return cls(
+            segment, int(offset), int(length), int(records), int(archived_at)
+        )
+
+
+def segment_created(segment: str) -> int:
+    """Return the Unix time a segment was started at from its name."""
+    return int(segment.split("-")[1])
+
+
+def read_entry(path: Path, entry: ArchiveEntry) -> Iterator[dict]:
+    """
+    Decompress the responses of one index entry.
+
+    Only the byte range of the entry is read, so this is safe to call from
+    other processes without opening the archive.
+
+    Args:
+        path (Path): Directory of the archive.
+        entry (ArchiveEntry): Entry of the index.
+
+    Yields:
+        dict: The archived responses in their original order.
+    """
+    with open(path / entry.segment, "rb") as f:
+        f.seek(entry.offset)
+        data = gzip.decompress(f.read(entry.length))
+    for line in data.splitlines():
+        yield json.loads(line)
+
+
+def archive_dir(config: Config) -> Path:
+    """
+    Return the directory of the raw archive.
+
+    Args:
+        config (Config): Configuration object containing the archive
+        settings and the sink path.
+
+    Returns:
+        Path: The configured directory, or `archive` next to the sink.
+    """
+    return config.archive.path or config.sink_path.parent / "archive"
+
+
+class RawArchive:
+    """Append-only archive of raw API responses.
+
+    Responses are stored as gzip-compressed JSONL in segment files. Each
+    group of responses is compressed into its own gzip member and its
+    byte range recorded in the index, so any group can be read back
+    without decompressing the rest of its segment. A new segment is
+    started once the current one reaches `segment_bytes` bytes or is
+    older than `segment_age` seconds.
+
+    A group is appended to its segment before its index line is written,
+    so a crash in between leaves unreferenced bytes that are never read;
+    a torn index line is removed on open. Appends hold a lock on the
+    archive, so several processes can append at once. Use it as a context
+    manager to flush buffered responses on exit.
+
+    Attributes:
+        path (Path): Directory of the archive.
+        config (ArchiveConfig): Segment and compression settings.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        config: ArchiveConfig | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.config = config or ArchiveConfig()
+        self._clock = clock
+        self._buffer: list[bytes] = []
+
+        path.mkdir(parents=True, exist_ok=True)
+        self.index_path = path / INDEX_NAME
+        self.lock_path = path / LOCK_NAME
+        with file_lock(self.lock_path):
+            truncate_torn_tail(self.index_path)
+            self._entries: list[ArchiveEntry] = []
+            if self.index_path.exists():
+                with open(self.index_path) as f:
+                    self._entries = [
+                        ArchiveEntry.from_line(line) for line in f
+                    ]
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RawArchive":
+        """
+        Open the archive configured in a pipeline config.
+
+        Args:
+            config (Config): Configuration object containing the archive
+            settings.
+
+        Returns:
+            RawArchive: The opened archive.
+        """
+        return cls(archive_dir(config), config.archive)
+
+    def __enter__(self) -> "RawArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def entries(self) -> list[ArchiveEntry]:
+        """Return the index entries in the order they were archived."""
+        return list(self._entries)
+
+    def write(self, payload: dict) -> None:
+        """
+        Buffer a response and flush once `batch_records` are buffered.
+
+        Args:
+            payload (dict): Raw response of the OpenWeatherMap API.
+        """
+        self._buffer.append(json.dumps(payload).encode() + b"\n")
+        if len(self._buffer) >= self.config.batch_records:
+            self.flush()
+
+    def append(self, payloads: Iterable[dict]) -> ArchiveEntry | None:
+        """
+        Archive responses together with the buffered ones as one group.
+
+        Args:
+            payloads (Iterable[dict]): Raw responses of the API.
+
+        Returns:
+            ArchiveEntry | None: The new entry, None if there was nothing
+            to archive.
+        """
+        self._buffer.extend(
+            json.dumps(payload).encode() + b"\n" for payload in payloads
+        )
+        return self.flush()
+
+    def flush(self) -> ArchiveEntry | None:
+        """
+        Compress the buffered responses and append them to the archive.
+
+        Returns:
+            ArchiveEntry | None: The new entry, None if nothing was
+            buffered.
+        """
+        if not self._buffer:
+            return None
+        member = gzip.compress(
+            b"".join(self._buffer),
+            compresslevel=self.config.compresslevel,
+            mtime=0,
+        )
+        records = len(self._buffer)
+        self._buffer.clear()
+
+        # append the group, then record it in the index
+        now = int(self._clock())
+        with file_lock(self.lock_path):
+            segment = self._segment(now)
+            offset = segment.stat().st_size if segment.exists() else 0
+            append_bytes(segment, member, sync=False)
+            entry = ArchiveEntry(
+                segment.name, offset, len(member), records, now
+            )
+            append_bytes(self.index_path, entry.to_line().encode(), sync=False)
+        self._entries.append(entry)
+        return entry
+
+    def _segment(self, now: int) -> Path:
+        """Return the segment to append to, starting one if needed."""
+        if self._entries:
+            segment = self.path / self._entries[-1].segment
+            if (
+                segment.exists()
+                and segment.stat().st_size < self.config.segment_bytes
+                and now - segment_created(segment.name)
+                < self.config.segment_age
+            ):
+                return segment
+        name = f"raw-{now:010d}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+        return self.path / name
+
+    def read(self, entry: ArchiveEntry) -> Iterator[dict]:
+        """
+        Decompress the responses of one entry.
+
+        Args:
+            entry (ArchiveEntry): Entry of the index.
+
+        Yields:
+            dict: The archived responses in their original order.
+        """
+        yield from read_entry(self.path, entry)
+
+    def entries_between(
+        self, since: datetime | None = None, until: datetime | None = None
+    ) -> list[ArchiveEntry]:
+        """
+        Return the entries archived in [since, until).
+
+        Args:
+            since (datetime | None): Start of the range, inclusive.
+            until (datetime | None): End of the range, exclusive.
+
+        Returns:
+            list[ArchiveEntry]: The entries in the order they were
+            archived.
+        """
+        first = since.timestamp() if since is not None else float("-inf")
+        last = until.timestamp() if until is not None else float("inf")
+        return [e for e in self._entries if first <= e.archived_at < last]
+
+    def replay(
+        self, since: datetime | None = None, until: datetime | None = None
+    ) -> Iterator[dict]:
+        """
+        Yield the archived responses, optionally only those archived in
+        [since, until).
+
+        Args:
+            since (datetime | None): Start of the range, inclusive.
+            until (datetime | None): End of the range, exclusive.
+
+        Yields:
+            dict: The archived responses in the order they were archived.
+        """
+        for entry in self.entries_between(since, until):
+            yield from self.read(entry)
+
+
+def archive_payloads(
+    archive: RawArchive | None, payloads: Iterable[dict]
+) -> Iterator[dict]:
+    """
+    Pass a stream of responses through, buffering each into the archive.
+
+    Args:
+        archive (RawArchive | None): Archive to write to, None to disable.
+        payloads (Iterable[dict]): Raw responses of the API.
+
+    Yields:
+        dict: The responses, unchanged.
+    """
+    for payload in payloads:
+        if archive is not None:
+            archive.write(payload)
+        yield payload
@@ -0,0 +1,383 @@
+import json
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+from pydantic import SecretStr
+
+from .aggregates import update_aggregates
+from .archive import RawArchive
+from .columnar import parse_weather_lines
+from .config import Config, Location
+from .dedup import (
+    DedupIndex,
+    add_lines,
+    add_rows,
+    filter_new_lines,
+    filter_new_rows,
+)
+from .extract import create_session
+from .fetch import FetchEngine
+from .load import append_weather_records
+from .metrics import stage_metrics
+from .runs import sink_lock
+from .schema import schema_for
+from .sinks import open_table_sink, table_batch_rows
+from .transform import process_weather_batch, transform_weather_batch
+from .validate import (
+    filter_valid_records,
+    filter_valid_rows,
+    quarantine_records,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = "/data/2.5/history/city"
+
+
+@dataclass(frozen=True)
+class BackfillChunk:
+    """Time range of one location fetched with a single request.
+
+    Attributes:
+        location (Location): Location to fetch.
+        start (int): Start of the range in Unix seconds, inclusive.
+        end (int): End of the range in Unix seconds, exclusive.
+    """
+
+    location: Location
+    start: int
+    end: int
+
+    @property
+    def key(self) -> str:
+        """Identifier of the chunk in the progress file."""
+        return f"{self.location.key}|{self.start}|{self.end}"
+
+
+@dataclass
+class BackfillResult:
+    """Outcome of a backfill run.
+
+    Attributes:
+        records (int): Number of records written to the sink.
+        chunks (int): Number of chunks fetched and written in this run.
+        skipped (int): Number of chunks completed by an earlier run.
+        quarantined (int): Number of observations moved to the quarantine
+            file.
+        failures (dict[str, str]): Error messages keyed by chunk key.
+    """
+
+    records: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    quarantined: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+def plan_chunks(
+    locations: Iterable[Location],
+    start: datetime,
+    end: datetime,
+    chunk_hours: int,
+) -> list[BackfillChunk]:
+    """
+    Split a time range into chunks per location.
+
+    Chunk boundaries are aligned to `start`, so planning the same range
+    again yields the same chunks and a resumed run can recognise them.
+
+    Args:
+        locations (Iterable[Location]): Locations to backfill.
+        start (datetime): Start of the range, inclusive.
+        end (datetime): End of the range, exclusive.
+        chunk_hours (int): Length of a chunk in hours.
+
+    Returns:
+        list[BackfillChunk]: Chunks ordered by location and time.
+    """
+    first = int(start.timestamp())
+    last = int(end.timestamp())
+    step = chunk_hours * 3600
+    return [
+        BackfillChunk(location, t, min(t + step, last))
+        for location in locations
+        for t in range(first, last, step)
+    ]
+
+
+class BackfillProgress:
+    """File-backed set of the chunks a backfill has completed.
+
+    Call `save` to persist changes; the file is replaced atomically.
+
+    Attributes:
+        path (Path): Path to the progress file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._done: set[str] = set()
+
+        # load previous state if the progress file exists
+        if path.exists():
+            with open(path) as f:
+                self._done = set(json.load(f)["done"])
+
+    def __contains__(self, chunk: BackfillChunk) -> bool:
+        return chunk.key in self._done
+
+    def mark_done(self, chunk: BackfillChunk) -> None:
+        """
+        Record a chunk as completed.
+
+        Args:
+            chunk (BackfillChunk): The written chunk.
+        """
+        self._done.add(chunk.key)
+
+    def save(self) -> None:
+        """Persist the completed chunks."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"done": sorted(self._done)}, f)
+        tmp.replace(self.path)
+
+
+def build_history_url(
+    chunk: BackfillChunk, api_key: SecretStr, base_url: str
+) -> str:
+    """
+    Build the OpenWeatherMap hourly history URL for a chunk.
+
+    Args:
+        chunk (BackfillChunk): Location and time range to fetch.
+        api_key (SecretStr): API key for accessing the OpenWeatherMap API.
+        base_url (str): Base URL of the history API.
+
+    Returns:
+        str: The request URL.
+    """
+    return (
+        f"{base_url}{HISTORY_PATH}?"
+        f"lat={chunk.location.latitude}&lon={chunk.location.longitude}"
+        f"&type=hour&start={chunk.start}&end={chunk.end}"
+        f"&appid={api_key.get_secret_value()}"
+        f"&units=metric"
+    )
+
+
+def request_history(
+    engine: FetchEngine,
+    chunk: BackfillChunk,
+    api_key: SecretStr,
+    base_url: str,
+) -> list[dict]:
+    """
+    Request the hourly observations of a chunk.
+
+    The history API does not name the location, so every observation is
+    labelled with the location key to match the layout of the current
+    weather payloads.
+
+    Args:
+        engine (FetchEngine): Engine used to send the request.
+        chunk (BackfillChunk): Location and time range to fetch.
+        api_key (SecretStr): API key for accessing the OpenWeatherMap API.
+        base_url (str): Base URL of the history API.
+
+    Raises:
+        FetchError: If the API request fails or returns an error.
+        ValueError: If the response is not valid JSON.
+
+    Returns:
+        list[dict]: One payload per observation in the chunk.
+    """
+    res = engine.get(build_history_url(chunk, api_key, base_url))
+
+    # if the response is not JSON, raise an error
+    try:
+        observations = res.json().get("list", [])
+    except json.JSONDecodeError as e:
+        raise ValueError("Invalid JSON in response") from e
+    return [
+        {**observation, "name": chunk.location.key}
+        for observation in observations
+        if chunk.start <= observation["dt"] < chunk.end
+    ]
+
+
+def run_backfill(
+    config: Config,
+    start: datetime,
+    end: datetime,
+    locations: list[Location] | None = None,
+) -> BackfillResult:
+    """
+    Load the hourly history of a time range into the configured sink.
+
+    The range is split into chunks of `config.backfill.chunk_hours` per
+    location, which are fetched in parallel through the fetch engine and
+    written straight into the sink selected by `config.sink_backend`.
+    Written chunks are recorded in `config.backfill.progress_path` once
+    their rows are flushed, so an interrupted or partly failed backfill
+    resumes where it stopped when run again with the same range. If
+    `config.dedup_index_path` is set, records already in the sink are
+    skipped. Malformed observations and ones with missing or implausible
+    values are moved to the quarantine file. The sink is locked only
+    while a batch is written, so the scheduled runs can load in between.
+
+    Args:
+        config (Config): Configuration object containing API key, fetch,
+        backfill and columnar sink settings.
+        start (datetime): Start of the range, inclusive.
+        end (datetime): End of the range, exclusive.
+        locations (list[Location] | None): Locations to backfill, all
+        configured locations if None.
+
+    Returns:
+        BackfillResult: Number of records and chunks written, and failed
+        chunks.
+    """
+    # extract parameters from config
+    api_key: SecretStr = config.secrets.api_key
+    base_url: str = config.backfill.base_url
+    schema = schema_for(config)
+    result = BackfillResult()
+
+    # drop the chunks an earlier run has completed
+    if locations is None:
+        locations = config.locations
+    progress = BackfillProgress(config.backfill.progress_path)
+    chunks = []
+    for chunk in plan_chunks(
+        locations, start, end, config.backfill.chunk_hours
+    ):
+        if chunk in progress:
+            result.skipped += 1
+        else:
+            chunks.append(chunk)
+
+    # buffered chunks and rows, written together once enough rows arrived
+    tables = config.sink_backend != "csv"
+    batch_rows = (
+        table_batch_rows(config) if tables else config.writer.batch_records
+    )
+    pending: list[BackfillChunk] = []
+    buffered: list[pa.Table] | list[str] = []
+    rows = 0
+
+    with ExitStack() as stack:
+        metrics = stack.enter_context(stage_metrics(config, "backfill"))
+        archive = None
+        if config.archive.enabled:
+            archive = stack.enter_context(RawArchive.from_config(config))
+        if tables:
+            writer = stack.enter_context(open_table_sink(config, schema))
+
+        def commit() -> None:
+            nonlocal rows
+            if not pending:
+                return
+
+            # hold the sink lock only while the rows are written
+            with ExitStack() as locked:
+                locked.enter_context(sink_lock(config))
+                index = None
+                if config.dedup_index_path is not None:
+                    index = locked.enter_context(
+                        DedupIndex(config.dedup_index_path)
+                    )
+                if tables:
+                    table = pa.concat_tables(buffered)
+                    if index is not None:
+                        table = filter_new_rows(index, table)
+                    inserted = table
+                    if config.aggregates_path is not None:
+                        inserted = writer.new_rows(table)
+                    writer.append(table)
+                    writer.flush()
+                    if index is not None:
+                        add_rows(index, table)
+                    update_aggregates(config, inserted)
+                    written = table.num_rows
+                else:
+                    lines = buffered
+                    if index is not None:
+                        lines = list(filter_new_lines(index, lines))
+                    written = append_weather_records(
+                        config.sink_path,
+                        lines,
+                        config.sink_index_path,
+                        config.writer,
+                    )
+                    if index is not None:
+                        add_lines(index, lines)
+                    if config.aggregates_path is not None:
+                        update_aggregates(
+                            config, parse_weather_lines(lines, schema)
+                        )
+
+            # record the chunks only after their rows are written
+            for done in pending:
+                progress.mark_done(done)
+            progress.save()
+            result.records += written
+            result.chunks += len(pending)
+            metrics.add(records_out=written)
+            pending.clear()
+            buffered.clear()
+            rows = 0
+
+        # fetch the chunks through a bounded pool and write as they arrive
+        session = stack.enter_context(create_session(config))
+        executor = stack.enter_context(
+            ThreadPoolExecutor(max_workers=config.fetch.max_concurrency)
+        )
+        engine = FetchEngine(config.fetch, session, metrics=metrics)
+        futures = {
+            executor.submit(
+                request_history, engine, chunk, api_key, base_url
+            ): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                observations = future.result()
+            except Exception as e:
+                logger.warning("Fetching %s failed: %s", chunk.key, e)
+                result.failures[chunk.key] = str(e)
+                continue
+            if archive is not None:
+                archive.append(observations)
+            pending.append(chunk)
+
+            # check the values only, history arrives out of order
+            rejected = []
+            if tables:
+                table = process_weather_batch(observations, schema, rejected)
+                table = filter_valid_rows(table, rejected, schema, False)
+                buffered.append(table)
+                rows += table.num_rows
+            else:
+                batch = transform_weather_batch(observations, schema, rejected)
+                batch = filter_valid_records(batch, rejected, False)
+                buffered.extend(batch.lines())
+                rows += len(batch)
+            if rejected:
+                result.quarantined += quarantine_records(
+                    config.validation.quarantine_path, rejected, "backfill"
+                )
+                metrics.add(records_quarantined=len(rejected))
+            if rows >= batch_rows:
+                commit()
+        commit()
+
+    return result
@@ -0,0 +1,236 @@
+import json
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from .config import CacheConfig, Location
+from .writer import file_lock
+
+
+def grid_cell(location: Location, grid: float) -> str:
+    """
+    Quantize the coordinates of a location to a grid cell.
+
+    Args:
+        location (Location): Location to quantize.
+        grid (float): Edge length of a grid cell in degrees.
+
+    Returns:
+        str: Identifier of the grid cell.
+    """
+    lat = round(location.latitude / grid)
+    lon = round(location.longitude / grid)
+    return f"{lat * grid:.6f},{lon * grid:.6f}"
+
+
+def group_by_cell(
+    locations: Iterable[Location], grid: float
+) -> dict[str, list[Location]]:
+    """
+    Group locations that fall into the same grid cell.
+
+    Args:
+        locations (Iterable[Location]): Locations to group.
+        grid (float): Edge length of a grid cell in degrees.
+
+    Returns:
+        dict[str, list[Location]]: Locations keyed by grid cell, in the
+        order they were first seen.
+    """
+    cells: dict[str, list[Location]] = {}
+    for location in locations:
+        cells.setdefault(grid_cell(location, grid), []).append(location)
+    return cells
+
+
+class ResponseCache:
+    """File-backed cache of API responses and last observation times.
+
+    Responses are keyed on grid cells and expire after `ttl` seconds.
+    Independently, the cache remembers the last `dt` loaded per location
+    so unchanged observations can be recognised. A fetched observation is
+    only pending until `commit` is called after it reached the sink, so
+    a failed load does not mark it as seen. Call `save` to persist
+    changes; the file is replaced atomically. Runs may share the file:
+    `save` merges the changes of this cache into the state saved since it
+    was loaded, holding a lock next to the file, so it never discards
+    the responses or commits of another run.
+
+    Attributes:
+        path (Path): Path to the cache file.
+        ttl (float): Lifetime of a cached response in seconds.
+        grid (float): Edge length of a grid cell in degrees.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float,
+        grid: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.grid = grid
+        self._clock = clock
+        self._responses: dict[str, dict] = {}
+        self._last_dt: dict[str, int] = {}
+        self._pending: dict[str, int] = {}
+
+        # changes since the state was loaded, merged into it on save
+        self._put: dict[str, dict] = {}
+        self._observed: dict[str, int] = {}
+        self._committed: dict[str, int] = {}
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: CacheConfig) -> "ResponseCache":
+        """
+        Create a cache from its configuration.
+
+        Args:
+            config (CacheConfig): Cache settings with a path set.
+
+        Returns:
+            ResponseCache: The cache.
+        """
+        return cls(config.path, ttl=config.ttl, grid=config.grid)
+
+    def get(self, cell: str) -> dict | None:
+        """
+        Look up a fresh response for a grid cell.
+
+        Args:
+            cell (str): Identifier of the grid cell.
+
+        Returns:
+            dict | None: The cached payload, None if missing or expired.
+        """
+        entry = self._responses.get(cell)
+        if entry is None or self._clock() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["payload"]
+
+    def put(self, cell: str, payload: dict) -> None:
+        """
+        Store the response for a grid cell.
+
+        Args:
+            cell (str): Identifier of the grid cell.
+            payload (dict): Raw response of the API.
+        """
+        entry = {"fetched_at": self._clock(), "payload": payload}
+        self._responses[cell] = self._put[cell] = entry
+
+    def is_new(self, location_key: str, dt: int) -> bool:
+        """
+        Check whether an observation differs from the last one loaded for
+        a location.
+
+        Args:
+            location_key (str): Key of the location.
+            dt (int): Observation time of the payload.
+
+        Returns:
+            bool: False if `dt` equals the last committed observation time.
+        """
+        return self._last_dt.get(location_key) != dt
+
+    def observe(self, location_key: str, dt: int) -> None:
+        """
+        Remember an observation as pending until it is committed.
+
+        Args:
+            location_key (str): Key of the location.
+            dt (int): Observation time of the payload.
+        """
+        self._pending[location_key] = self._observed[location_key] = dt
+
+    def commit(self, observed: dict[str, int] | None = None) -> int:
+        """
+        Mark observations as loaded, so they are reported as unchanged.
+
+        Args:
+            observed (dict[str, int] | None): Observation times keyed by
+            location key, all pending observations if None.
+
+        Returns:
+            int: Number of observations committed.
+        """
+        if observed is None:
+            observed = dict(self._pending)
+        self._committed.update(observed)
+        self._apply_commit(observed)
+        return len(observed)
+
+    def save(self) -> None:
+        """Persist the cache, dropping expired responses."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path.with_name(self.path.name + ".lock")):
+            # reload the file and apply the changes of this cache to it
+            self._load()
+            self._responses.update(self._put)
+            self._pending.update(self._observed)
+            self._apply_commit(self._committed)
+            now = self._clock()
+            self._responses = {
+                cell: entry
+                for cell, entry in self._responses.items()
+                if now - entry["fetched_at"] <= self.ttl
+            }
+
+            # write to a temporary file and rename it into place
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(
+                    {
+                        "responses": self._responses,
+                        "last_dt": self._last_dt,
+                        "pending": self._pending,
+                    },
+                    f,
+                )
+            tmp.replace(self.path)
+        self._put, self._observed, self._committed = {}, {}, {}
+
+    def _load(self) -> None:
+        """Read the saved state, if the cache file exists."""
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            state = json.load(f)
+        self._responses = state.get("responses", {})
+        self._last_dt = state.get("last_dt", {})
+        self._pending = state.get("pending", {})
+
+    def _apply_commit(self, observed: dict[str, int]) -> None:
+        """Mark observations as loaded and no longer pending."""
+        self._last_dt.update(observed)
+        self._pending = {
+            location_key: dt
+            for location_key, dt in self._pending.items()
+            if observed.get(location_key) != dt
+        }
+
+
+def commit_observations(
+    config: CacheConfig, observed: dict[str, int] | None = None
+) -> int:
+    """
+    Mark observations as loaded once the sink commit succeeded.
+
+    Args:
+        config (CacheConfig): Cache settings; nothing is done without a
+        path.
+        observed (dict[str, int] | None): Observation times keyed by
+        location key, all pending observations if None.
+
+    Returns:
+        int: Number of observations committed.
+    """
+    if config.path is None:
+        return 0
+    cache = ResponseCache.from_config(config)
+    committed = cache.commit(observed)
+    cache.save()
+    return committed
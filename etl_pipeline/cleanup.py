@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from .config import Config
+from .metrics import stage_metrics
 
 
 def cleanup_weather_files(
@@ -8,7 +9,8 @@ def cleanup_weather_files(
 ) -> None:
     """
     Clean up the weather data files by removing the raw and
-    processed files.
+    processed files, and the run directory holding them once it
+    is empty.
 
     Args:
         config (Config): Configuration object containing paths
@@ -20,11 +22,24 @@ def cleanup_weather_files(
     # extract paths from config
     raw_path:       Path = config.raw_path
     processed_path: Path = config.processed_path
+    runs_dir:       Path = config.runs_dir
 
-    # remove raw file if it exists
-    if raw_path.exists():
-        raw_path.unlink()
+    with stage_metrics(config, "cleanup") as metrics:
+        # remove raw file if it exists
+        if raw_path.exists():
+            raw_path.unlink()
+            metrics.add(files_removed=1)
 
-    # remove processed file if it exists
-    if processed_path.exists():
-        processed_path.unlink()
+        # remove processed file if it exists
+        if processed_path.exists():
+            processed_path.unlink()
+            metrics.add(files_removed=1)
+
+        # remove the working directory of the run if it is empty
+        for directory in {raw_path.parent, processed_path.parent}:
+            if (
+                directory.parent == runs_dir
+                and directory.exists()
+                and not any(directory.iterdir())
+            ):
+                directory.rmdir()
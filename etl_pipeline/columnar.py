@@ -0,0 +1,415 @@
+import io
+import uuid
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from datetime import date
+from pathlib import Path
+from typing import IO
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .aggregates import update_aggregates
+from .config import ColumnarConfig, Config
+from .dedup import DedupIndex, add_rows, filter_new_rows
+from .schema import DEFAULT_SCHEMA, WeatherSchema, schema_for
+
+# typed layout of a weather record with the default fields, matching the
+# semicolon CSV columns
+WEATHER_SCHEMA = DEFAULT_SCHEMA.arrow
+
+# hive-style directory layout: location=<name>/date=<YYYY-MM-DD>/
+PARTITIONING = ds.partitioning(
+    pa.schema([("location", pa.string()), ("date", pa.string())]),
+    flavor="hive",
+)
+
+# schema of the dataset as seen by readers; Parquet stores `dt` in
+# milliseconds, so reads are cast back to seconds
+DATASET_SCHEMA = DEFAULT_SCHEMA.dataset
+
+# approximate number of bytes of CSV parsed at once when streaming a file
+READ_BLOCK = 1 << 20
+
+
+def open_weather_dataset(
+    root: Path, schema: WeatherSchema = DEFAULT_SCHEMA
+) -> ds.Dataset:
+    """
+    Open the partitioned Parquet dataset.
+
+    Args:
+        root (Path): Root directory of the partitioned dataset.
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        ds.Dataset: Dataset following the dataset layout of the schema.
+    """
+    return ds.dataset(
+        root,
+        schema=schema.dataset,
+        format="parquet",
+        partitioning=PARTITIONING,
+    )
+
+
+def read_weather_csv(
+    path: Path | IO[bytes], schema: WeatherSchema = DEFAULT_SCHEMA
+) -> pa.Table:
+    """
+    Read a headerless semicolon-separated weather CSV into a typed table.
+
+    Args:
+        path (Path | IO[bytes]): Path to the CSV file, e.g. the processed
+        file or the CSV sink, or a binary file object.
+        schema (WeatherSchema): Field schema of the CSV columns.
+
+    Returns:
+        pa.Table: Table following the schema.
+    """
+    # timestamps are stored as Unix seconds
+    column_types = {
+        f.name: pa.int64() if pa.types.is_timestamp(f.type) else f.type
+        for f in schema.arrow
+    }
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(column_names=schema.names),
+        parse_options=pa_csv.ParseOptions(delimiter=";"),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    return with_timestamps(table, schema)
+
+
+def iter_weather_csv(
+    path: Path,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    block_size: int = READ_BLOCK,
+) -> Iterator[pa.Table]:
+    """
+    Stream a headerless semicolon-separated weather CSV as typed tables,
+    one per block, so files of any size are read in constant memory.
+
+    Args:
+        path (Path): Path to the CSV file, e.g. the processed file.
+        schema (WeatherSchema): Field schema of the CSV columns.
+        block_size (int): Approximate number of bytes parsed per table.
+
+    Yields:
+        pa.Table: Consecutive records following the schema.
+    """
+    # timestamps are stored as Unix seconds
+    column_types = {
+        f.name: pa.int64() if pa.types.is_timestamp(f.type) else f.type
+        for f in schema.arrow
+    }
+    if not path.stat().st_size:
+        return
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(
+            column_names=schema.names, block_size=block_size
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter=";"),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    with reader:
+        for batch in reader:
+            if batch.num_rows:
+                yield with_timestamps(pa.Table.from_batches([batch]), schema)
+
+
+def parse_weather_lines(
+    lines: Iterable[str], schema: WeatherSchema = DEFAULT_SCHEMA
+) -> pa.Table:
+    """
+    Parse CSV lines in the sink layout into a typed table.
+
+    Args:
+        lines (Iterable[str]): CSV lines, each ending in a newline.
+        schema (WeatherSchema): Field schema of the CSV columns.
+
+    Returns:
+        pa.Table: Table following the schema.
+    """
+    data = "".join(lines).encode()
+    if not data:
+        return schema.arrow.empty_table()
+    return read_weather_csv(io.BytesIO(data), schema)
+
+
+def with_timestamps(
+    table: pa.Table, schema: WeatherSchema = DEFAULT_SCHEMA
+) -> pa.Table:
+    """
+    Convert integer timestamp columns such as `dt` into UTC timestamps
+    and cast the remaining columns to the schema.
+
+    Args:
+        table (pa.Table): Table with the schema columns and timestamps
+        given as Unix seconds.
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        pa.Table: Table following the schema.
+    """
+    return schema.cast(table)
+
+
+def add_partition_columns(table: pa.Table) -> pa.Table:
+    """
+    Append the `date` partition column derived from `dt`.
+
+    Args:
+        table (pa.Table): Weather table with a `dt` column.
+
+    Returns:
+        pa.Table: The table with an additional `date` column.
+    """
+    day = pc.strftime(table.column("dt"), format="%Y-%m-%d")
+    return table.append_column("date", day)
+
+
+class ColumnarSinkWriter:
+    """Buffered writer of weather tables into a partitioned Parquet sink.
+
+    Appended tables are kept in memory until `batch_rows` rows have been
+    collected and are then written in one go, producing one file per
+    touched partition. Use it as a context manager to flush the remainder
+    on exit.
+
+    Attributes:
+        root (Path): Root directory of the partitioned dataset.
+        batch_rows (int): Number of buffered rows that triggers a flush.
+        compression (str): Parquet compression codec.
+        schema (WeatherSchema): Field schema of the sink.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        batch_rows: int = 10_000,
+        compression: str = "zstd",
+        schema: WeatherSchema = DEFAULT_SCHEMA,
+    ):
+        self.root = root
+        self.batch_rows = batch_rows
+        self.compression = compression
+        self.schema = schema
+        self._buffer: list[pa.Table] = []
+        self._buffered_rows = 0
+
+    def __enter__(self) -> "ColumnarSinkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def new_rows(self, table: pa.Table) -> pa.Table:
+        """
+        Select the rows an append of the table would add; the dataset is
+        append-only, so that is every row.
+
+        Args:
+            table (pa.Table): Table following the schema.
+
+        Returns:
+            pa.Table: The table, unchanged.
+        """
+        return table
+
+    def append(self, table: pa.Table) -> None:
+        """
+        Buffer a table and flush if the batch is full.
+
+        Args:
+            table (pa.Table): Table following the schema.
+        """
+        self._buffer.append(with_timestamps(table, self.schema))
+        self._buffered_rows += table.num_rows
+        if self._buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered rows to the dataset.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows = self._buffered_rows
+        if not rows:
+            return 0
+        table = add_partition_columns(pa.concat_tables(self._buffer))
+        self._buffer.clear()
+        self._buffered_rows = 0
+
+        # write one new file per partition touched by this batch
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=self.compression
+            ),
+        )
+        return rows
+
+
+def compact_partitions(root: Path, compression: str = "zstd") -> int:
+    """
+    Merge the files of every partition into a single sorted file.
+
+    The merged file is written under a temporary name starting with ".",
+    which dataset readers skip, and renamed into place before the
+    original files are removed, so readers never see a partial file or a
+    partition without data.
+
+    Args:
+        root (Path): Root directory of the partitioned dataset.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        int: Number of files removed.
+    """
+    removed = 0
+    partitions = {p.parent for p in root.glob("*/*/*.parquet")}
+    for partition in sorted(partitions):
+        files = sorted(partition.glob("*.parquet"))
+        if len(files) < 2:
+            continue
+
+        # read the files without partition columns and sort by time
+        table = pa.concat_tables(pq.ParquetFile(f).read() for f in files)
+        table = table.sort_by("dt")
+
+        # write the merged file atomically, then drop the originals
+        target = partition / f"part-{uuid.uuid4().hex}-compacted.parquet"
+        tmp = partition / f".{target.name}.tmp"
+        pq.write_table(table, tmp, compression=compression)
+        tmp.rename(target)
+        for f in files:
+            f.unlink()
+            removed += 1
+    return removed
+
+
+def read_weather_dataset(
+    root: Path,
+    columns: list[str] | None = None,
+    locations: Iterable[str] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+) -> pa.Table:
+    """
+    Scan the partitioned dataset, reading only the requested columns and
+    the partitions matching the location and date filters.
+
+    Args:
+        root (Path): Root directory of the partitioned dataset.
+        columns (list[str] | None): Columns to read, all if None.
+        locations (Iterable[str] | None): Locations to read, all if None.
+        start (date | None): First day to read, inclusive.
+        end (date | None): Last day to read, inclusive.
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        pa.Table: The matching rows.
+    """
+    dataset = open_weather_dataset(root, schema)
+
+    # build a filter on the partition columns so whole files are pruned
+    conditions = []
+    if locations is not None:
+        conditions.append(ds.field("location").isin(list(locations)))
+    if start is not None:
+        conditions.append(ds.field("date") >= start.isoformat())
+    if end is not None:
+        conditions.append(ds.field("date") <= end.isoformat())
+    expression = None
+    for condition in conditions:
+        if expression is None:
+            expression = condition
+        else:
+            expression = expression & condition
+
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def iter_dataset_keys(root: Path) -> Iterator[tuple[str, int]]:
+    """
+    Yield the (location, dt) key of every row in the partitioned dataset.
+
+    Args:
+        root (Path): Root directory of the partitioned dataset.
+
+    Yields:
+        tuple[str, int]: Location and observation time in Unix seconds.
+    """
+    dataset = open_weather_dataset(root)
+    for batch in dataset.to_batches(columns=["location", "dt"]):
+        locations = batch.column("location").to_pylist()
+        dts = pc.cast(batch.column("dt"), pa.int64()).to_pylist()
+        yield from zip(locations, dts, strict=True)
+
+
+def save_weather_data_columnar(config: Config) -> int:
+    """
+    Save the processed weather data to the partitioned Parquet sink,
+    skipping records already in the dedup index if one is configured, and
+    fold the written records into the aggregate store if one is
+    configured.
+
+    Args:
+        config (Config): Configuration object containing the processed
+        path and the columnar sink settings.
+
+    Raises:
+        FileNotFoundError: If the processed data file does not exist.
+
+    Returns:
+        int: Number of rows written.
+    """
+    # extract parameters from config
+    processed_path: Path = config.processed_path
+    columnar: ColumnarConfig = config.columnar
+
+    # ensure processed data file exists
+    if not processed_path.exists():
+        raise FileNotFoundError(
+            f"Processed data file not found: {processed_path}"
+        )
+
+    # stream the file in blocks; each block is written before its keys
+    # are indexed, so an interrupted load can leave a record unindexed but
+    # never indexed and missing
+    schema = schema_for(config)
+    rows = 0
+    with ExitStack() as stack:
+        index = None
+        if config.dedup_index_path is not None:
+            index = stack.enter_context(DedupIndex(config.dedup_index_path))
+        writer = stack.enter_context(
+            ColumnarSinkWriter(
+                columnar.path,
+                columnar.batch_rows,
+                columnar.compression,
+                schema,
+            )
+        )
+        for table in iter_weather_csv(processed_path, schema):
+            if index is not None:
+                table = filter_new_rows(index, table)
+            writer.append(table)
+            rows += writer.flush()
+            if index is not None:
+                add_rows(index, table)
+            update_aggregates(config, table)
+    return rows
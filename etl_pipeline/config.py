@@ -1,7 +1,15 @@
 from pathlib import Path
+from typing import Literal
 
 import yaml
-from pydantic import BaseModel, Field, SecretStr
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    SecretStr,
+    field_validator,
+    model_validator,
+)
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -23,16 +31,625 @@ class SecretsConfig(BaseSettings):
     )
 
 
+class Location(BaseModel):
+    """Configuration class for a single weather location.
+
+    Attributes:
+        name (str | None): Optional label of the location.
+        latitude (float): Latitude of the location.
+        longitude (float): Longitude of the location.
+    """
+
+    name: str | None = Field(
+        default=None,
+        description="Optional label of the location.",
+    )
+    latitude: float = Field(
+        ge=-90,
+        le=90,
+        description="Latitude of the location.",
+    )
+    longitude: float = Field(
+        ge=-180,
+        le=180,
+        description="Longitude of the location.",
+    )
+
+    @property
+    def key(self) -> str:
+        """Identifier of the location, its name or its coordinates."""
+        return self.name or f"{self.latitude},{self.longitude}"
+
+
+class FieldSpec(BaseModel):
+    """Extraction rule of one sink column.
+
+    Attributes:
+        name (str): Name of the column.
+        path (str): Location of the value in the raw payload, keys joined
+            by dots and list indices in brackets, e.g.
+            "weather[0].description" or "rain.1h".
+        type (str): Type of the column in the sink.
+        default (str | int | float | None): Value used if the path is
+            missing from a payload.
+        required (bool): Whether a payload missing the path is an error
+            instead of taking the default.
+        minimum (float | None): Smallest valid value of a numeric column,
+            in Unix seconds for timestamps.
+        maximum (float | None): Largest valid value of a numeric column,
+            in Unix seconds for timestamps.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str = Field(description="Name of the column.")
+    path: str = Field(description="Location of the value in the payload.")
+    type: Literal[
+        "string", "int16", "int32", "int64", "float64", "timestamp"
+    ] = Field(
+        default="string",
+        description="Type of the column in the sink.",
+    )
+    default: str | int | float | None = Field(
+        default=None,
+        description="Value used if the path is missing from a payload.",
+    )
+    required: bool = Field(
+        default=False,
+        description="Whether a payload missing the path is an error.",
+    )
+    minimum: float | None = Field(
+        default=None,
+        description="Smallest valid value of a numeric column.",
+    )
+    maximum: float | None = Field(
+        default=None,
+        description="Largest valid value of a numeric column.",
+    )
+
+
+# columns of the sink in order; the first two identify a record. Ranges are
+# in metric units and bound what is physically plausible, e.g. a humidity
+# above 100% or a temperature below absolute zero
+WEATHER_FIELDS = (
+    FieldSpec(name="location", path="name", required=True),
+    FieldSpec(
+        name="dt", path="dt", type="timestamp", required=True, minimum=0
+    ),
+    FieldSpec(
+        name="description", path="weather[0].description", required=True
+    ),
+    FieldSpec(
+        name="temp",
+        path="main.temp",
+        type="float64",
+        required=True,
+        minimum=-100,
+        maximum=70,
+    ),
+    FieldSpec(
+        name="clouds",
+        path="clouds.all",
+        type="int16",
+        required=True,
+        minimum=0,
+        maximum=100,
+    ),
+    FieldSpec(
+        name="humidity",
+        path="main.humidity",
+        type="int16",
+        required=True,
+        minimum=0,
+        maximum=100,
+    ),
+    FieldSpec(
+        name="wind_speed",
+        path="wind.speed",
+        type="float64",
+        required=True,
+        minimum=0,
+        maximum=120,
+    ),
+    FieldSpec(
+        name="pressure",
+        path="main.pressure",
+        type="int32",
+        required=True,
+        minimum=800,
+        maximum=1100,
+    ),
+)
+
+
+class FetchConfig(BaseModel):
+    """Configuration class for fetching data from the API.
+
+    Attributes:
+        base_url (str): Base URL of the OpenWeatherMap API.
+        max_concurrency (int): Maximum number of requests in flight.
+        timeout (float): Timeout of a single request in seconds.
+        requests_per_minute (float): Sustained request rate of the API plan.
+        burst (int): Number of requests that may be sent back to back.
+        max_retries (int): Retries of a request after a transient failure.
+        backoff_base (float): Delay of the first retry in seconds.
+        backoff_max (float): Maximum delay between retries in seconds.
+        breaker_threshold (int): Consecutive failures that open the
+            circuit breaker.
+        breaker_reset_timeout (float): Seconds the circuit breaker stays
+            open before letting a probe request through.
+    """
+
+    base_url: str = Field(
+        default="https://api.openweathermap.org",
+        description="Base URL of the OpenWeatherMap API.",
+    )
+    max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of requests in flight.",
+    )
+    timeout: float = Field(
+        default=10.0,
+        gt=0,
+        description="Timeout of a single request in seconds.",
+    )
+    requests_per_minute: float = Field(
+        default=60.0,
+        gt=0,
+        description="Sustained request rate of the API plan.",
+    )
+    burst: int = Field(
+        default=10,
+        ge=1,
+        description="Number of requests that may be sent back to back.",
+    )
+    max_retries: int = Field(
+        default=3,
+        ge=0,
+        description="Retries of a request after a transient failure.",
+    )
+    backoff_base: float = Field(
+        default=1.0,
+        ge=0,
+        description="Delay of the first retry in seconds.",
+    )
+    backoff_max: float = Field(
+        default=60.0,
+        ge=0,
+        description="Maximum delay between retries in seconds.",
+    )
+    breaker_threshold: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive failures that open the circuit breaker.",
+    )
+    breaker_reset_timeout: float = Field(
+        default=60.0,
+        ge=0,
+        description="Seconds the circuit breaker stays open.",
+    )
+
+
+class CacheConfig(BaseModel):
+    """Configuration class for the response cache.
+
+    Attributes:
+        path (Path | None): Path to the cache file. Caching is disabled if
+            None.
+        ttl (float): Lifetime of a cached response in seconds.
+        grid (float): Edge length of a grid cell in degrees. Locations in
+            the same cell share one API call.
+    """
+
+    path: Path | None = Field(
+        default=None,
+        description="Path to the cache file, None disables caching.",
+    )
+    ttl: float = Field(
+        default=300.0,
+        ge=0,
+        description="Lifetime of a cached response in seconds.",
+    )
+    grid: float = Field(
+        default=0.01,
+        gt=0,
+        description="Edge length of a grid cell in degrees.",
+    )
+
+
+class PollConfig(BaseModel):
+    """Configuration class for the adaptive polling schedule.
+
+    The update interval of every location is learned from the history of
+    its observation times, and a location is only requested once its next
+    update is expected. The schedule is disabled if `path` is None.
+
+    Attributes:
+        path (Path | None): Path to the schedule file. Every location is
+            polled on every run if None.
+        history (int): Number of observation times kept per location.
+        default_interval (float): Update interval in seconds assumed until
+            two observations of a location were seen.
+        min_interval (float): Lower bound of a learned interval in seconds,
+            also the delay before polling again if an update is late.
+        max_interval (float): Upper bound of a learned interval in seconds;
+            every location is polled at least this often.
+        lag (float): Seconds after the expected update a location is
+            polled, so the provider has published it.
+        budget (int | None): Number of API requests per run, no limit if
+            None. Locations beyond it are polled first on the next run.
+    """
+
+    path: Path | None = Field(
+        default=None,
+        description="Path to the schedule file, None polls every run.",
+    )
+    history: int = Field(
+        default=8,
+        ge=2,
+        description="Number of observation times kept per location.",
+    )
+    default_interval: float = Field(
+        default=600.0,
+        gt=0,
+        description="Update interval assumed for a new location.",
+    )
+    min_interval: float = Field(
+        default=300.0,
+        gt=0,
+        description="Lower bound of a learned update interval.",
+    )
+    max_interval: float = Field(
+        default=3600.0,
+        gt=0,
+        description="Upper bound of a learned update interval.",
+    )
+    lag: float = Field(
+        default=60.0,
+        ge=0,
+        description="Delay after the expected update before polling.",
+    )
+    budget: int | None = Field(
+        default=None,
+        ge=0,
+        description="Number of API requests per run.",
+    )
+
+
+class ColumnarConfig(BaseModel):
+    """Configuration class for the partitioned Parquet sink.
+
+    Attributes:
+        path (Path): Root directory of the partitioned dataset.
+        batch_rows (int): Number of buffered rows that triggers a write.
+        compression (str): Parquet compression codec.
+    """
+
+    path: Path = Field(
+        default=Path("data/columnar"),
+        description="Root directory of the partitioned dataset.",
+    )
+    batch_rows: int = Field(
+        default=10_000,
+        ge=1,
+        description="Number of buffered rows that triggers a write.",
+    )
+    compression: Literal["zstd", "snappy", "gzip", "none"] = Field(
+        default="zstd",
+        description="Parquet compression codec.",
+    )
+
+
+class SqliteConfig(BaseModel):
+    """Configuration class for the SQLite sink.
+
+    Attributes:
+        path (Path): Path to the SQLite database.
+        batch_rows (int): Number of buffered rows that triggers a write.
+        synchronous (str): SQLite synchronous mode; "normal" only syncs at
+            WAL checkpoints, "full" syncs every transaction.
+    """
+
+    path: Path = Field(
+        default=Path("data/weather.sqlite"),
+        description="Path to the SQLite database.",
+    )
+    batch_rows: int = Field(
+        default=10_000,
+        ge=1,
+        description="Number of buffered rows that triggers a write.",
+    )
+    synchronous: Literal["off", "normal", "full"] = Field(
+        default="normal",
+        description="SQLite synchronous mode.",
+    )
+
+
+class WriterConfig(BaseModel):
+    """Configuration class for the group-commit writer of the CSV sink.
+
+    Attributes:
+        durability (str): Commit mode, "append" appends without syncing,
+            "fsync" appends and fsyncs, "segments" commits each group as a
+            segment file renamed into place and folds them into the sink.
+        batch_records (int): Number of buffered lines that triggers a
+            commit.
+        batch_bytes (int): Number of buffered bytes that triggers a commit.
+        max_age (float): Age in seconds of the oldest buffered line that
+            triggers a commit.
+    """
+
+    durability: Literal["append", "fsync", "segments"] = Field(
+        default="append",
+        description="Commit mode of the CSV sink.",
+    )
+    batch_records: int = Field(
+        default=1000,
+        ge=1,
+        description="Number of buffered lines that triggers a commit.",
+    )
+    batch_bytes: int = Field(
+        default=1 << 20,
+        ge=1,
+        description="Number of buffered bytes that triggers a commit.",
+    )
+    max_age: float = Field(
+        default=1.0,
+        ge=0,
+        description="Age of the oldest buffered line that triggers a commit.",
+    )
+
+
+class MetricsConfig(BaseModel):
+    """Configuration class for stage metrics.
+
+    Attributes:
+        enabled (bool): Whether stages record metrics.
+        path (Path | None): Directory the metrics of each stage are
+            exported to as Prometheus textfile and JSON.
+    """
+
+    enabled: bool = Field(
+        default=False,
+        description="Whether stages record metrics.",
+    )
+    path: Path | None = Field(
+        default=None,
+        description="Directory the metrics of each stage are exported to.",
+    )
+
+
+class BackfillConfig(BaseModel):
+    """Configuration class for historical backfills.
+
+    Attributes:
+        base_url (str): Base URL of the OpenWeatherMap history API.
+        chunk_hours (int): Length of the time range fetched per request.
+        progress_path (Path): Path to the file tracking completed chunks.
+    """
+
+    base_url: str = Field(
+        default="https://history.openweathermap.org",
+        description="Base URL of the OpenWeatherMap history API.",
+    )
+    chunk_hours: int = Field(
+        default=168,
+        ge=1,
+        description="Length of the time range fetched per request.",
+    )
+    progress_path: Path = Field(
+        default=Path("data/backfill/progress.json"),
+        description="Path to the file tracking completed chunks.",
+    )
+
+
+class ArchiveConfig(BaseModel):
+    """Configuration class for the archive of raw responses.
+
+    Attributes:
+        enabled (bool): Whether raw responses are archived.
+        path (Path | None): Directory of the archive. Defaults to an
+            `archive` directory next to the data sink.
+        segment_bytes (int): Size of a segment that starts a new one.
+        segment_age (float): Age in seconds of a segment that starts a new
+            one.
+        compresslevel (int): gzip compression level of the segments.
+        batch_records (int): Number of buffered responses that are
+            compressed and appended together.
+    """
+
+    enabled: bool = Field(
+        default=True,
+        description="Whether raw responses are archived.",
+    )
+    path: Path | None = Field(
+        default=None,
+        description="Directory of the archive.",
+    )
+    segment_bytes: int = Field(
+        default=64 << 20,
+        ge=1,
+        description="Size of a segment that starts a new one.",
+    )
+    segment_age: float = Field(
+        default=86400.0,
+        gt=0,
+        description="Age of a segment that starts a new one.",
+    )
+    compresslevel: int = Field(
+        default=6,
+        ge=1,
+        le=9,
+        description="gzip compression level of the segments.",
+    )
+    batch_records: int = Field(
+        default=1000,
+        ge=1,
+        description="Number of responses compressed together.",
+    )
+
+
+class ReplayConfig(BaseModel):
+    """Configuration class for replaying the raw archive.
+
+    Attributes:
+        workers (int | None): Number of worker processes, one per CPU if
+            None.
+        chunk_records (int): Number of responses dispatched to a worker at
+            once.
+        max_pending (int): Number of chunks in flight per worker, which
+            bounds the memory held by results not yet written.
+    """
+
+    workers: int | None = Field(
+        default=None,
+        ge=1,
+        description="Number of worker processes.",
+    )
+    chunk_records: int = Field(
+        default=5000,
+        ge=1,
+        description="Number of responses dispatched at once.",
+    )
+    max_pending: int = Field(
+        default=2,
+        ge=1,
+        description="Number of chunks in flight per worker.",
+    )
+
+
+class ShardConfig(BaseModel):
+    """Configuration class for the sharded pipeline.
+
+    Attributes:
+        count (int): Number of shards the locations are split into.
+        work_dir (Path): Directory holding one working directory per
+            shard.
+    """
+
+    count: int = Field(
+        default=4,
+        ge=1,
+        description="Number of shards the locations are split into.",
+    )
+    work_dir: Path = Field(
+        default=Path("data/shards"),
+        description="Directory holding the working directories of shards.",
+    )
+
+
+class ValidationConfig(BaseModel):
+    """Configuration class for the validation stage.
+
+    Attributes:
+        quarantine_path (Path): Path to the JSONL file receiving rejected
+            records with the reasons they were rejected.
+        monotonic (bool): Whether a record older than an earlier record
+            of its location in the same batch, or than the latest one
+            loaded according to the dedup index, is rejected.
+    """
+
+    quarantine_path: Path = Field(
+        default=Path("data/quarantine/quarantine.jsonl"),
+        description="Path to the file receiving rejected records.",
+    )
+    monotonic: bool = Field(
+        default=True,
+        description="Whether out-of-order observations are rejected.",
+    )
+
+
+class RetentionConfig(BaseModel):
+    """Configuration class for the retention of working files.
+
+    Files below `paths` are removed oldest first once they are older than
+    `max_age`, or do not fit into `max_bytes` or `max_files` together
+    with the newer ones. Files younger than `min_age` are never removed,
+    so the working files of running stages are safe.
+
+    Attributes:
+        paths (list[Path]): Directories swept recursively.
+        max_age (float | None): Age in seconds after which a file is
+            removed, no limit if None.
+        max_bytes (int | None): Total size of the files kept, no limit if
+            None.
+        max_files (int | None): Number of files kept, no limit if None.
+        min_age (float): Age in seconds below which a file is kept.
+    """
+
+    paths: list[Path] = Field(
+        default_factory=lambda: [
+            Path("data/raw"),
+            Path("data/processed"),
+            Path("data/runs"),
+            Path("data/shards"),
+        ],
+        description="Directories swept recursively.",
+    )
+    max_age: float | None = Field(
+        default=7 * 86400.0,
+        gt=0,
+        description="Age after which a file is removed.",
+    )
+    max_bytes: int | None = Field(
+        default=None,
+        ge=0,
+        description="Total size of the files kept.",
+    )
+    max_files: int | None = Field(
+        default=None,
+        ge=0,
+        description="Number of files kept.",
+    )
+    min_age: float = Field(
+        default=600.0,
+        ge=0,
+        description="Age below which a file is kept.",
+    )
+
+
 class Config(BaseModel):
     """Main configuration class.
 
     Attributes:
         latitude (float): Latitude of the weather location
         longitude (float): Longitude of the weather location
+        locations (list[Location]): Locations to collect weather data for.
+            Defaults to the single location given by latitude and longitude.
         secrets (SecretsConfig): Configuration for secrets
+        fetch (FetchConfig): Configuration for fetching data from the API.
+        cache (CacheConfig): Configuration for the response cache.
+        polling (PollConfig): Configuration for the adaptive polling
+            schedule.
         raw_path (Path): Path to the raw data file.
+        raw_batch_path (Path): Path to the raw JSONL file of a batch.
         processed_path (Path): Path to the processed data file.
+        fields (list[FieldSpec]): Columns extracted from the raw payloads,
+            in sink order. Must start with "location" and "dt".
         sink_path (Path): Path to the data sink.
+        sink_backend (str): Format of the data sink, "csv" appends to
+            sink_path, "parquet" writes to the columnar dataset, "sqlite"
+            upserts into the SQLite database.
+        columnar (ColumnarConfig): Configuration for the Parquet sink.
+        sqlite (SqliteConfig): Configuration for the SQLite sink.
+        writer (WriterConfig): Configuration for the CSV sink writer.
+        dedup_index_path (Path | None): Path to the index of loaded
+            (location, dt) keys. If set, loading skips duplicates.
+        sink_index_path (Path | None): Path to the index of (location, day)
+            byte ranges in the CSV sink. If set, loading keeps it current.
+        aggregates_path (Path | None): Path to the SQLite store of hourly
+            and daily aggregates. If set, loading keeps it current.
+        metrics (MetricsConfig): Configuration for stage metrics.
+        backfill (BackfillConfig): Configuration for historical backfills.
+        archive (ArchiveConfig): Configuration for the raw archive.
+        replay (ReplayConfig): Configuration for replaying the archive.
+        shards (ShardConfig): Configuration for the sharded pipeline.
+        runs_dir (Path): Directory holding the working directories of runs.
+        retention (RetentionConfig): Configuration for the retention of
+            working files.
+        validation (ValidationConfig): Configuration for the validation
+            stage.
     """
 
     latitude: float = Field(
@@ -47,19 +664,132 @@ class Config(BaseModel):
         le=180,
         description="Longitude of the location to collect weather data for.",
     )
+    locations: list[Location] = Field(
+        default_factory=list,
+        description="Locations to collect weather data for.",
+    )
     secrets: SecretsConfig
+    fetch: FetchConfig = Field(
+        default_factory=FetchConfig,
+        description="Configuration for fetching data from the API.",
+    )
+    cache: CacheConfig = Field(
+        default_factory=CacheConfig,
+        description="Configuration for the response cache.",
+    )
+    polling: PollConfig = Field(
+        default_factory=PollConfig,
+        description="Configuration for the adaptive polling schedule.",
+    )
     raw_path: Path = Field(
         default=Path("data/raw/raw.json"),
         description="Path to the raw data file.",
     )
+    raw_batch_path: Path = Field(
+        default=Path("data/raw/raw.jsonl"),
+        description="Path to the raw JSONL file of a batch.",
+    )
     processed_path: Path = Field(
         default=Path("data/processed/processed.csv"),
         description="Path to the processed data file.",
     )
+    fields: list[FieldSpec] = Field(
+        default_factory=lambda: list(WEATHER_FIELDS),
+        description="Columns extracted from the raw payloads.",
+    )
     sink_path: Path = Field(
         default=Path("data/data.csv"),
         description="Path to the data sink.",
     )
+    sink_backend: Literal["csv", "parquet", "sqlite"] = Field(
+        default="csv",
+        description="Format of the data sink.",
+    )
+    columnar: ColumnarConfig = Field(
+        default_factory=ColumnarConfig,
+        description="Configuration for the Parquet sink.",
+    )
+    sqlite: SqliteConfig = Field(
+        default_factory=SqliteConfig,
+        description="Configuration for the SQLite sink.",
+    )
+    writer: WriterConfig = Field(
+        default_factory=WriterConfig,
+        description="Configuration for the CSV sink writer.",
+    )
+    dedup_index_path: Path | None = Field(
+        default=None,
+        description="Path to the index of loaded (location, dt) keys.",
+    )
+    sink_index_path: Path | None = Field(
+        default=None,
+        description="Path to the index of (location, day) byte ranges.",
+    )
+    aggregates_path: Path | None = Field(
+        default=None,
+        description="Path to the store of hourly and daily aggregates.",
+    )
+    metrics: MetricsConfig = Field(
+        default_factory=MetricsConfig,
+        description="Configuration for stage metrics.",
+    )
+    backfill: BackfillConfig = Field(
+        default_factory=BackfillConfig,
+        description="Configuration for historical backfills.",
+    )
+    archive: ArchiveConfig = Field(
+        default_factory=ArchiveConfig,
+        description="Configuration for the raw archive.",
+    )
+    replay: ReplayConfig = Field(
+        default_factory=ReplayConfig,
+        description="Configuration for replaying the archive.",
+    )
+    shards: ShardConfig = Field(
+        default_factory=ShardConfig,
+        description="Configuration for the sharded pipeline.",
+    )
+    runs_dir: Path = Field(
+        default=Path("data/runs"),
+        description="Directory holding the working directories of runs.",
+    )
+    retention: RetentionConfig = Field(
+        default_factory=RetentionConfig,
+        description="Configuration for the retention of working files.",
+    )
+    validation: ValidationConfig = Field(
+        default_factory=ValidationConfig,
+        description="Configuration for the validation stage.",
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, fields: list[FieldSpec]) -> list[FieldSpec]:
+        """Ensure the record key leads the columns and names are unique."""
+        names = [f.name for f in fields]
+        if names[:2] != ["location", "dt"]:
+            raise ValueError('fields must start with "location" and "dt"')
+        if len(set(names)) != len(names):
+            raise ValueError("field names must be unique")
+        return fields
+
+    @field_validator("locations")
+    @classmethod
+    def check_locations(cls, locations: list[Location]) -> list[Location]:
+        """Ensure every location has its own key."""
+        keys = [location.key for location in locations]
+        if len(set(keys)) != len(keys):
+            raise ValueError("location keys must be unique")
+        return locations
+
+    @model_validator(mode="after")
+    def default_locations(self) -> "Config":
+        """Fall back to the single configured location if none are listed."""
+        if not self.locations:
+            self.locations = [
+                Location(latitude=self.latitude, longitude=self.longitude)
+            ]
+        return self
 
     @classmethod
     def from_file(cls, path: str | Path) -> "Config":
@@ -96,3 +826,45 @@ class Config(BaseModel):
 
         # Instantiate Config class
         return cls(**config_data)
+
+
+# configs loaded by `load_config`, keyed by resolved path
+_CONFIG_CACHE: dict[Path, tuple[tuple[int, int | None], Config]] = {}
+
+
+def load_config(path: str | Path) -> Config:
+    """
+    Load the configuration from a YAML file, reusing the previous result
+    while neither the file nor the `.env` file changed.
+
+    The cache is keyed on the modification times of both files, so a task
+    process resolving the config repeatedly parses and validates it only
+    once. Secrets set through environment variables are read on the first
+    load and not watched.
+
+    Args:
+        path (str | Path): Path to the YAML configuration file.
+
+    Returns:
+        Config: The configuration.
+
+    Raises:
+        FileNotFoundError: If the configuration file does not exist.
+    """
+    path = Path(path).resolve()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Configuration file at {path} does not exist."
+        ) from None
+    env_file = Path(SecretsConfig.model_config["env_file"])
+    env_mtime = env_file.stat().st_mtime_ns if env_file.exists() else None
+    version = (mtime, env_mtime)
+
+    cached = _CONFIG_CACHE.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    config = Config.from_file(path)
+    _CONFIG_CACHE[path] = (version, config)
+    return config
@@ -0,0 +1,302 @@
+import dbm
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .records import WeatherBatch
+
+# suffixes of the files the dbm backends create for a database path
+DBM_SUFFIXES = ("", ".db", ".dat", ".dir", ".bak", ".pag", "-wal", "-shm")
+
+# prefix of the keys holding the latest observation time of a location;
+# no record key starts with a NUL byte
+LATEST_PREFIX = "\x00latest\x1f"
+
+
+class DedupIndex:
+    """Persistent hash index of the (location, dt) keys in the sink.
+
+    Keys live in a `dbm` hash file, so a membership test or insert costs
+    O(1) without loading the index into memory. The index also keeps the
+    latest observation time loaded per location, so new records can be
+    checked against it. Use it as a context manager to close the file.
+
+    Attributes:
+        path (Path): Path to the index file.
+        readonly (bool): Whether the index is opened for lookups only.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._db = dbm.open(str(path), "r")
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = dbm.open(str(path), "c")
+        self._latest: dict[str, int | None] = {}
+
+    def __enter__(self) -> "DedupIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the index file."""
+        self._db.close()
+
+    @staticmethod
+    def _key(location: str, dt: int) -> bytes:
+        return f"{location}\x1f{dt}".encode()
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        return self._key(*key) in self._db
+
+    def add(self, location: str, dt: int) -> bool:
+        """
+        Insert a key into the index.
+
+        Args:
+            location (str): Location of the record.
+            dt (int): Observation time of the record in Unix seconds.
+
+        Returns:
+            bool: True if the key was new, False if it was present.
+        """
+        key = self._key(location, dt)
+        if key in self._db:
+            return False
+        self._db[key] = b""
+        latest = self.latest(location)
+        if latest is None or dt > latest:
+            self._latest[location] = dt
+            self._db[LATEST_PREFIX + location] = str(dt).encode()
+        return True
+
+    def latest(self, location: str) -> int | None:
+        """
+        Look up the latest observation time indexed for a location.
+
+        Args:
+            location (str): Location of the records.
+
+        Returns:
+            int | None: Observation time in Unix seconds, None if no
+            record of the location is indexed.
+        """
+        if location not in self._latest:
+            value = self._db.get(LATEST_PREFIX + location)
+            self._latest[location] = int(value) if value is not None else None
+        return self._latest[location]
+
+
+def latest_observations(
+    index: DedupIndex, locations: Iterable[str]
+) -> dict[str, int]:
+    """
+    Look up the latest observation time indexed per location.
+
+    Args:
+        index (DedupIndex): Index of the keys in the sink.
+        locations (Iterable[str]): Locations to look up.
+
+    Returns:
+        dict[str, int]: Observation times in Unix seconds of the
+        locations with an indexed record.
+    """
+    latest = {}
+    for location in locations:
+        dt = index.latest(location)
+        if dt is not None:
+            latest[location] = dt
+    return latest
+
+
+def parse_key(line: str) -> tuple[str, int]:
+    """
+    Extract the (location, dt) key from a semicolon-separated CSV line.
+
+    Args:
+        line (str): CSV line in the sink layout.
+
+    Returns:
+        tuple[str, int]: Location and observation time.
+    """
+    location, dt, _ = line.split(";", 2)
+    return location, int(dt)
+
+
+def filter_new_lines(index: DedupIndex, lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield only the CSV lines whose key is not yet indexed.
+
+    Duplicates within `lines` are dropped as well. Add the keys of the
+    yielded lines with `add_lines` once they are committed to the sink,
+    so an interrupted load can leave a record unindexed but never indexed
+    and missing.
+
+    Args:
+        index (DedupIndex): Index of the keys already in the sink.
+        lines (Iterable[str]): CSV lines in the sink layout.
+
+    Yields:
+        str: Lines with a new key.
+    """
+    seen = set()
+    for line in lines:
+        key = parse_key(line)
+        if key not in seen and key not in index:
+            seen.add(key)
+            yield line
+
+
+def add_lines(index: DedupIndex, lines: Iterable[str]) -> None:
+    """
+    Add the keys of CSV lines to the index.
+
+    Args:
+        index (DedupIndex): Index of the keys in the sink.
+        lines (Iterable[str]): CSV lines in the sink layout.
+    """
+    for line in lines:
+        index.add(*parse_key(line))
+
+
+def table_keys(table: pa.Table) -> list[tuple[str, int]]:
+    """
+    Extract the (location, dt) keys of a weather table.
+
+    Args:
+        table (pa.Table): Table with `location` and `dt` columns.
+
+    Returns:
+        list[tuple[str, int]]: One key per row.
+    """
+    locations = table.column("location").to_pylist()
+    dts = pc.cast(table.column("dt"), pa.int64()).to_pylist()
+    return list(zip(locations, dts, strict=True))
+
+
+def filter_new_rows(index: DedupIndex, table: pa.Table) -> pa.Table:
+    """
+    Keep only the rows of a weather table whose key is not yet indexed.
+    Duplicates within the table are dropped as well. Add the keys of the
+    returned rows with `add_rows` once they are written.
+
+    Args:
+        index (DedupIndex): Index of the keys already in the sink.
+        table (pa.Table): Table following WEATHER_SCHEMA.
+
+    Returns:
+        pa.Table: The rows with a new key.
+    """
+    seen = set()
+    mask = []
+    for key in table_keys(table):
+        mask.append(key not in seen and key not in index)
+        seen.add(key)
+    return table.filter(pa.array(mask, type=pa.bool_()))
+
+
+def add_rows(index: DedupIndex, table: pa.Table) -> None:
+    """
+    Add the keys of all rows of a weather table to the index.
+
+    Args:
+        index (DedupIndex): Index of the keys in the sink.
+        table (pa.Table): Table following WEATHER_SCHEMA.
+    """
+    for location, dt in table_keys(table):
+        index.add(location, dt)
+
+
+def filter_new_records(index: DedupIndex, batch: WeatherBatch) -> WeatherBatch:
+    """
+    Keep only the records of a batch whose key is not yet indexed.
+    Duplicates within the batch are dropped as well. Add the keys of the
+    returned records with `add_records` once they are written.
+
+    Args:
+        index (DedupIndex): Index of the keys already in the sink.
+        batch (WeatherBatch): Batch of weather records.
+
+    Returns:
+        WeatherBatch: The records with a new key.
+    """
+    seen = set()
+    keep = []
+    for i, key in enumerate(batch.keys()):
+        if key not in seen and key not in index:
+            keep.append(i)
+        seen.add(key)
+    if len(keep) == len(batch):
+        return batch
+    return batch.take(keep)
+
+
+def add_records(index: DedupIndex, batch: WeatherBatch) -> None:
+    """
+    Add the keys of all records of a batch to the index.
+
+    Args:
+        index (DedupIndex): Index of the keys in the sink.
+        batch (WeatherBatch): Batch of weather records.
+    """
+    for location, dt in batch.keys():
+        index.add(location, dt)
+
+
+def iter_sink_keys(sink_path: Path) -> Iterator[tuple[str, int]]:
+    """
+    Yield the (location, dt) key of every line in the CSV sink.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+
+    Yields:
+        tuple[str, int]: Location and observation time.
+    """
+    with open(sink_path) as f:
+        for line in f:
+            if line.strip():
+                yield parse_key(line)
+
+
+def dbm_files(path: Path) -> list[Path]:
+    """
+    List the files of a dbm database, without unrelated files that share
+    its name as a prefix.
+
+    Args:
+        path (Path): Path the database was opened at.
+
+    Returns:
+        list[Path]: Existing files of the database.
+    """
+    files = (path.with_name(path.name + suffix) for suffix in DBM_SUFFIXES)
+    return [file for file in files if file.is_file()]
+
+
+def rebuild_dedup_index(
+    index_path: Path, keys: Iterable[tuple[str, int]]
+) -> int:
+    """
+    Rebuild the index from the keys of a sink, e.g. `iter_sink_keys` or
+    `columnar.iter_dataset_keys`.
+
+    Args:
+        index_path (Path): Path to the index file, replaced entirely.
+        keys (Iterable[tuple[str, int]]): Keys of all records in the sink.
+
+    Returns:
+        int: Number of distinct keys in the rebuilt index.
+    """
+    # start from an empty index, dbm backends may use several files
+    for path in dbm_files(index_path):
+        path.unlink()
+
+    with DedupIndex(index_path) as index:
+        return sum(index.add(location, dt) for location, dt in keys)
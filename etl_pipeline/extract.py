@@ -1,59 +1,405 @@
 import json
-from datetime import datetime
+import logging
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import requests
 from pydantic import SecretStr
+from requests.adapters import HTTPAdapter
 
-from .config import Config
+from .archive import RawArchive
+from .cache import ResponseCache, grid_cell, group_by_cell
+from .config import Config, Location
+from .fetch import FetchEngine
+from .metrics import (
+    NULL_METRICS,
+    NullStageMetrics,
+    StageMetrics,
+    stage_metrics,
+)
+from .polling import PollSchedule
 
+logger = logging.getLogger(__name__)
 
-def fetch_weather_data(config: Config) -> None:
+API_PATH = "/data/2.5/weather"
+
+
+@dataclass
+class FetchResult:
+    """Outcome of fetching weather data for a batch of locations.
+
+    Attributes:
+        payloads (dict[str, dict]): Raw responses keyed by location key.
+        failures (dict[str, str]): Error messages keyed by location key.
+        unchanged (list[str]): Keys of locations whose observation did not
+            change since the last run.
+        deferred (list[str]): Keys of locations not polled because no new
+            observation is expected yet or the request budget was spent.
+        observed (dict[str, int]): Observation times of the yielded
+            payloads keyed by location key, to commit to the response
+            cache once they are loaded.
+        state (list[ResponseCache | PollSchedule]): Response cache and
+            polling schedule left unsaved for the caller, see
+            `save_state`.
+    """
+
+    payloads: dict[str, dict] = field(default_factory=dict)
+    failures: dict[str, str] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+    deferred: list[str] = field(default_factory=list)
+    observed: dict[str, int] = field(default_factory=dict)
+    state: list[ResponseCache | PollSchedule] = field(default_factory=list)
+
+    def save_state(self) -> None:
+        """Persist the response cache and polling schedule of the fetch."""
+        for store in self.state:
+            store.save()
+        self.state.clear()
+
+
+def build_weather_url(
+    location: Location, api_key: SecretStr, base_url: str
+) -> str:
+    """
+    Build the OpenWeatherMap current weather URL for a location.
+
+    Args:
+        location (Location): Location to fetch weather data for.
+        api_key (SecretStr): API key for accessing the OpenWeatherMap API.
+        base_url (str): Base URL of the API.
+
+    Returns:
+        str: The request URL.
     """
-    Fetches current weather data from OpenWeatherMap API for given latitude
-    and longitude.
+    return (
+        f"{base_url}{API_PATH}?"
+        f"lat={location.latitude}&lon={location.longitude}"
+        f"&appid={api_key.get_secret_value()}"
+        f"&units=metric"
+    )
+
+
+def create_session(config: Config) -> requests.Session:
+    """
+    Create an HTTP session whose connection pool is sized to the
+    configured concurrency, so keep-alive connections are reused.
+
+    Args:
+        config (Config): Configuration object containing fetch settings.
+
+    Returns:
+        requests.Session: A session with a pooled HTTPS adapter.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config.fetch.max_concurrency,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def request_weather(
+    engine: FetchEngine,
+    location: Location,
+    api_key: SecretStr,
+) -> dict:
+    """
+    Request current weather data for a single location.
+
+    Args:
+        engine (FetchEngine): Engine used to send the request.
+        location (Location): Location to fetch weather data for.
+        api_key (SecretStr): API key for accessing the OpenWeatherMap API.
+
+    Raises:
+        FetchError: If the API request fails or returns an error.
+        ValueError: If the response is not valid JSON.
+
+    Returns:
+        dict: The decoded response.
+    """
+    res = engine.get(
+        build_weather_url(location, api_key, engine.config.base_url)
+    )
+
+    # if the response is not JSON, raise an error
+    try:
+        return res.json()
+    except json.JSONDecodeError as e:
+        raise ValueError("Invalid JSON in response") from e
+
+
+def fetch_weather_data(
+    config: Config, report: FetchResult | None = None
+) -> bool:
+    """
+    Fetches current weather data from OpenWeatherMap API for the single
+    configured location. Use `fetch_weather_batch` for several locations.
+
+    If the response cache is enabled, a fresh cached response for the same
+    grid cell is used instead of calling the API, and an observation whose
+    `dt` matches the last one loaded is reported as unchanged and not
+    written. The new observation stays pending in the cache until
+    `commit_observations` is called with `report.observed` after the
+    load.
 
     Args:
         config (Config): Configuration object containing API key and
         coordinates.
+        report (FetchResult | None): Collects the observation time of a
+        new observation in `observed`, keyed by location key.
 
     Raises:
-        Exception: If the API request fails or returns an error.
+        ValueError: If more than one location is configured.
+        FetchError: If the API request fails or returns an error after
+        all retries.
 
     Returns:
-        None: Writes the weather data to a JSON file.
+        bool: False if the observation is unchanged, True otherwise. Writes
+        new weather data to a JSON file.
     """
     # extract parameters from config
-    latitude: float = config.latitude
-    longitude: float = config.longitude
+    if len(config.locations) != 1:
+        raise ValueError(
+            f"fetch_weather_data fetches a single location, got "
+            f"{len(config.locations)}; use fetch_weather_batch instead"
+        )
+    location: Location = config.locations[0]
     api_key: SecretStr = config.secrets.api_key
     raw_path: Path = config.raw_path
 
-    # ensure the raw_path directory exists
-    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    with stage_metrics(config, "extract") as metrics:
+        # look up the cache before calling the API
+        cache = None
+        response = None
+        if config.cache.path is not None:
+            cache = ResponseCache.from_config(config.cache)
+            cell = grid_cell(location, cache.grid)
+            response = cache.get(cell)
 
-    # fetch raw data from OpenWeatherMap API
-    url = (
-        f"https://api.openweathermap.org/data/2.5/weather?"
-        f"lat={latitude}&lon={longitude}"
-        f"&appid={api_key.get_secret_value()}"
-        f"&units=metric"
-    )
-    res = requests.get(url)
-    if res.status_code != 200:
-        raise Exception(f"Error fetching data: {res.status_code} - {res.text}")
+        # fetch raw data from OpenWeatherMap API
+        if response is None:
+            with create_session(config) as session:
+                engine = FetchEngine(config.fetch, session, metrics=metrics)
+                response = request_weather(engine, location, api_key)
+            if cache is not None:
+                cache.put(cell, response)
 
-    # if the response is not JSON, raise an error
-    try:
-        response = res.json()
-    except json.JSONDecodeError as e:
-        raise ValueError("Invalid JSON in response") from e
+        # stop if the observation did not change since the last load
+        if cache is not None:
+            changed = cache.is_new(location.key, response.get("dt"))
+            if changed:
+                cache.observe(location.key, response.get("dt"))
+            cache.save()
+            if not changed:
+                return False
+        if report is not None:
+            report.observed[location.key] = response.get("dt")
+
+        # archive the response before the raw file is replaced
+        if config.archive.enabled:
+            with RawArchive.from_config(config) as archive:
+                entry = archive.append([response])
+            metrics.add(bytes_archived=entry.length)
+
+        # write the response to the raw_path file, creating its directory
+        # only now, so an unchanged run leaves none behind
+        raw_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(raw_path, "w") as f:
+            json.dump(response, f)
+            metrics.add(records_out=1, bytes_written=f.tell())
+        return True
+
+
+def stream_weather_data(
+    config: Config,
+    report: FetchResult | None = None,
+    metrics: StageMetrics | NullStageMetrics = NULL_METRICS,
+    save_state: bool = True,
+) -> Iterator[tuple[str, dict]]:
+    """
+    Fetches current weather data for all configured locations concurrently
+    over one pooled session and yields each payload as soon as it arrives.
+
+    At most `config.fetch.max_concurrency` requests are in flight at once
+    and all of them share one rate limiter and circuit breaker. A failing
+    location does not abort the stream; its error is recorded in
+    `report.failures` instead.
+
+    If the response cache is enabled, locations in the same grid cell
+    share one API call, fresh cached responses are reused, and payloads
+    whose `dt` matches the last one loaded for their location are
+    recorded in `report.unchanged` instead of being yielded. The cache is
+    saved only once the stream is exhausted, and the yielded observations
+    stay pending in it until the caller commits `report.observed` with
+    `commit_observations` after loading them. Every payload is yielded as
+    a copy named after the key of its location, so the members of a
+    shared cell are stored as distinct rows and a site keeps the same
+    name as in backfilled history.
+
+    If the polling schedule is enabled, only locations whose next update
+    is expected are polled, most overdue first, and at most
+    `config.polling.budget` API requests are sent; the other locations
+    are recorded in `report.deferred`.
+
+    Args:
+        config (Config): Configuration object containing API key,
+        locations and fetch settings.
+        report (FetchResult | None): Collects failed and unchanged
+        locations. Its payloads are left untouched.
+        metrics (StageMetrics | NullStageMetrics): Recorder of requests
+        and yielded records.
+        save_state (bool): Whether to save the cache and polling schedule
+        once the stream is exhausted. If False, they are left in
+        `report.state` for the caller to save with `report.save_state`
+        once the payloads are written.
+
+    Yields:
+        tuple[str, dict]: Location key and raw response.
+    """
+    # extract parameters from config
+    locations: list[Location] = config.locations
+    api_key: SecretStr = config.secrets.api_key
+    if report is None:
+        report = FetchResult()
+
+    # poll only the locations that are due for a new observation
+    schedule = None
+    if config.polling.path is not None:
+        schedule = PollSchedule.from_config(config.polling)
+        due = schedule.due(locations)
+        keys = {location.key for location in due}
+        report.deferred.extend(
+            location.key for location in locations if location.key not in keys
+        )
+        locations = due
+
+    # without a cache every location is requested on its own
+    cache = None
+    if config.cache.path is not None:
+        cache = ResponseCache.from_config(config.cache)
+        cells = group_by_cell(locations, cache.grid)
+    else:
+        cells = {location.key: [location] for location in locations}
+
+    def emit(members: list[Location], payload: dict):
+        dt = payload.get("dt")
+        for member in members:
+            if schedule is not None:
+                schedule.observe(member.key, dt)
+            if cache is not None and not cache.is_new(member.key, dt):
+                report.unchanged.append(member.key)
+                continue
+            if cache is not None:
+                cache.observe(member.key, dt)
+            report.observed[member.key] = dt
+            metrics.add(records_out=1)
+            yield member.key, {**payload, "name": member.key}
+
+    # serve cells with a fresh cached response without calling the API
+    pending = {}
+    for cell, members in cells.items():
+        payload = cache.get(cell) if cache is not None else None
+        if payload is None:
+            pending[cell] = members
+        else:
+            yield from emit(members, payload)
+
+    # defer the cells beyond the request budget to the next run
+    budget = config.polling.budget if schedule is not None else None
+    if budget is not None and len(pending) > budget:
+        over_budget = list(pending)[budget:]
+        for cell in over_budget:
+            report.deferred.extend(m.key for m in pending.pop(cell))
+        metrics.add(requests_deferred=len(over_budget))
+
+    # fetch one location per remaining cell through a bounded pool
+    with (
+        create_session(config) as session,
+        ThreadPoolExecutor(
+            max_workers=config.fetch.max_concurrency
+        ) as executor,
+    ):
+        engine = FetchEngine(config.fetch, session, metrics=metrics)
+        futures = {
+            executor.submit(request_weather, engine, members[0], api_key): cell
+            for cell, members in pending.items()
+        }
+        for future in as_completed(futures):
+            cell = futures[future]
+            members = pending[cell]
+            try:
+                payload = future.result()
+            except Exception as e:
+                for member in members:
+                    logger.warning("Fetching %s failed: %s", member.key, e)
+                    report.failures[member.key] = str(e)
+                continue
+            if cache is not None:
+                cache.put(cell, payload)
+            yield from emit(members, payload)
+
+    # persist the state only once the stream completed, or leave it to
+    # the caller
+    for store in (cache, schedule):
+        if store is not None:
+            report.state.append(store)
+    if save_state:
+        report.save_state()
+
+
+def fetch_weather_batch(
+    config: Config, save_state: bool = True
+) -> FetchResult:
+    """
+    Fetches current weather data for all configured locations concurrently
+    and writes them to a JSONL file.
+
+    Args:
+        config (Config): Configuration object containing API key,
+        locations and fetch settings.
+        save_state (bool): Whether to save the cache and polling schedule
+        once all locations are fetched. If False, the caller saves them
+        with `FetchResult.save_state` once the payloads are written.
+
+    Returns:
+        FetchResult: Payloads, failures and unchanged locations. The
+        payloads are also written to `config.raw_batch_path` as JSONL.
+    """
+    # extract parameters from config
+    locations: list[Location] = config.locations
+    raw_batch_path: Path = config.raw_batch_path
+    result = FetchResult()
+
+    # ensure the raw_batch_path directory exists
+    raw_batch_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with stage_metrics(config, "extract") as metrics:
+        # fetch all locations
+        for key, payload in stream_weather_data(
+            config, result, metrics, save_state
+        ):
+            result.payloads[key] = payload
+
+        # archive the responses before the raw file is replaced
+        payloads = [
+            result.payloads[location.key]
+            for location in locations
+            if location.key in result.payloads
+        ]
+        if config.archive.enabled and payloads:
+            with RawArchive.from_config(config) as archive:
+                entry = archive.append(payloads)
+            metrics.add(bytes_archived=entry.length)
 
-    # if file exists, rename it with a date and time suffix
-    if raw_path.exists():
-        dt = datetime.now().strftime("%Y%m%d%H%M%S")
-        raw_path.rename(raw_path.with_name(raw_path.stem + f"_{dt}.bak"))
+        # write one response per line to the raw_batch_path file
+        with open(raw_batch_path, "w") as f:
+            for payload in payloads:
+                f.write(json.dumps(payload) + "\n")
+            metrics.add(bytes_written=f.tell())
 
-    # write the response to the raw_path file
-    with open(raw_path, "w") as f:
-        json.dump(response, f)
+    return result
@@ -0,0 +1,336 @@
+import random
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .config import FetchConfig
+from .metrics import NULL_METRICS, NullStageMetrics, StageMetrics
+
+# status codes that signal a transient problem on the provider side
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    """Raised when a request fails and is not retried any further.
+
+    Attributes:
+        status_code (int | None): HTTP status code of the last response,
+            None if no response was received.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(FetchError):
+    """Raised when the circuit breaker rejects a request."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the rate of requests.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Each call to `acquire` reserves one token and sleeps until it is
+    available, so concurrent callers are spaced out evenly.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of stored tokens (burst size).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Reserve one token, blocking until it is available.
+
+        Returns:
+            float: Seconds spent waiting for the token.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        # sleep outside the lock so other callers can queue up behind us
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker guarding an upstream service.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects requests for `reset_timeout` seconds. It then lets a single
+    probe request through; a success closes it again, a failure reopens
+    it for another `reset_timeout`.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the breaker.
+        reset_timeout (float): Seconds the breaker stays open.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state, one of "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> str | None:
+        """
+        Check whether a request may be sent.
+
+        Returns:
+            str | None: "closed" if the breaker is closed, "probe" if the
+            caller is let through as the probe and must end it with
+            `record_success`, `record_failure` or `release_probe`, None if
+            the request is rejected.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            elapsed = self._clock() - self._opened_at
+            if elapsed >= self.reset_timeout and not self._probing:
+                self._probing = True
+                return "probe"
+            return None
+
+    def record_success(self) -> None:
+        """Record a successful request and close the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Record a failed request and open the breaker if needed."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """
+        End a probe that neither succeeded nor failed, e.g. one that was
+        rate limited or raised unexpectedly, so the next request may probe
+        again. Only the caller that `allow` let through as the probe may
+        release it.
+        """
+        with self._lock:
+            self._probing = False
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        value (str | None): Value of the Retry-After header.
+
+    Returns:
+        float | None: Seconds to wait, None if the header is missing or
+        invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    retry_after: float | None = None,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """
+    Compute the delay before a retry using exponential backoff with full
+    jitter.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        base (float): Delay of the first retry in seconds.
+        cap (float): Maximum delay in seconds.
+        retry_after (float | None): Delay requested by the server, which
+            is used as a lower bound up to `cap`.
+        rng (Callable[[], float]): Source of random numbers in [0, 1).
+
+    Returns:
+        float: Seconds to wait before the next attempt, at most `cap`.
+    """
+    delay = rng() * min(cap, base * 2**attempt)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, cap)
+
+
+class FetchEngine:
+    """Rate-limited, retrying HTTP client shared by all requests of a run.
+
+    Every attempt first passes the circuit breaker and then takes a token
+    from the rate limiter. Connection errors, timeouts and retryable
+    status codes are retried with jittered exponential backoff, honouring
+    the Retry-After header up to `backoff_max`. Other error responses fail
+    immediately. A 429 signals the rate limit, not an unhealthy provider,
+    so it does not count towards opening the circuit breaker.
+
+    Attributes:
+        config (FetchConfig): Fetch settings.
+        session (requests.Session): Session used to send the requests.
+        limiter (TokenBucket): Rate limiter sized to the API plan.
+        breaker (CircuitBreaker): Circuit breaker guarding the provider.
+        metrics (StageMetrics | NullStageMetrics): Recorder of status
+            codes and request latencies.
+    """
+
+    def __init__(
+        self,
+        config: FetchConfig,
+        session: requests.Session,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        metrics: StageMetrics | NullStageMetrics = NULL_METRICS,
+    ):
+        self.config = config
+        self.session = session
+        self.metrics = metrics
+        self._sleep = sleep
+        self.limiter = TokenBucket(
+            rate=config.requests_per_minute / 60,
+            capacity=config.burst,
+            clock=clock,
+            sleep=sleep,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.breaker_threshold,
+            reset_timeout=config.breaker_reset_timeout,
+            clock=clock,
+        )
+
+    def get(self, url: str) -> requests.Response:
+        """
+        Send a GET request, retrying transient failures.
+
+        Args:
+            url (str): URL to request.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the request.
+            FetchError: If the request fails permanently or runs out of
+            retries.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        attempt = 0
+        while True:
+            permit = self.breaker.allow()
+            if permit is None:
+                raise CircuitOpenError(
+                    "Error fetching data: circuit breaker is open"
+                )
+            self.limiter.acquire()
+
+            # send the request, treating network errors as retryable; the
+            # probe of this request is released if it ends without a
+            # verdict, a probe of another request is left alone
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                try:
+                    res = self.session.get(url, timeout=self.config.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self.metrics.observe_request(
+                        "error", time.perf_counter() - start
+                    )
+                    self.breaker.record_failure()
+                    error = FetchError(f"Error fetching data: {e}")
+                else:
+                    self.metrics.observe_request(
+                        res.status_code, time.perf_counter() - start
+                    )
+                    if res.status_code == 200:
+                        self.breaker.record_success()
+                        return res
+                    error = FetchError(
+                        f"Error fetching data: {res.status_code} - {res.text}",
+                        status_code=res.status_code,
+                    )
+                    if res.status_code not in RETRYABLE_STATUS_CODES:
+                        # the provider answered, so it is healthy
+                        self.breaker.record_success()
+                        raise error
+                    if res.status_code != 429:
+                        self.breaker.record_failure()
+                    retry_after = parse_retry_after(
+                        res.headers.get("Retry-After")
+                    )
+            finally:
+                if permit == "probe":
+                    self.breaker.release_probe()
+
+            # give up or wait before the next attempt; a Retry-After beyond
+            # backoff_max is not waited for
+            if attempt >= self.config.max_retries or (
+                retry_after is not None
+                and retry_after > self.config.backoff_max
+            ):
+                raise error
+            self._sleep(
+                backoff_delay(
+                    attempt,
+                    base=self.config.backoff_base,
+                    cap=self.config.backoff_max,
+                    retry_after=retry_after,
+                )
+            )
+            attempt += 1
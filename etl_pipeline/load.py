@@ -1,6 +1,102 @@
+from collections.abc import Callable, Iterable
+from contextlib import ExitStack
+from itertools import batched
 from pathlib import Path
 
-from .config import Config
+from .aggregates import update_aggregates
+from .columnar import (
+    iter_weather_csv,
+    parse_weather_lines,
+    save_weather_data_columnar,
+)
+from .config import Config, WriterConfig
+from .dedup import DedupIndex, add_lines, filter_new_lines
+from .metrics import stage_metrics
+from .runs import sink_lock
+from .schema import schema_for
+from .sink_index import SinkIndex, sink_size
+from .sqlite_sink import save_weather_data_sqlite
+from .writer import SinkWriter, count_lines
+
+
+def append_weather_records(
+    sink_path: Path,
+    lines: Iterable[str],
+    index_path: Path | None = None,
+    writer: WriterConfig | None = None,
+) -> int:
+    """
+    Append CSV lines to the sink file through the group-commit writer.
+
+    Args:
+        sink_path (Path): Path to the data sink.
+        lines (Iterable[str]): CSV lines, each ending in a newline.
+        index_path (Path | None): Path to the sink index, kept current
+        with the appended lines if set.
+        writer (WriterConfig | None): Batching and durability settings,
+        the defaults if None.
+
+    Returns:
+        int: Number of lines appended.
+    """
+    with ExitStack() as stack:
+        # recover the sink and open it for group commits
+        sink = stack.enter_context(SinkWriter(sink_path, writer))
+
+        # record the byte ranges of the lines as they are written
+        if index_path is not None:
+            index = stack.enter_context(SinkIndex(index_path))
+            index.catch_up(sink_path)
+            lines = index.track(lines, sink_size(sink_path))
+
+        # append the lines to the sink file, creating it if needed
+        count = 0
+        for line in lines:
+            sink.write(line)
+            count += 1
+
+        # index the lines only once they are committed
+        sink.close()
+        if index_path is not None:
+            index.commit()
+    return count
+
+
+def append_weather_file(
+    sink_path: Path,
+    source: Path,
+    index_path: Path | None = None,
+    writer: WriterConfig | None = None,
+) -> int:
+    """
+    Append a file of CSV lines to the sink with kernel-side copies, in
+    constant memory regardless of its size.
+
+    Args:
+        sink_path (Path): Path to the data sink, locked by the caller.
+        source (Path): File of CSV lines; a missing newline at its end is
+        added.
+        index_path (Path | None): Path to the sink index, kept current
+        with the appended lines if set.
+        writer (WriterConfig | None): Durability settings, the defaults if
+        None.
+
+    Returns:
+        int: Number of lines appended.
+    """
+    with ExitStack() as stack:
+        # recover the sink and bring the index up to its end
+        sink = stack.enter_context(SinkWriter(sink_path, writer))
+        if index_path is not None:
+            index = stack.enter_context(SinkIndex(index_path))
+            index.catch_up(sink_path)
+
+        # copy the file, then index the copied lines from the sink
+        sink.append_file(source)
+        sink.close()
+        if index_path is not None:
+            return index.catch_up(sink_path)
+    return count_lines(source)
 
 
 def save_weather_data(
@@ -14,7 +110,29 @@ def save_weather_data(
         data and sink.
 
     Returns:
-        None: Appends the processed data to the sink file.
+        None: Appends the processed data to the sink file, writes it to
+        the columnar dataset if `config.sink_backend` is "parquet", or
+        upserts it into the database if it is "sqlite". If
+        `config.dedup_index_path` is set, records whose (location, dt) is
+        already in the sink are skipped. If `config.aggregates_path` is
+        set, the written records are folded into the aggregates. The sink
+        is locked while loading, so overlapping runs append one at a time.
+    """
+    with stage_metrics(config, "load") as metrics, sink_lock(config):
+        load = SINK_LOADERS[config.sink_backend]
+        metrics.add(records_out=load(config))
+
+
+def _save_weather_data_csv(config: Config) -> int:
+    """
+    Append the processed weather data to the CSV sink.
+
+    Args:
+        config (Config): Configuration object containing paths for processed
+        data and sink.
+
+    Returns:
+        int: Number of lines appended.
     """
     # extract paths from config
     processed_path: Path = config.processed_path
@@ -26,17 +144,40 @@ def save_weather_data(
             f"Processed data file not found: {processed_path}"
             )
 
-    # read processed data
-    with open(processed_path) as f:
-        data_string = f.read()
+    # without deduplication the file is copied as a whole inside the
+    # kernel and parsed for the aggregates only if they are kept
+    schema = schema_for(config)
+    if config.dedup_index_path is None:
+        count = append_weather_file(
+            sink_path, processed_path, config.sink_index_path, config.writer
+        )
+        if config.aggregates_path is not None:
+            for table in iter_weather_csv(processed_path, schema):
+                update_aggregates(config, table)
+        return count
 
-    # ensure the sink_path directory exists
-    sink_path.parent.mkdir(parents=True, exist_ok=True)
+    # otherwise the lines are streamed in chunks, each committed before
+    # its keys are indexed; a last line without a newline is terminated
+    count = 0
+    with (
+        DedupIndex(config.dedup_index_path) as index,
+        open(processed_path) as f,
+    ):
+        lines = (line if line.endswith("\n") else line + "\n" for line in f)
+        for chunk in batched(lines, config.writer.batch_records, strict=False):
+            lines = list(filter_new_lines(index, chunk))
+            count += append_weather_records(
+                sink_path, lines, config.sink_index_path, config.writer
+            )
+            add_lines(index, lines)
+            if config.aggregates_path is not None:
+                update_aggregates(config, parse_weather_lines(lines, schema))
+    return count
 
-    # ensure the sink file exists, if not create it
-    if not sink_path.exists():
-        sink_path.touch(exist_ok=False)
 
-    # append the data to the sink file
-    with open(sink_path, 'a') as f:
-        f.write(data_string)
+# load stage of every sink backend, returning the number of records written
+SINK_LOADERS: dict[str, Callable[[Config], int]] = {
+    "csv": _save_weather_data_csv,
+    "parquet": save_weather_data_columnar,
+    "sqlite": save_weather_data_sqlite,
+}
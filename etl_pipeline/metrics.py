@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import Config
+
+# upper bounds of the request latency histogram in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus layout.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the buckets.
+        counts (list[int]): Observations per bucket, the last entry counts
+            observations above the largest bound.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        """Return the histogram with cumulative bucket counts."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            total += count
+            cumulative.append([bound, total])
+        return {
+            "buckets": cumulative,
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class StageMetrics:
+    """Thread-safe metrics of one pipeline stage run.
+
+    Attributes:
+        stage (str): Name of the stage.
+        seconds (float): Wall time of the stage.
+        counters (Counter): Record, byte and other counts, e.g.
+            `records_in`, `records_out`, `bytes_read`, `bytes_written`.
+        status_codes (Counter): HTTP responses by status code.
+        latency (Histogram): HTTP request latency in seconds.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = 0.0
+        self.counters: Counter = Counter()
+        self.status_codes: Counter = Counter()
+        self.latency = Histogram()
+        self._lock = threading.Lock()
+
+    def add(self, **counts: float) -> None:
+        """
+        Increase counters.
+
+        Args:
+            **counts (float): Amounts keyed by counter name.
+        """
+        with self._lock:
+            self.counters.update(counts)
+
+    def observe_request(self, status: int | str, seconds: float) -> None:
+        """
+        Record an HTTP request.
+
+        Args:
+            status (int | str): Status code, or "error" if no response was
+            received.
+            seconds (float): Latency of the request.
+        """
+        with self._lock:
+            self.status_codes[str(status)] += 1
+            self.latency.observe(seconds)
+
+    def to_dict(self) -> dict:
+        """Return the metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "seconds": self.seconds,
+                "counters": dict(self.counters),
+                "status_codes": dict(self.status_codes),
+                "latency": self.latency.to_dict(),
+            }
+
+    def to_prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        data = self.to_dict()
+        label = f'stage="{self.stage}"'
+        lines = [
+            "# TYPE weather_etl_stage_seconds gauge",
+            f"weather_etl_stage_seconds{{{label}}} {data['seconds']}",
+        ]
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"# TYPE weather_etl_{name} gauge")
+            lines.append(f"weather_etl_{name}{{{label}}} {value}")
+        if data["status_codes"]:
+            lines.append("# TYPE weather_etl_http_responses gauge")
+            for code, value in sorted(data["status_codes"].items()):
+                lines.append(
+                    f'weather_etl_http_responses{{{label},code="{code}"}} '
+                    f"{value}"
+                )
+        latency = data["latency"]
+        if latency["count"]:
+            metric = "weather_etl_http_request_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in latency["buckets"]:
+                lines.append(
+                    f'{metric}_bucket{{{label},le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{metric}_bucket{{{label},le="+Inf"}} {latency["count"]}'
+            )
+            lines.append(f"{metric}_sum{{{label}}} {latency['sum']}")
+            lines.append(f"{metric}_count{{{label}}} {latency['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class NullStageMetrics:
+    """Stand-in for StageMetrics that records nothing.
+
+    Returned while metrics are disabled so instrumented code pays only
+    for an empty method call.
+    """
+
+    stage = ""
+
+    def add(self, **counts: float) -> None:
+        """Ignore counters."""
+
+    def observe_request(self, status: int | str, seconds: float) -> None:
+        """Ignore requests."""
+
+    def to_dict(self) -> dict:
+        """Return an empty dictionary."""
+        return {}
+
+
+NULL_METRICS = NullStageMetrics()
+
+# metrics of the stages run in this process, keyed by stage name
+REGISTRY: dict[str, StageMetrics] = {}
+
+
+def write_metrics(metrics: StageMetrics, directory: Path) -> None:
+    """
+    Write a stage's metrics as `<stage>.prom` for the Prometheus
+    textfile collector and as `<stage>.json`. Files are replaced
+    atomically.
+
+    Args:
+        metrics (StageMetrics): Metrics to export.
+        directory (Path): Output directory.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for suffix, text in (
+        (".prom", metrics.to_prometheus()),
+        (".json", json.dumps(metrics.to_dict())),
+    ):
+        path = directory / f"{metrics.stage}{suffix}"
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text)
+        tmp.replace(path)
+
+
+@contextmanager
+def stage_metrics(
+    config: Config, stage: str
+) -> Iterator[StageMetrics | NullStageMetrics]:
+    """
+    Measure a stage run if metrics are enabled in the config.
+
+    The wall time of the block is recorded on exit, the metrics are
+    stored in REGISTRY and, if `config.metrics.path` is set, exported
+    there.
+
+    Args:
+        config (Config): Configuration object containing metrics settings.
+        stage (str): Name of the stage.
+
+    Yields:
+        StageMetrics | NullStageMetrics: Recorder for the stage.
+    """
+    if not config.metrics.enabled:
+        yield NULL_METRICS
+        return
+
+    metrics = StageMetrics(stage)
+    REGISTRY[stage] = metrics
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - start
+        if config.metrics.path is not None:
+            write_metrics(metrics, config.metrics.path)
@@ -0,0 +1,167 @@
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import batched
+
+from .aggregates import update_aggregates
+from .archive import RawArchive, archive_payloads
+from .cache import commit_observations
+from .config import Config
+from .dedup import (
+    DedupIndex,
+    add_records,
+    add_rows,
+    filter_new_records,
+    filter_new_rows,
+)
+from .extract import FetchResult, stream_weather_data
+from .load import append_weather_records
+from .metrics import stage_metrics
+from .runs import sink_lock
+from .schema import schema_for
+from .sinks import open_table_sink, table_batch_rows
+from .transform import process_weather_batch, transform_weather_batch
+from .validate import (
+    filter_valid_records,
+    filter_valid_rows,
+    quarantine_records,
+)
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of a fused pipeline run.
+
+    Attributes:
+        records (int): Number of records appended to the sink.
+        failures (dict[str, str]): Error messages keyed by location key.
+        unchanged (list[str]): Keys of locations whose observation did not
+            change since the last run.
+        quarantined (int): Number of payloads and records moved to the
+            quarantine file.
+    """
+
+    records: int = 0
+    quarantined: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+
+
+def run_fused_pipeline(config: Config) -> PipelineResult:
+    """
+    Run extract, transform and load in a single pass without intermediate
+    files.
+
+    Payloads are streamed from the extractor through the transform into
+    the sink as they arrive, so neither `raw_path` nor `processed_path`
+    is touched and no cleanup is needed afterwards. With the Parquet or
+    SQLite backend, payloads are transformed into tables and written in
+    batches of the sink's `batch_rows`, otherwise into compact record
+    batches of `config.writer.batch_records`. The sink is locked only
+    while a batch is written, so overlapping runs interleave batches. If
+    `config.dedup_index_path` is set, records already in the sink are
+    skipped. New records are validated while the sink is locked, against
+    the latest loaded observation of their location, and malformed or
+    invalid ones are moved to the quarantine file. If
+    `config.aggregates_path` is set, the written records are folded into
+    the aggregates. The fetched observations are committed to the
+    response cache only after every batch was written.
+
+    Args:
+        config (Config): Configuration object containing API key,
+        locations and the sink path.
+
+    Returns:
+        PipelineResult: Number of records loaded and failed locations.
+    """
+    report = FetchResult()
+    result = PipelineResult(
+        failures=report.failures, unchanged=report.unchanged
+    )
+
+    with ExitStack() as stack:
+        metrics = stack.enter_context(stage_metrics(config, "fused"))
+
+        # chain the stages as generators, archiving the raw responses
+        archive = None
+        if config.archive.enabled:
+            archive = stack.enter_context(RawArchive.from_config(config))
+        payloads = archive_payloads(
+            archive,
+            (
+                payload
+                for _, payload in stream_weather_data(config, report, metrics)
+            ),
+        )
+
+        schema = schema_for(config)
+        monotonic = config.validation.monotonic
+        tables = config.sink_backend != "csv"
+        if tables:
+            chunk_size = table_batch_rows(config)
+            writer = stack.enter_context(open_table_sink(config, schema))
+        else:
+            chunk_size = config.writer.batch_records
+
+        # transform chunks outside the sink lock, then hold it only while
+        # the chunk and its indexes are written
+        for chunk in batched(payloads, chunk_size, strict=False):
+            rejected = []
+            if tables:
+                data = process_weather_batch(chunk, schema, rejected)
+            else:
+                data = transform_weather_batch(chunk, schema, rejected)
+            with ExitStack() as locked:
+                locked.enter_context(sink_lock(config))
+                index = None
+                if config.dedup_index_path is not None:
+                    index = locked.enter_context(
+                        DedupIndex(config.dedup_index_path)
+                    )
+                if tables:
+                    table = data
+                    if index is not None:
+                        table = filter_new_rows(index, table)
+                    table = filter_valid_rows(
+                        table, rejected, schema, monotonic, index
+                    )
+                    inserted = table
+                    if config.aggregates_path is not None:
+                        inserted = writer.new_rows(table)
+                    writer.append(table)
+                    writer.flush()
+                    if index is not None:
+                        add_rows(index, table)
+                    update_aggregates(config, inserted)
+                    result.records += table.num_rows
+                else:
+                    batch = data
+                    if index is not None:
+                        batch = filter_new_records(index, batch)
+                    batch = filter_valid_records(
+                        batch, rejected, monotonic, index
+                    )
+                    result.records += append_weather_records(
+                        config.sink_path,
+                        batch.lines(),
+                        config.sink_index_path,
+                        config.writer,
+                    )
+                    if index is not None:
+                        add_records(index, batch)
+                    if config.aggregates_path is not None and len(batch):
+                        update_aggregates(config, batch.to_arrow())
+
+            # quarantine the rejected records once the sink is unlocked
+            if rejected:
+                result.quarantined += quarantine_records(
+                    config.validation.quarantine_path, rejected, "fused"
+                )
+        metrics.add(
+            records_loaded=result.records,
+            records_quarantined=result.quarantined,
+        )
+
+    # mark the observations as seen now that they are in the sink
+    commit_observations(config.cache, report.observed)
+
+    return result
@@ -0,0 +1,139 @@
+import json
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from .config import Location, PollConfig
+
+
+class PollSchedule:
+    """File-backed schedule of when each location is polled next.
+
+    The schedule keeps the last `history` distinct observation times of
+    every location and the time it was last polled. The update interval
+    of a location is the shortest gap between its observations: polling
+    less often than the provider updates only ever shows multiples of the
+    true interval, so the shortest gap converges to it where a mean would
+    not. A location is due `lag` seconds after its next expected update;
+    if that passed without a new observation, it is polled again after
+    `min_interval`. Call `save` to persist changes; the file is replaced
+    atomically.
+
+    Attributes:
+        path (Path): Path to the schedule file.
+        config (PollConfig): Interval bounds, lag and budget.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        config: PollConfig,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.config = config
+        self._clock = clock
+        self._locations: dict[str, dict] = {}
+
+        # load previous state if the schedule file exists
+        if path.exists():
+            with open(path) as f:
+                self._locations = json.load(f).get("locations", {})
+
+    @classmethod
+    def from_config(cls, config: PollConfig) -> "PollSchedule":
+        """
+        Create a schedule from its configuration.
+
+        Args:
+            config (PollConfig): Polling settings with a path set.
+
+        Returns:
+            PollSchedule: The schedule.
+        """
+        return cls(config.path, config)
+
+    def interval(self, location_key: str) -> float:
+        """
+        Estimate the update interval of a location.
+
+        Args:
+            location_key (str): Key of the location.
+
+        Returns:
+            float: Interval in seconds, within the configured bounds.
+        """
+        entry = self._locations.get(location_key)
+        dts = entry["dts"] if entry is not None else []
+        gaps = [b - a for a, b in zip(dts, dts[1:], strict=False) if b > a]
+        if not gaps:
+            return self.config.default_interval
+        return min(
+            max(min(gaps), self.config.min_interval),
+            self.config.max_interval,
+        )
+
+    def next_poll(self, location_key: str) -> float:
+        """
+        Return the time a location is due to be polled.
+
+        Args:
+            location_key (str): Key of the location.
+
+        Returns:
+            float: Time in seconds since the epoch, 0 if the location was
+            never polled.
+        """
+        entry = self._locations.get(location_key)
+        if entry is None or not entry["dts"]:
+            return 0.0
+        polled_at = entry["polled_at"]
+        due = entry["dts"][-1] + self.interval(location_key) + self.config.lag
+        if due <= polled_at:
+            # the expected update is late, look again shortly
+            due = polled_at + self.config.min_interval
+        return min(due, polled_at + self.config.max_interval)
+
+    def due(self, locations: Iterable[Location]) -> list[Location]:
+        """
+        Select the locations that are due, most overdue first.
+
+        Args:
+            locations (Iterable[Location]): Locations to consider.
+
+        Returns:
+            list[Location]: Locations whose next poll time has passed.
+        """
+        now = self._clock()
+        polls = [(self.next_poll(loc.key), loc) for loc in locations]
+        return [
+            loc
+            for next_poll, loc in sorted(polls, key=lambda p: p[0])
+            if next_poll <= now
+        ]
+
+    def observe(self, location_key: str, dt: int | None) -> None:
+        """
+        Record a poll of a location and the observation time it returned.
+
+        Args:
+            location_key (str): Key of the location.
+            dt (int | None): Observation time of the payload.
+        """
+        entry = self._locations.setdefault(
+            location_key, {"dts": [], "polled_at": 0.0}
+        )
+        entry["polled_at"] = self._clock()
+        dts = entry["dts"]
+        if dt is not None and (not dts or dt > dts[-1]):
+            dts.append(dt)
+            del dts[: -self.config.history]
+
+    def save(self) -> None:
+        """Persist the schedule."""
+        # write to a temporary file and rename it into place
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"locations": self._locations}, f)
+        tmp.replace(self.path)
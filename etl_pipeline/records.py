@@ -0,0 +1,246 @@
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+
+import pyarrow as pa
+
+from .schema import ARROW_TYPES, DEFAULT_SCHEMA, PAYLOAD_ERRORS, WeatherSchema
+
+# array type codes of the numeric field types; timestamps are stored as
+# Unix seconds
+TYPECODES = {
+    "int16": "h",
+    "int32": "i",
+    "int64": "q",
+    "float64": "d",
+    "timestamp": "q",
+}
+
+# exclusive magnitude limit of the signed integer type codes
+LIMITS = {"h": 1 << 15, "i": 1 << 31, "q": 1 << 63}
+
+
+class WeatherBatch:
+    """Column-backed batch of weather records.
+
+    Numeric fields are stored in typed `array`s, a few bytes per value,
+    and string fields in lists of interned strings, so a location or
+    description repeated across records is held once. Missing values of
+    numeric fields are tracked in a validity mask that is only allocated
+    once the column has one. Records are materialised as `schema.record`
+    instances on access only.
+
+    Attributes:
+        schema (WeatherSchema): Field schema of the records.
+    """
+
+    __slots__ = ("schema", "_columns", "_valid", "_length")
+
+    def __init__(self, schema: WeatherSchema = DEFAULT_SCHEMA):
+        self.schema = schema
+        self._columns: list[array | list] = [
+            array(TYPECODES[spec.type]) if spec.type in TYPECODES else []
+            for spec in schema.fields
+        ]
+        self._valid: list[bytearray | None] = [None] * len(schema.fields)
+        self._length = 0
+
+    @classmethod
+    def from_payloads(
+        cls,
+        payloads: Iterable[dict],
+        schema: WeatherSchema = DEFAULT_SCHEMA,
+        rejected: list[tuple[object, list[str]]] | None = None,
+    ) -> "WeatherBatch":
+        """
+        Extract the fields of raw payloads into a new batch.
+
+        Args:
+            payloads (Iterable[dict]): Raw responses of the OpenWeatherMap
+            API.
+            schema (WeatherSchema): Field schema selecting the columns.
+            rejected (list[tuple[object, list[str]]] | None): Receives the
+            payloads missing a required field or with a value that does
+            not fit its type, with the reason. If None, they raise
+            instead.
+
+        Raises:
+            KeyError: If a required field is missing and `rejected` is
+            None.
+            IndexError: If a required list entry is missing and
+            `rejected` is None.
+
+        Returns:
+            WeatherBatch: The records of the payloads in order.
+        """
+        batch = cls(schema)
+        if rejected is None:
+            batch.extend(map(schema.extract, payloads))
+            return batch
+
+        for payload in payloads:
+            try:
+                batch.append(schema.extract(payload))
+            except PAYLOAD_ERRORS as e:
+                reason = f"malformed payload: {type(e).__name__} {e}"
+                rejected.append((payload, [reason]))
+        return batch
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i: int):
+        return self.schema.record(*self._row(i))
+
+    def __iter__(self) -> Iterator:
+        record = self.schema.record
+        for row in zip(*self._values(), strict=True):
+            yield record(*row)
+
+    def append(self, values: tuple) -> None:
+        """
+        Add a record given as one value per field.
+
+        Args:
+            values (tuple): Values in field order, e.g. from
+            `schema.extract`; None for a missing value.
+
+        Raises:
+            TypeError: If a value does not fit the type of its field.
+            ValueError: If a value does not fit the type of its field.
+            OverflowError: If a number is out of range of its field.
+        """
+        # convert every value first, so a bad one leaves the batch intact
+        converted = list(self.schema.convert(values))
+        for i, column in enumerate(self._columns):
+            value = converted[i]
+            if value is None:
+                continue
+            if isinstance(column, list):
+                converted[i] = sys.intern(value)
+            elif column.typecode != "d":
+                limit = LIMITS[column.typecode]
+                if not -limit <= value < limit:
+                    raise OverflowError(f"{value} is out of range")
+
+        for i, value in enumerate(converted):
+            column = self._columns[i]
+            valid = self._valid[i]
+            if isinstance(column, list):
+                column.append(value)
+            elif value is None:
+                # keep a zero in place of the missing number
+                if valid is None:
+                    valid = self._valid[i] = bytearray(b"\x01" * len(column))
+                valid.append(0)
+                column.append(0)
+            else:
+                if valid is not None:
+                    valid.append(1)
+                column.append(value)
+        self._length += 1
+
+    def extend(self, rows: Iterable[tuple]) -> None:
+        """
+        Add many records given as one value per field.
+
+        Args:
+            rows (Iterable[tuple]): Values of each record in field order.
+        """
+        for values in rows:
+            self.append(values)
+
+    def take(self, indices: Iterable[int]) -> "WeatherBatch":
+        """
+        Select records by position into a new batch.
+
+        Args:
+            indices (Iterable[int]): Positions of the records to keep.
+
+        Returns:
+            WeatherBatch: The selected records in the given order.
+        """
+        batch = WeatherBatch(self.schema)
+        batch.extend(self._row(i) for i in indices)
+        return batch
+
+    def keys(self) -> Iterator[tuple[str, int]]:
+        """
+        Iterate over the (location, dt) key of every record.
+
+        Returns:
+            Iterator[tuple[str, int]]: Location and observation time in
+            Unix seconds.
+        """
+        return zip(self._columns[0], self._columns[1], strict=True)
+
+    def lines(self) -> Iterator[str]:
+        """
+        Format the records as CSV lines in the sink layout, the same text
+        `schema.format_line` gives for their payloads.
+
+        Yields:
+            str: One line per record, including the trailing newline.
+        """
+        format_values = self.schema.format_values
+        for row in zip(*self._values(), strict=True):
+            yield format_values(row)
+
+    def to_arrow(self) -> pa.Table:
+        """
+        Convert the batch into a typed table; numeric columns without
+        missing values are copied as one buffer.
+
+        Returns:
+            pa.Table: Table following `schema.arrow`.
+        """
+        arrays = []
+        for spec, column, values in zip(
+            self.schema.fields, self._columns, self._values(), strict=True
+        ):
+            arrow_type = ARROW_TYPES[spec.type]
+            if values is column and not isinstance(column, list):
+                arrays.append(
+                    pa.Array.from_buffers(
+                        arrow_type,
+                        len(column),
+                        [None, pa.py_buffer(column.tobytes())],
+                    )
+                )
+            else:
+                arrays.append(pa.array(values, arrow_type))
+        return pa.Table.from_arrays(arrays, schema=self.schema.arrow)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch, interned strings once."""
+        size = 0
+        strings = {}
+        for column, valid in zip(self._columns, self._valid, strict=True):
+            size += sys.getsizeof(column)
+            if valid is not None:
+                size += sys.getsizeof(valid)
+            if isinstance(column, list):
+                strings.update((id(s), s) for s in column if s is not None)
+        return size + sum(sys.getsizeof(s) for s in strings.values())
+
+    def _row(self, i: int) -> tuple:
+        """Return the values of one record, None for missing values."""
+        if not -self._length <= i < self._length:
+            raise IndexError("record index out of range")
+        return tuple(
+            None if valid is not None and not valid[i] else column[i]
+            for column, valid in zip(self._columns, self._valid, strict=True)
+        )
+
+    def _values(self) -> list:
+        """Return the columns with None in place of missing values."""
+        columns = []
+        for column, valid in zip(self._columns, self._valid, strict=True):
+            if valid is not None:
+                column = [
+                    v if ok else None
+                    for v, ok in zip(column, valid, strict=True)
+                ]
+            columns.append(column)
+        return columns
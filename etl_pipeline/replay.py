@@ -0,0 +1,397 @@
+import logging
+import multiprocessing
+import os
+import shutil
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Literal
+
+import pyarrow as pa
+
+from .aggregates import AggregateStore
+from .archive import ArchiveEntry, RawArchive, archive_dir, read_entry
+from .columnar import parse_weather_lines
+from .config import Config, FieldSpec
+from .dedup import (
+    DedupIndex,
+    add_lines,
+    add_rows,
+    dbm_files,
+    filter_new_lines,
+    filter_new_rows,
+)
+from .metrics import stage_metrics
+from .runs import sink_lock
+from .schema import compile_schema, schema_for
+from .sink_index import rebuild_sink_index
+from .sinks import open_table_sink
+from .sqlite_sink import replace_database
+from .transform import process_weather_batch, transform_weather_batch
+from .validate import (
+    filter_valid_records,
+    filter_valid_rows,
+    quarantine_records,
+)
+from .writer import SinkWriter
+
+logger = logging.getLogger(__name__)
+
+# suffix of the outputs built next to the live ones before the swap
+STAGING_SUFFIX = ".replay"
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying the raw archive.
+
+    Attributes:
+        payloads (int): Number of archived responses read.
+        records (int): Number of records written.
+        skipped (int): Number of responses and records rejected and moved
+            to the quarantine file.
+        chunks (int): Number of chunks dispatched to the workers.
+    """
+
+    payloads: int = 0
+    records: int = 0
+    skipped: int = 0
+    chunks: int = 0
+
+
+def plan_replay_chunks(
+    entries: Iterable[ArchiveEntry], chunk_records: int
+) -> list[list[ArchiveEntry]]:
+    """
+    Group consecutive archive entries into chunks of about
+    `chunk_records` responses. An entry is never split.
+
+    Args:
+        entries (Iterable[ArchiveEntry]): Entries in archive order.
+        chunk_records (int): Number of responses per chunk.
+
+    Returns:
+        list[list[ArchiveEntry]]: The chunks in archive order.
+    """
+    chunks = []
+    current: list[ArchiveEntry] = []
+    records = 0
+    for entry in entries:
+        current.append(entry)
+        records += entry.records
+        if records >= chunk_records:
+            chunks.append(current)
+            current, records = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def transform_chunk(
+    path: Path,
+    entries: list[ArchiveEntry],
+    fields: tuple[FieldSpec, ...],
+    tables: bool,
+) -> tuple[str | pa.Table, int, list[tuple[object, list[str]]]]:
+    """
+    Read and transform one chunk of the archive in a worker process.
+
+    Only the entries travel to the worker; it reads their byte ranges
+    from the segments itself, so no payloads are pickled. Only the
+    rejected records travel back, for the parent to quarantine.
+
+    Args:
+        path (Path): Directory of the archive.
+        entries (list[ArchiveEntry]): Entries of the chunk.
+        fields (tuple[FieldSpec, ...]): Configured fields of the sink.
+        tables (bool): Whether to build a table for the Parquet or SQLite
+        sink instead of CSV lines.
+
+    Returns:
+        tuple[str | pa.Table, int, list[tuple[object, list[str]]]]: The
+        CSV lines joined or the table, the number of responses read and
+        the rejected responses or records with their reasons.
+    """
+    schema = compile_schema(fields)
+    payloads = [p for entry in entries for p in read_entry(path, entry)]
+    rejected = []
+
+    # check the values only, the archive is not in observation order
+    if tables:
+        table = process_weather_batch(payloads, schema, rejected)
+        table = filter_valid_rows(table, rejected, schema, False)
+        return table, len(payloads), rejected
+
+    batch = transform_weather_batch(payloads, schema, rejected)
+    batch = filter_valid_records(batch, rejected, False)
+    return "".join(batch.lines()), len(payloads), rejected
+
+
+def map_bounded(
+    executor: Executor,
+    fn: Callable,
+    args: Iterable[tuple],
+    window: int,
+) -> Iterator:
+    """
+    Map a function over arguments in an executor, keeping at most
+    `window` calls in flight and yielding results in submission order.
+
+    Args:
+        executor (Executor): Executor running the calls.
+        fn (Callable): Function to call.
+        args (Iterable[tuple]): Positional arguments of each call.
+        window (int): Number of calls in flight.
+
+    Yields:
+        The results of the calls in order.
+    """
+    pending = deque()
+    for item in args:
+        pending.append(executor.submit(fn, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def staging_path(path: Path) -> Path:
+    """
+    Return the path an output is rebuilt at, removing leftovers of an
+    interrupted replay.
+
+    Args:
+        path (Path): Path to the live output.
+
+    Returns:
+        Path: The staging path next to it.
+    """
+    staging = path.with_name(path.name + STAGING_SUFFIX)
+    for leftover in staging.parent.glob(staging.name + "*"):
+        if leftover.is_dir():
+            shutil.rmtree(leftover)
+        else:
+            leftover.unlink()
+    return staging
+
+
+def replace_files(staging: Path, path: Path) -> None:
+    """
+    Move a staged file into place, including the companion files a dbm
+    backend may create next to it.
+
+    Args:
+        staging (Path): Path to the staged file.
+        path (Path): Path to the live file, replaced.
+    """
+    for old in dbm_files(path):
+        old.unlink()
+    for new in dbm_files(staging):
+        new.replace(path.with_name(path.name + new.name[len(staging.name) :]))
+
+
+def replace_dir(staging: Path, path: Path) -> None:
+    """
+    Move a staged directory into place; the old directory is renamed
+    away first and removed once the new one is in place.
+
+    Args:
+        staging (Path): Path to the staged directory.
+        path (Path): Path to the live directory, replaced.
+    """
+    old = path.with_name(path.name + ".old")
+    if old.exists():
+        shutil.rmtree(old)
+    if path.exists():
+        path.rename(old)
+    staging.rename(path)
+    if old.exists():
+        shutil.rmtree(old)
+
+
+def run_replay(
+    config: Config,
+    target: Literal["sink", "processed"] = "sink",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> ReplayResult:
+    """
+    Re-run the transform over the raw archive in a process pool and
+    rebuild the processed file or the sink.
+
+    The archive is split into chunks of whole entries that workers read
+    and transform on their own. At most `max_pending` chunks per worker
+    are in flight and results are written in archive order as they
+    complete, so memory stays bounded regardless of the archive size.
+
+    The output is built next to the live one and swapped in only once it
+    is complete, so readers see either the old or the new output. For
+    the sink, the dedup index, sink index and aggregate store are
+    rebuilt alongside it, holding the sink lock throughout so no run
+    appends records the rebuild would drop. The sink is rebuilt from the
+    archive alone, so records that were never archived are dropped.
+
+    Args:
+        config (Config): Configuration object containing the archive,
+        sink and replay settings.
+        target (str): "processed" rewrites the processed file, "sink"
+        rebuilds the configured sink.
+        since (datetime | None): Replay only responses archived at or
+        after this time. Only valid for the processed file.
+        until (datetime | None): Replay only responses archived before
+        this time. Only valid for the processed file.
+
+    Raises:
+        ValueError: If a time range is given for the sink.
+
+    Returns:
+        ReplayResult: Number of responses read, records written and
+        records quarantined. Nothing is replaced if the archive is empty.
+    """
+    if target == "sink" and (since is not None or until is not None):
+        raise ValueError("The sink can only be rebuilt from the full archive")
+
+    # extract parameters from config
+    path = archive_dir(config)
+    replay = config.replay
+    schema = schema_for(config)
+    tables = target == "sink" and config.sink_backend != "csv"
+    workers = replay.workers or os.cpu_count() or 1
+    result = ReplayResult()
+
+    chunks = plan_replay_chunks(
+        RawArchive(path).entries_between(since, until), replay.chunk_records
+    )
+    result.chunks = len(chunks)
+    if not chunks:
+        logger.warning("Nothing to replay in %s", path)
+        return result
+
+    with ExitStack() as run:
+        metrics = run.enter_context(stage_metrics(config, "replay"))
+
+        # keep other runs from appending to the sink while it is rebuilt
+        if target == "sink":
+            run.enter_context(sink_lock(config))
+
+        # stage every output that is rebuilt
+        if target == "processed":
+            output = config.processed_path
+        elif config.sink_backend == "parquet":
+            output = config.columnar.path
+        elif config.sink_backend == "sqlite":
+            output = config.sqlite.path
+        else:
+            output = config.sink_path
+        output.parent.mkdir(parents=True, exist_ok=True)
+        staged_output = staging_path(output)
+        staged_index = None
+        staged_aggregates = None
+        if target == "sink" and config.dedup_index_path is not None:
+            staged_index = staging_path(config.dedup_index_path)
+        if target == "sink" and config.aggregates_path is not None:
+            staged_aggregates = staging_path(config.aggregates_path)
+
+        with ExitStack() as stack:
+            index = None
+            if staged_index is not None:
+                index = stack.enter_context(DedupIndex(staged_index))
+            store = None
+            if staged_aggregates is not None:
+                store = stack.enter_context(AggregateStore(staged_aggregates))
+            if target == "processed":
+                processed = stack.enter_context(open(staged_output, "w"))
+            elif tables:
+                writer = stack.enter_context(
+                    open_table_sink(config, schema, staged_output)
+                )
+            else:
+                writer = stack.enter_context(
+                    SinkWriter(staged_output, config.writer)
+                )
+
+            executor = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            )
+            results = map_bounded(
+                executor,
+                transform_chunk,
+                (
+                    (path, chunk, tuple(config.fields), tables)
+                    for chunk in chunks
+                ),
+                workers * replay.max_pending,
+            )
+            for data, payloads, rejected in results:
+                result.payloads += payloads
+                skipped = len(rejected)
+                result.skipped += skipped
+                if rejected:
+                    quarantine_records(
+                        config.validation.quarantine_path, rejected, "replay"
+                    )
+
+                # write the chunk, then index what was written
+                if target == "processed":
+                    processed.write(data)
+                    result.records += payloads - skipped
+                elif tables:
+                    table = data
+                    if index is not None:
+                        table = filter_new_rows(index, table)
+                    inserted = table
+                    if store is not None:
+                        inserted = writer.new_rows(table)
+                    writer.append(table)
+                    writer.flush()
+                    if index is not None:
+                        add_rows(index, table)
+                    if store is not None:
+                        store.update(inserted)
+                    result.records += table.num_rows
+                else:
+                    lines = data.splitlines(keepends=True)
+                    if index is not None:
+                        lines = list(filter_new_lines(index, lines))
+                    for line in lines:
+                        writer.write(line)
+                    writer.flush()
+                    if index is not None:
+                        add_lines(index, lines)
+                    if store is not None and lines:
+                        store.update(parse_weather_lines(lines, schema))
+                    result.records += len(lines)
+
+        # swap the complete outputs in, the sink first
+        if target == "sink" and config.sink_backend == "parquet":
+            replace_dir(staged_output, output)
+        elif target == "sink" and config.sink_backend == "sqlite":
+            replace_database(staged_output, output)
+        else:
+            staged_output.replace(output)
+        if target == "sink" and not tables:
+            if config.sink_index_path is not None:
+                rebuild_sink_index(config.sink_index_path, output)
+        if staged_index is not None:
+            replace_files(staged_index, config.dedup_index_path)
+        if staged_aggregates is not None:
+            staged_aggregates.replace(config.aggregates_path)
+
+        if result.skipped:
+            logger.warning(
+                "Quarantined %d malformed or invalid archived records",
+                result.skipped,
+            )
+        metrics.add(
+            records_in=result.payloads,
+            records_out=result.records,
+            records_skipped=result.skipped,
+        )
+    return result
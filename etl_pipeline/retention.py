@@ -0,0 +1,241 @@
+import os
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import Config, RetentionConfig
+from .metrics import stage_metrics
+
+# files that are never removed, e.g. the lock files of sinks and indexes
+PROTECTED_SUFFIXES = (".lock",)
+
+
+@dataclass
+class RetentionReport:
+    """Outcome of a retention sweep.
+
+    Attributes:
+        files_scanned (int): Number of files found below the swept paths.
+        bytes_scanned (int): Total size of the files found.
+        files_removed (int): Number of files removed.
+        bytes_reclaimed (int): Total size of the files removed.
+        dirs_removed (int): Number of directories left empty and removed.
+        errors (dict[str, str]): Error messages keyed by the path that
+            could not be removed.
+    """
+
+    files_scanned: int = 0
+    bytes_scanned: int = 0
+    files_removed: int = 0
+    bytes_reclaimed: int = 0
+    dirs_removed: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def scan_files(
+    roots: Iterable[Path], empty: list[str] | None = None
+) -> Iterator[tuple[int, int, str]]:
+    """
+    Walk directories with `os.scandir`, which returns the type of every
+    entry with the directory listing, so only files are stat'ed. Symbolic
+    links are neither followed nor returned.
+
+    Args:
+        roots (Iterable[Path]): Directories to walk; missing ones are
+        skipped.
+        empty (list[str] | None): Receives the directories below the
+        roots that have no entries at all, if set.
+
+    Yields:
+        tuple[int, int, str]: Modification time in nanoseconds, size and
+        path of every unprotected file.
+    """
+    roots = [os.fspath(root) for root in roots]
+    stack = list(roots)
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            found = False
+            for entry in entries:
+                found = True
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    if entry.name.endswith(PROTECTED_SUFFIXES):
+                        continue
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime_ns, stat.st_size, entry.path
+        if not found and empty is not None and directory not in roots:
+            empty.append(directory)
+
+
+def select_expired(
+    files: Iterable[tuple[int, int, str]],
+    retention: RetentionConfig,
+    now: float,
+    report: RetentionReport,
+) -> Iterator[tuple[int, int, str]]:
+    """
+    Select the files to remove, oldest first.
+
+    Files are kept newest first while they are younger than `max_age`
+    and fit into `max_bytes` and `max_files`; once a file does not, it
+    and every older file are removed. Files younger than `min_age` are
+    always kept. Without a size or count budget no sort is needed, so
+    files are selected while they are scanned.
+
+    Args:
+        files (Iterable[tuple[int, int, str]]): Modification time in
+        nanoseconds, size and path of the files, e.g. from `scan_files`.
+        retention (RetentionConfig): Age and size budgets.
+        now (float): Current time in seconds since the epoch.
+        report (RetentionReport): Receives the number and size of the
+        scanned files.
+
+    Yields:
+        tuple[int, int, str]: Modification time, size and path of the
+        files to remove.
+    """
+    ns = 1_000_000_000
+    young = int((now - retention.min_age) * ns)
+    expired = (
+        int((now - retention.max_age) * ns)
+        if retention.max_age is not None
+        else -1
+    )
+
+    # without budgets every file is judged by its age alone
+    if retention.max_bytes is None and retention.max_files is None:
+        for mtime, size, path in files:
+            report.files_scanned += 1
+            report.bytes_scanned += size
+            if mtime < expired and mtime < young:
+                yield mtime, size, path
+        return
+
+    # otherwise the newest files are kept until a budget is exhausted
+    files = sorted(files, reverse=True)
+    report.files_scanned += len(files)
+    report.bytes_scanned += sum(size for _, size, _ in files)
+    max_bytes = retention.max_bytes
+    max_files = retention.max_files
+    kept_bytes = kept_files = 0
+    full = False
+    removed = []
+    for mtime, size, path in files:
+        if mtime >= young:
+            kept_bytes += size
+            kept_files += 1
+            continue
+        full = (
+            full
+            or mtime < expired
+            or (max_bytes is not None and kept_bytes + size > max_bytes)
+            or (max_files is not None and kept_files + 1 > max_files)
+        )
+        if full:
+            removed.append((mtime, size, path))
+        else:
+            kept_bytes += size
+            kept_files += 1
+    yield from reversed(removed)
+
+
+def remove_empty_dirs(
+    directories: Iterable[str], roots: Iterable[Path]
+) -> int:
+    """
+    Remove directories left empty, deepest first, up to but excluding the
+    swept roots.
+
+    Args:
+        directories (Iterable[str]): Directories that files were removed
+        from.
+        roots (Iterable[Path]): Swept directories, which are kept.
+
+    Returns:
+        int: Number of directories removed.
+    """
+    stop = {os.path.abspath(root) for root in roots}
+    pending = {os.path.abspath(d) for d in directories}
+    removed = 0
+    for directory in sorted(pending, key=len, reverse=True):
+        while directory not in stop and directory != os.path.dirname(
+            directory
+        ):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            removed += 1
+            directory = os.path.dirname(directory)
+    return removed
+
+
+def apply_retention(
+    config: Config, now: float | None = None, dry_run: bool = False
+) -> RetentionReport:
+    """
+    Remove working files below the configured paths that are too old or
+    exceed the size and count budgets, oldest first, and the directories
+    they leave empty. Directories that were already empty, e.g. of runs
+    that stopped early, are removed once they are older than `min_age`.
+
+    Args:
+        config (Config): Configuration object containing the retention
+        settings.
+        now (float | None): Current time in seconds since the epoch, the
+        system time if None.
+        dry_run (bool): Report what would be removed without removing it.
+
+    Returns:
+        RetentionReport: Files scanned, removed and bytes reclaimed.
+    """
+    retention = config.retention
+    report = RetentionReport()
+    if now is None:
+        now = time.time()
+
+    with stage_metrics(config, "retention") as metrics:
+        directories = set()
+        empty: list[str] = []
+        files = scan_files(retention.paths, empty)
+        for _, size, path in select_expired(files, retention, now, report):
+            if not dry_run:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    report.errors[path] = str(e)
+                    continue
+                directories.add(os.path.dirname(path))
+            report.files_removed += 1
+            report.bytes_reclaimed += size
+
+        # leave directories a running task may just have created
+        young = now - retention.min_age
+        for directory in empty:
+            try:
+                if os.stat(directory).st_mtime < young:
+                    directories.add(directory)
+            except FileNotFoundError:
+                continue
+        if not dry_run:
+            report.dirs_removed = remove_empty_dirs(
+                directories, retention.paths
+            )
+
+        metrics.add(
+            files_removed=report.files_removed,
+            bytes_reclaimed=report.bytes_reclaimed,
+        )
+    return report
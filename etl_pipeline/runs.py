@@ -0,0 +1,112 @@
+import re
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from .config import Config
+from .writer import file_lock
+
+# characters replaced in run ids, which may contain e.g. ":" and "+"
+RUN_ID_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def run_dir(config: Config, run_id: str) -> Path:
+    """
+    Return the working directory of a run.
+
+    Args:
+        config (Config): Configuration object containing the runs
+        directory.
+        run_id (str): Identifier of the run, e.g. the Airflow run id.
+
+    Returns:
+        Path: The directory below `config.runs_dir`.
+    """
+    return config.runs_dir / RUN_ID_UNSAFE.sub("_", run_id)
+
+
+def run_config(config: Config, run_id: str) -> Config:
+    """
+    Derive the configuration of one run, with its raw and processed files
+    in the run directory, so overlapping runs never read, write or clean
+    up each other's files. The sink is unchanged.
+
+    Args:
+        config (Config): Configuration object of the pipeline.
+        run_id (str): Identifier of the run, e.g. the Airflow run id.
+
+    Returns:
+        Config: The configuration of the run.
+    """
+    directory = run_dir(config, run_id)
+    return config.model_copy(
+        update={
+            "raw_path": directory / config.raw_path.name,
+            "raw_batch_path": directory / config.raw_batch_path.name,
+            "processed_path": directory / config.processed_path.name,
+        }
+    )
+
+
+def sink_lock_path(config: Config) -> Path:
+    """
+    Return the path to the lock file of the configured sink.
+
+    Args:
+        config (Config): Configuration object containing the sink.
+
+    Returns:
+        Path: The lock file next to the CSV sink, the Parquet dataset or
+        the SQLite database.
+    """
+    if config.sink_backend == "parquet":
+        sink = config.columnar.path
+    elif config.sink_backend == "sqlite":
+        sink = config.sqlite.path
+    else:
+        sink = config.sink_path
+    return sink.with_name(sink.name + ".lock")
+
+
+def store_lock_paths(config: Config) -> list[Path]:
+    """
+    Return the paths to the lock files of the dedup index and aggregates,
+    which runs writing different sink backends may share.
+
+    Args:
+        config (Config): Configuration object containing the stores.
+
+    Returns:
+        list[Path]: The lock files of the configured stores, always in
+        the same order.
+    """
+    stores = [config.dedup_index_path, config.aggregates_path]
+    return [
+        store.with_name(store.name + ".lock")
+        for store in stores
+        if store is not None
+    ]
+
+
+@contextmanager
+def sink_lock(config: Config) -> Iterator[None]:
+    """
+    Hold the lock of the configured sink, so appends to the sink and its
+    dedup index, sink index and aggregates by overlapping runs are
+    serialized.
+
+    The dedup index and aggregates are locked on their own as well, after
+    the sink, so loads into different backends that share them are
+    serialized too. Since every run takes the locks in the same order,
+    they cannot deadlock.
+
+    The lock is not reentrant; holding it twice in one process blocks.
+
+    Args:
+        config (Config): Configuration object containing the sink.
+    """
+    with ExitStack() as stack:
+        for path in [sink_lock_path(config), *store_lock_paths(config)]:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stack.enter_context(file_lock(path))
+        yield
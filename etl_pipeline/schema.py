@@ -0,0 +1,322 @@
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import make_dataclass
+from functools import lru_cache
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .config import WEATHER_FIELDS, Config, FieldSpec
+
+# sink types of the field types
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int16": pa.int16(),
+    "int32": pa.int32(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "timestamp": pa.timestamp("s", tz="UTC"),
+}
+
+# types of the field types as parsed from JSON, narrowed when cast to the
+# sink; timestamps arrive as Unix seconds
+RAW_TYPES = {
+    "string": pa.string(),
+    "int16": pa.int64(),
+    "int32": pa.int64(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "timestamp": pa.int64(),
+}
+
+# Python types of the field types, as held by a record
+PYTHON_TYPES = {
+    "string": str,
+    "int16": int,
+    "int32": int,
+    "int64": int,
+    "float64": float,
+    "timestamp": int,
+}
+
+# errors raised while extracting or converting the fields of a malformed
+# payload
+PAYLOAD_ERRORS = (KeyError, IndexError, TypeError, ValueError, OverflowError)
+
+# a field path, keys separated by dots and bracketed list indices
+PATH_SYNTAX = re.compile(r"[^.\[\]]+(\.[^.\[\]]+|\[\d+\])*")
+
+# one step of a field path, a key or a list index
+PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+
+def parse_path(path: str) -> tuple[str | int, ...]:
+    """
+    Split a field path into keys and list indices.
+
+    Args:
+        path (str): Path such as "weather[0].description".
+
+    Raises:
+        ValueError: If the path is malformed.
+
+    Returns:
+        tuple[str | int, ...]: The steps, e.g. ("weather", 0, "description").
+    """
+    if not PATH_SYNTAX.fullmatch(path):
+        raise ValueError(f"Invalid field path: {path!r}")
+    return tuple(
+        key if key else int(index) for key, index in PATH_TOKEN.findall(path)
+    )
+
+
+def compile_extractor(fields: Iterable[FieldSpec]) -> Callable[[dict], tuple]:
+    """
+    Generate a function that reads all fields from a payload at once.
+
+    The function is built from source with one direct lookup per field,
+    so extracting a record costs no interpretation of the paths.
+
+    Args:
+        fields (Iterable[FieldSpec]): Fields to extract.
+
+    Returns:
+        Callable[[dict], tuple]: The extractor.
+    """
+    body = []
+    defaults = []
+    names = []
+    for i, spec in enumerate(fields):
+        steps = parse_path(spec.path)
+        lookup = "data" + "".join(f"[{step!r}]" for step in steps)
+        name = f"v{i}"
+        names.append(name)
+        defaults.append(spec.default)
+        if spec.required:
+            body.append(f"    {name} = {lookup}")
+        else:
+            body += [
+                "    try:",
+                f"        {name} = {lookup}",
+                "    except (KeyError, IndexError, TypeError):",
+                f"        {name} = defaults[{i}]",
+            ]
+
+    body.append(f"    return ({''.join(n + ', ' for n in names)})")
+
+    namespace = {"defaults": tuple(defaults)}
+    exec("def extract(data):\n" + "\n".join(body), namespace)
+    return namespace["extract"]
+
+
+def raw_type(tree: dict | pa.DataType) -> pa.DataType:
+    """Convert a tree of path steps into the nested Arrow type."""
+    if isinstance(tree, pa.DataType):
+        return tree
+    if list(tree) == [int]:
+        return pa.list_(raw_type(tree[int]))
+    if int in tree:
+        raise ValueError("A path step is used both as a list and a key")
+    return pa.struct([(key, raw_type(child)) for key, child in tree.items()])
+
+
+class WeatherSchema:
+    """Field schema compiled for the transform and the sinks.
+
+    Built once per list of fields, see `compile_schema`.
+
+    Attributes:
+        fields (tuple[FieldSpec, ...]): The fields in sink order.
+        names (list[str]): Names of the sink columns.
+        arrow (pa.Schema): Typed layout of a record in the sinks.
+        dataset (pa.Schema): Layout of the partitioned Parquet dataset as
+            seen by readers, `arrow` plus the `date` partition column.
+        raw (pa.Schema): Subset of the raw payload read by the batch
+            transform; other fields are ignored while parsing.
+        extract (Callable[[dict], tuple]): Reads the field values of a
+            payload.
+        record (type): Frozen dataclass with `__slots__` holding the
+            values of one record, timestamps as Unix seconds.
+    """
+
+    def __init__(self, fields: tuple[FieldSpec, ...]):
+        self.fields = fields
+        self.names = [spec.name for spec in fields]
+        self.arrow = pa.schema(
+            [(spec.name, ARROW_TYPES[spec.type]) for spec in fields]
+        )
+        self.dataset = self.arrow.append(pa.field("date", pa.string()))
+        self._paths = [parse_path(spec.path) for spec in fields]
+        self.extract = compile_extractor(fields)
+        self._types = tuple(PYTHON_TYPES[spec.type] for spec in fields)
+        self.record = make_dataclass(
+            "WeatherRecord",
+            [
+                (
+                    spec.name,
+                    PYTHON_TYPES[spec.type]
+                    if spec.required
+                    else PYTHON_TYPES[spec.type] | None,
+                )
+                for spec in fields
+            ],
+            frozen=True,
+            slots=True,
+        )
+
+        # merge the paths into one nested type, list indices share a type
+        tree: dict = {}
+        for spec, path in zip(fields, self._paths, strict=True):
+            node = tree
+            for step in path[:-1]:
+                key = int if isinstance(step, int) else step
+                node = node.setdefault(key, {})
+                if isinstance(node, pa.DataType):
+                    raise ValueError(f"Conflicting field path: {spec.path}")
+            key = int if isinstance(path[-1], int) else path[-1]
+            if key in node:
+                raise ValueError(f"Conflicting field path: {spec.path}")
+            node[key] = RAW_TYPES[spec.type]
+        self.raw = pa.schema(list(raw_type(tree)))
+
+    def convert(self, values: tuple) -> tuple:
+        """
+        Convert field values to the Python types of their fields.
+
+        Args:
+            values (tuple): Values in field order, None where missing.
+
+        Raises:
+            TypeError: If a value does not fit the type of its field.
+            ValueError: If a value does not fit the type of its field.
+            OverflowError: If a number does not fit an integer.
+
+        Returns:
+            tuple: The converted values, None where missing.
+        """
+        return tuple(
+            None if value is None else convert(value)
+            for convert, value in zip(self._types, values, strict=True)
+        )
+
+    @staticmethod
+    def format_values(values: Iterable) -> str:
+        """
+        Format converted field values as a CSV line in the sink layout.
+        Every path writing CSV lines formats them here, so a record has
+        the same text whichever path loaded it.
+
+        Args:
+            values (Iterable): Values in field order, e.g. from `convert`;
+            None where missing.
+
+        Returns:
+            str: The CSV line, including the trailing newline.
+        """
+        return ";".join("" if v is None else str(v) for v in values) + "\n"
+
+    def format_line(self, data: dict) -> str:
+        """
+        Format a raw payload as a CSV line in the sink layout.
+
+        Args:
+            data (dict): Raw response of the OpenWeatherMap API.
+
+        Raises:
+            KeyError: If a required field is missing.
+            IndexError: If a required list entry is missing.
+            TypeError: If a value does not fit the type of its field.
+            ValueError: If a value does not fit the type of its field.
+            OverflowError: If a number does not fit an integer.
+
+        Returns:
+            str: The CSV line, including the trailing newline.
+        """
+        return self.format_values(self.convert(self.extract(data)))
+
+    def flatten(self, raw: pa.Table) -> pa.Table:
+        """
+        Extract the fields column-wise from nested raw payloads.
+
+        Missing values become the field default, or null if it has none.
+
+        Args:
+            raw (pa.Table): Table following `raw`.
+
+        Returns:
+            pa.Table: Table following `arrow`.
+        """
+        columns = {}
+        for spec, path in zip(self.fields, self._paths, strict=True):
+            column = raw[path[0]]
+            for step in path[1:]:
+                if isinstance(step, int):
+                    # element of a list, null for missing or short lists
+                    column = pc.list_element(
+                        pc.list_slice(
+                            column,
+                            step,
+                            step + 1,
+                            return_fixed_size_list=True,
+                        ),
+                        0,
+                    )
+                else:
+                    column = pc.struct_field(column, step)
+            if spec.default is not None:
+                column = pc.fill_null(column, spec.default)
+            columns[spec.name] = column
+        return self.cast(pa.table(columns))
+
+    def cast(self, table: pa.Table) -> pa.Table:
+        """
+        Convert integer timestamp columns given as Unix seconds and cast
+        the table to `arrow`.
+
+        Args:
+            table (pa.Table): Table with the sink columns.
+
+        Returns:
+            pa.Table: Table following `arrow`.
+        """
+        for spec in self.fields:
+            index = table.schema.get_field_index(spec.name)
+            if spec.type == "timestamp" and pa.types.is_integer(
+                table.schema.field(index).type
+            ):
+                table = table.set_column(
+                    index,
+                    spec.name,
+                    table.column(index).cast(ARROW_TYPES["timestamp"]),
+                )
+        return table.select(self.names).cast(self.arrow)
+
+
+@lru_cache(maxsize=16)
+def compile_schema(fields: tuple[FieldSpec, ...]) -> WeatherSchema:
+    """
+    Compile a list of fields, reusing earlier compilations.
+
+    Args:
+        fields (tuple[FieldSpec, ...]): The fields in sink order.
+
+    Returns:
+        WeatherSchema: The compiled schema.
+    """
+    return WeatherSchema(fields)
+
+
+def schema_for(config: Config) -> WeatherSchema:
+    """
+    Return the compiled schema of the configured fields.
+
+    Args:
+        config (Config): Configuration object containing the fields.
+
+    Returns:
+        WeatherSchema: The compiled schema.
+    """
+    return compile_schema(tuple(config.fields))
+
+
+DEFAULT_SCHEMA = compile_schema(WEATHER_FIELDS)
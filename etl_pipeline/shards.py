@@ -0,0 +1,220 @@
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .cache import commit_observations
+from .config import Config, Location
+from .extract import fetch_weather_batch
+from .load import save_weather_data
+from .schema import schema_for
+from .transform import transform_weather_records
+from .validate import quarantine_records, validate_weather_file
+from .writer import append_file, count_lines
+
+
+@dataclass
+class ShardResult:
+    """Outcome of running the pipeline for one shard.
+
+    Attributes:
+        shard (int): Number of the shard.
+        records (int): Number of records written to the shard output.
+        quarantined (int): Number of malformed payloads moved to the
+            quarantine file.
+        failures (dict[str, str]): Error messages keyed by location key.
+        unchanged (list[str]): Keys of locations whose observation did not
+            change since the last run.
+    """
+
+    shard: int
+    records: int = 0
+    quarantined: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+
+
+def shard_of(location: Location, count: int) -> int:
+    """
+    Assign a location to a shard by a stable hash of its key, so it is
+    always processed by the same shard.
+
+    Args:
+        location (Location): The location.
+        count (int): Number of shards.
+
+    Returns:
+        int: Number of the shard.
+    """
+    return zlib.crc32(location.key.encode()) % count
+
+
+def plan_shards(config: Config) -> list[int]:
+    """
+    List the shards that have at least one location.
+
+    Args:
+        config (Config): Configuration object containing the locations
+        and the shard count.
+
+    Returns:
+        list[int]: Numbers of the non-empty shards, ascending.
+    """
+    count = config.shards.count
+    return sorted({shard_of(loc, count) for loc in config.locations})
+
+
+def shard_dir(config: Config, shard: int) -> Path:
+    """
+    Return the working directory of a shard.
+
+    Args:
+        config (Config): Configuration object containing the shard
+        settings.
+        shard (int): Number of the shard.
+
+    Returns:
+        Path: The directory below `config.shards.work_dir`.
+    """
+    return config.shards.work_dir / f"shard-{shard:03d}"
+
+
+def shard_config(config: Config, shard: int) -> Config:
+    """
+    Derive the configuration of one shard: its locations, and working
+    files, response cache, polling schedule and metrics in the shard
+    directory, so shards running at the same time never share a file. The
+    sink is unchanged.
+
+    Args:
+        config (Config): Configuration object of the whole pipeline.
+        shard (int): Number of the shard.
+
+    Returns:
+        Config: The configuration of the shard.
+    """
+    directory = shard_dir(config, shard)
+    update = {
+        "locations": [
+            loc
+            for loc in config.locations
+            if shard_of(loc, config.shards.count) == shard
+        ],
+        "raw_path": directory / "raw.json",
+        "raw_batch_path": directory / "raw.jsonl",
+        "processed_path": directory / "processed.csv",
+    }
+    if config.cache.path is not None:
+        update["cache"] = config.cache.model_copy(
+            update={"path": directory / config.cache.path.name}
+        )
+    if config.polling.path is not None:
+        update["polling"] = config.polling.model_copy(
+            update={"path": directory / config.polling.path.name}
+        )
+    if config.metrics.path is not None:
+        update["metrics"] = config.metrics.model_copy(
+            update={"path": directory / "metrics"}
+        )
+    return config.model_copy(update=update)
+
+
+def run_shard(config: Config, shard: int) -> ShardResult:
+    """
+    Fetch and transform the locations of one shard into the processed
+    file of its working directory.
+
+    Malformed payloads are moved to the quarantine file instead of failing
+    the shard. The response cache and polling schedule of the shard are
+    saved only once its output is written, so a failed run is fetched
+    again on retry.
+
+    Args:
+        config (Config): Configuration object of the whole pipeline.
+        shard (int): Number of the shard.
+
+    Returns:
+        ShardResult: Number of records written and quarantined, failed
+        and unchanged locations.
+    """
+    shard_cfg = shard_config(config, shard)
+    processed_path = shard_cfg.processed_path
+    result = ShardResult(shard=shard)
+
+    fetched = fetch_weather_batch(shard_cfg, save_state=False)
+    result.failures = fetched.failures
+    result.unchanged = fetched.unchanged
+
+    # write the output atomically, so the merge never reads a partial
+    # one, keeping the output of an earlier run that was never merged
+    payloads = [
+        fetched.payloads[loc.key]
+        for loc in shard_cfg.locations
+        if loc.key in fetched.payloads
+    ]
+    rejected = []
+    tmp = processed_path.with_name(processed_path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    if processed_path.exists():
+        append_file(tmp, processed_path, sync=False)
+    with open(tmp, "a") as f:
+        for line in transform_weather_records(
+            payloads, schema_for(config), rejected
+        ):
+            f.write(line)
+            result.records += 1
+    tmp.replace(processed_path)
+
+    # quarantine the malformed payloads, then save the fetch state now
+    # that the output holds the others
+    if rejected:
+        result.quarantined = quarantine_records(
+            config.validation.quarantine_path, rejected, "shard"
+        )
+    fetched.save_state()
+    return result
+
+
+def merge_shards(config: Config, shards: list[int]) -> int:
+    """
+    Load the outputs of all finished shards into the sink in one go.
+
+    Shards without an output, e.g. because they failed, are skipped. The
+    outputs are removed only after they are loaded, so a failed merge can
+    be retried. Invalid records are moved to the quarantine file. The
+    observations of the shards are committed to their response caches
+    after the load.
+
+    Args:
+        config (Config): Configuration object of the whole pipeline.
+        shards (list[int]): Numbers of the shards to merge.
+
+    Returns:
+        int: Number of records merged.
+    """
+    parts = [shard_config(config, shard).processed_path for shard in shards]
+    parts = [part for part in parts if part.exists()]
+    if not parts:
+        return 0
+
+    # concatenate the shard outputs in shard order inside the kernel
+    merged = config.shards.work_dir / "merged.csv"
+    merged.unlink(missing_ok=True)
+    records = 0
+    for part in parts:
+        append_file(merged, part, sync=False)
+        records += count_lines(part)
+
+    # quarantine invalid records, so one does not fail the whole merge
+    if records:
+        records = validate_weather_file(config, merged).records_out
+    if records:
+        save_weather_data(config.model_copy(update={"processed_path": merged}))
+
+    # mark the observations of the shards as seen once they are loaded
+    for shard in shards:
+        commit_observations(shard_config(config, shard).cache)
+
+    for part in parts:
+        part.unlink()
+    merged.unlink()
+    return records
@@ -0,0 +1,315 @@
+import dbm
+import mmap
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from .dedup import dbm_files, parse_key
+
+# key of the number of sink bytes the index covers
+COVERED_KEY = b"\x00covered"
+
+
+def day_of(dt: int) -> str:
+    """
+    Return the UTC day of an observation time, as used for partitions.
+
+    Args:
+        dt (int): Observation time in Unix seconds.
+
+    Returns:
+        str: The day as YYYY-MM-DD.
+    """
+    return datetime.fromtimestamp(dt, UTC).strftime("%Y-%m-%d")
+
+
+def merge_span(spans: list[int], start: int, end: int) -> None:
+    """
+    Append a byte range to a flat list of ranges, extending the last
+    range instead if the new one continues it.
+
+    Args:
+        spans (list[int]): Ranges as flat [start, end, start, end, ...].
+        start (int): Offset of the first byte of the range.
+        end (int): Offset after the last byte of the range.
+    """
+    if spans and spans[-1] == start:
+        spans[-1] = end
+    else:
+        spans.extend((start, end))
+
+
+class SinkIndex:
+    """Sparse index of the CSV sink from (location, day) to byte ranges.
+
+    Lines of one location and day are stored as few (start, end) ranges,
+    since consecutive lines of a key share one range. The ranges live in
+    a `dbm` hash file, so a lookup costs O(1) regardless of the sink size.
+    The index also records how many bytes of the sink it covers, so
+    lines appended without it are picked up by `catch_up`. Use it as a
+    context manager to close the file.
+
+    Attributes:
+        path (Path): Path to the index file.
+        readonly (bool): Whether the index is opened for lookups only,
+            e.g. by readers that do not hold the sink lock.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._db = dbm.open(str(path), "r")
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = dbm.open(str(path), "c")
+        self._pending: dict[tuple[str, str], list[int]] = {}
+        self._pending_end: int | None = None
+
+    def __enter__(self) -> "SinkIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the index file."""
+        self._db.close()
+
+    @staticmethod
+    def _key(location: str, day: str) -> bytes:
+        return f"{location}\x1f{day}".encode()
+
+    @property
+    def covered(self) -> int:
+        """Number of bytes at the start of the sink that are indexed."""
+        return int(self._db.get(COVERED_KEY, b"0"))
+
+    def spans(self, location: str, day: str) -> list[tuple[int, int]]:
+        """
+        Look up the byte ranges of a location and day.
+
+        Args:
+            location (str): Location of the records.
+            day (str): UTC day as YYYY-MM-DD.
+
+        Returns:
+            list[tuple[int, int]]: (start, end) offsets in the sink, in
+            file order.
+        """
+        value = self._db.get(self._key(location, day))
+        if value is None:
+            return []
+        flat = array("Q", value)
+        return list(zip(flat[::2], flat[1::2], strict=True))
+
+    def _commit(
+        self, pending: dict[tuple[str, str], list[int]], covered: int
+    ) -> None:
+        """Merge collected ranges into the index and advance `covered`."""
+        for (location, day), spans in pending.items():
+            key = self._key(location, day)
+            flat = list(array("Q", self._db.get(key, b"")))
+            for start, end in zip(spans[::2], spans[1::2], strict=True):
+                merge_span(flat, start, end)
+            self._db[key] = array("Q", flat).tobytes()
+        self._db[COVERED_KEY] = str(covered).encode()
+
+    def track(self, lines: Iterable[str], offset: int) -> Iterator[str]:
+        """
+        Pass lines through while recording their byte ranges.
+
+        The ranges are kept in memory until `commit` is called, which the
+        consumer does once the lines are durably written. Lines that are
+        never committed are indexed later by `catch_up`.
+
+        Args:
+            lines (Iterable[str]): CSV lines in the sink layout, each
+            ending in a newline. An item may hold several lines.
+            offset (int): Size of the sink before the first line is
+            appended.
+
+        Yields:
+            str: The items of `lines`, unchanged.
+        """
+        for chunk in lines:
+            yield chunk
+            for line in chunk.splitlines(keepends=True):
+                location, dt = parse_key(line)
+                end = offset + len(line.encode())
+                merge_span(
+                    self._pending.setdefault((location, day_of(dt)), []),
+                    offset,
+                    end,
+                )
+                offset = end
+            self._pending_end = offset
+
+    def commit(self) -> None:
+        """Store the ranges recorded by `track`."""
+        if self._pending_end is not None:
+            self._commit(self._pending, self._pending_end)
+        self._pending = {}
+        self._pending_end = None
+
+    def catch_up(self, sink_path: Path) -> int:
+        """
+        Index the lines appended to the sink beyond the covered bytes.
+
+        Args:
+            sink_path (Path): Path to the CSV sink.
+
+        Returns:
+            int: Number of lines indexed.
+        """
+        offset = self.covered
+        pending: dict[tuple[str, str], list[int]] = {}
+        count = 0
+        for start, line in scan_lines(sink_path, offset):
+            offset = start + len(line)
+            if line.strip():
+                location, dt = parse_key(line.decode())
+                merge_span(
+                    pending.setdefault((location, day_of(dt)), []),
+                    start,
+                    offset,
+                )
+                count += 1
+        self._commit(pending, offset)
+        return count
+
+
+def scan_lines(sink_path: Path, offset: int) -> Iterator[tuple[int, bytes]]:
+    """
+    Read the complete lines of the sink from an offset on; a partially
+    written last line is left for a later scan.
+
+    Args:
+        sink_path (Path): Path to the CSV sink, which may not exist yet.
+        offset (int): Offset of the first line to read.
+
+    Yields:
+        tuple[int, bytes]: Offset and bytes of every line, including the
+        newline.
+    """
+    if not sink_path.exists():
+        return
+    with open(sink_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            yield offset, line
+            offset += len(line)
+
+
+def sink_size(sink_path: Path) -> int:
+    """
+    Return the size of the sink in bytes, 0 if it does not exist yet.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+
+    Returns:
+        int: Size in bytes.
+    """
+    try:
+        return sink_path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def rebuild_sink_index(index_path: Path, sink_path: Path) -> int:
+    """
+    Rebuild the index from a full scan of the sink.
+
+    Args:
+        index_path (Path): Path to the index file, replaced entirely.
+        sink_path (Path): Path to the CSV sink.
+
+    Returns:
+        int: Number of lines indexed.
+    """
+    # start from an empty index, dbm backends may use several files
+    for path in dbm_files(index_path):
+        path.unlink()
+
+    with SinkIndex(index_path) as index:
+        return index.catch_up(sink_path)
+
+
+def read_weather_range(
+    sink_path: Path,
+    index_path: Path,
+    location: str,
+    start: datetime,
+    end: datetime,
+) -> Iterator[str]:
+    """
+    Yield the sink lines of a location observed in [start, end).
+
+    Only the byte ranges the index lists for the location and the days of
+    the query are memory-mapped and scanned, so the cost depends on the
+    size of the result, not of the sink. The index is opened read-only,
+    so queries need not hold the sink lock; lines appended beyond the
+    indexed bytes are scanned directly and left for the next load to
+    index.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+        index_path (Path): Path to the sink index.
+        location (str): Location to read.
+        start (datetime): Start of the range, inclusive.
+        end (datetime): End of the range, exclusive.
+
+    Yields:
+        str: CSV lines in the sink layout, in file order.
+    """
+    first = int(start.timestamp())
+    last = int(end.timestamp())
+    if last <= first:
+        return
+
+    # collect the ranges of every day touched by the query, scanning the
+    # whole sink if it was never indexed
+    spans = []
+    covered = 0
+    day = datetime.fromtimestamp(first, UTC).date()
+    last_day = datetime.fromtimestamp(last - 1, UTC).date()
+    if dbm_files(index_path):
+        with SinkIndex(index_path, readonly=True) as index:
+            covered = index.covered
+            while day <= last_day:
+                spans.extend(index.spans(location, day.isoformat()))
+                day += timedelta(days=1)
+
+    # map each range at an aligned offset and filter its lines by time;
+    # ranges are cut at the covered bytes read first, since a concurrent
+    # load may store new ranges before it advances them
+    with open(sink_path, "rb") as f:
+        for span_start, span_end in sorted(spans):
+            span_end = min(span_end, covered)
+            if span_start >= span_end:
+                continue
+            aligned = span_start - span_start % mmap.ALLOCATIONGRANULARITY
+            with mmap.mmap(
+                f.fileno(),
+                span_end - aligned,
+                offset=aligned,
+                access=mmap.ACCESS_READ,
+            ) as view:
+                data = view[span_start - aligned :]
+            for line in data.decode().splitlines(keepends=True):
+                _, dt = parse_key(line)
+                if first <= dt < last:
+                    yield line
+
+    # filter the lines beyond the indexed bytes one by one
+    for _, raw in scan_lines(sink_path, covered):
+        if not raw.strip():
+            continue
+        line = raw.decode()
+        key, dt = parse_key(line)
+        if key == location and first <= dt < last:
+            yield line
@@ -0,0 +1,86 @@
+from pathlib import Path
+from typing import Protocol, Self
+
+import pyarrow as pa
+
+from .columnar import ColumnarSinkWriter
+from .config import Config
+from .schema import WeatherSchema, schema_for
+from .sqlite_sink import SqliteSinkWriter
+
+
+class TableSinkWriter(Protocol):
+    """Writer of weather tables into a sink, e.g. `ColumnarSinkWriter` or
+    `SqliteSinkWriter`.
+
+    Appended tables may be buffered; `flush` writes them, and leaving the
+    context flushes the remainder.
+    """
+
+    def __enter__(self) -> Self: ...
+
+    def __exit__(self, *exc_info) -> None: ...
+
+    def new_rows(self, table: pa.Table) -> pa.Table:
+        """Select the rows of a table that appending it would add."""
+        ...
+
+    def append(self, table: pa.Table) -> None:
+        """Buffer a table following the schema of the sink."""
+        ...
+
+    def flush(self) -> int:
+        """Write the buffered rows and return their number."""
+        ...
+
+
+def table_batch_rows(config: Config) -> int:
+    """
+    Return the number of rows the configured table sink writes at once.
+
+    Args:
+        config (Config): Configuration object containing the sink.
+
+    Returns:
+        int: The batch size of the Parquet or SQLite sink.
+    """
+    if config.sink_backend == "sqlite":
+        return config.sqlite.batch_rows
+    return config.columnar.batch_rows
+
+
+def open_table_sink(
+    config: Config,
+    schema: WeatherSchema | None = None,
+    path: Path | None = None,
+) -> TableSinkWriter:
+    """
+    Open the writer of the configured table sink.
+
+    Args:
+        config (Config): Configuration object containing the sink.
+        schema (WeatherSchema | None): Field schema of the sink, the
+        configured one if None.
+        path (Path | None): Dataset or database to write instead of the
+        configured one, e.g. a staging copy.
+
+    Raises:
+        ValueError: If the sink is the CSV file, which is written as
+        lines instead.
+
+    Returns:
+        TableSinkWriter: The writer.
+    """
+    if schema is None:
+        schema = schema_for(config)
+    if config.sink_backend == "parquet":
+        columnar = config.columnar
+        return ColumnarSinkWriter(
+            path or columnar.path,
+            columnar.batch_rows,
+            columnar.compression,
+            schema,
+        )
+    if config.sink_backend == "sqlite":
+        return SqliteSinkWriter.from_config(config.sqlite, schema, path)
+    raise ValueError(f"Not a table sink: {config.sink_backend}")
@@ -0,0 +1,399 @@
+import sqlite3
+from collections.abc import Iterable
+from contextlib import ExitStack
+from datetime import UTC, date, datetime, time, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .aggregates import update_aggregates
+from .columnar import iter_weather_csv
+from .config import Config, SqliteConfig
+from .dedup import DedupIndex, add_rows, filter_new_rows, table_keys
+from .schema import DEFAULT_SCHEMA, WeatherSchema, schema_for
+
+# name of the table holding the weather records
+TABLE = "weather"
+
+# SQLite column types of the field types; timestamps are stored as Unix
+# seconds
+SQLITE_TYPES = {
+    "string": "TEXT",
+    "int16": "INTEGER",
+    "int32": "INTEGER",
+    "int64": "INTEGER",
+    "float64": "REAL",
+    "timestamp": "INTEGER",
+}
+
+
+def create_statements(schema: WeatherSchema) -> list[str]:
+    """
+    Build the statements creating the weather table and its time index.
+
+    The table is keyed and clustered by (location, dt), so the records of
+    a location are stored in time order and a key lookup or a location
+    range is a single index seek. The secondary index on `dt` serves time
+    ranges across all locations.
+
+    Args:
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        list[str]: The CREATE statements, safe to run on every open.
+    """
+    columns = [
+        f'"{spec.name}" {SQLITE_TYPES[spec.type]}'
+        + (" NOT NULL" if spec.name in ("location", "dt") else "")
+        for spec in schema.fields
+    ]
+    return [
+        f"CREATE TABLE IF NOT EXISTS {TABLE} (\n    "
+        + ",\n    ".join(columns)
+        + ",\n    PRIMARY KEY (location, dt)\n) WITHOUT ROWID",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_dt ON {TABLE} (dt)",
+    ]
+
+
+def upsert_statement(schema: WeatherSchema) -> str:
+    """
+    Build the statement inserting a record, or replacing the values of
+    the record with the same (location, dt).
+
+    Args:
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        str: The INSERT statement with one parameter per field.
+    """
+    names = [f'"{name}"' for name in schema.names]
+    updates = [f"{name} = excluded.{name}" for name in names[2:]]
+    statement = (
+        f"INSERT INTO {TABLE} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+    if not updates:
+        return statement + " ON CONFLICT (location, dt) DO NOTHING"
+    return (
+        statement
+        + " ON CONFLICT (location, dt) DO UPDATE SET "
+        + ", ".join(updates)
+    )
+
+
+def table_rows(table: pa.Table) -> list[tuple]:
+    """
+    Convert a weather table into parameter rows, timestamps as Unix
+    seconds.
+
+    Args:
+        table (pa.Table): Table following the schema.
+
+    Returns:
+        list[tuple]: One tuple of values per record.
+    """
+    columns = []
+    for column in table.columns:
+        if pa.types.is_timestamp(column.type):
+            column = column.cast(pa.int64())
+        columns.append(column.to_pylist())
+    return list(zip(*columns, strict=True))
+
+
+def connect(path: Path, synchronous: str = "normal") -> sqlite3.Connection:
+    """
+    Open the database in WAL mode, so readers are not blocked while a
+    batch is written.
+
+    Args:
+        path (Path): Path to the SQLite database, created if missing.
+        synchronous (str): SQLite synchronous mode.
+
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(f"PRAGMA synchronous={synchronous.upper()}")
+    return db
+
+
+class SqliteSinkWriter:
+    """Buffered writer of weather tables into the SQLite sink.
+
+    Appended tables are kept in memory until `batch_rows` rows have been
+    collected and are then upserted with a single `executemany` in one
+    transaction. A record with the (location, dt) of a stored one
+    replaces its values; records missing either cannot be keyed and are
+    dropped. Use it as a context manager to flush the remainder and close
+    the database on exit.
+
+    Attributes:
+        path (Path): Path to the SQLite database.
+        batch_rows (int): Number of buffered rows that triggers a flush.
+        schema (WeatherSchema): Field schema of the sink.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        batch_rows: int = 10_000,
+        synchronous: str = "normal",
+        schema: WeatherSchema = DEFAULT_SCHEMA,
+    ):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.schema = schema
+        self._buffer: list[pa.Table] = []
+        self._buffered_rows = 0
+        self._upsert = upsert_statement(schema)
+        self._db = connect(path, synchronous)
+        with self._db:
+            for statement in create_statements(schema):
+                self._db.execute(statement)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: SqliteConfig,
+        schema: WeatherSchema = DEFAULT_SCHEMA,
+        path: Path | None = None,
+    ) -> "SqliteSinkWriter":
+        """
+        Open the writer described by the sink configuration.
+
+        Args:
+            config (SqliteConfig): Configuration of the SQLite sink.
+            schema (WeatherSchema): Field schema of the sink.
+            path (Path | None): Database to write instead of the
+                configured one, e.g. a staging copy.
+
+        Returns:
+            SqliteSinkWriter: The writer.
+        """
+        return cls(
+            path or config.path, config.batch_rows, config.synchronous, schema
+        )
+
+    def __enter__(self) -> "SqliteSinkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.flush()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def _keyed(self, table: pa.Table) -> pa.Table:
+        """Cast a table to the schema and drop rows that cannot be keyed."""
+        table = self.schema.cast(table)
+        return table.filter(
+            pc.and_(
+                pc.is_valid(table.column("location")),
+                pc.is_valid(table.column("dt")),
+            )
+        )
+
+    def new_rows(self, table: pa.Table) -> pa.Table:
+        """
+        Select the rows an upsert of the table would insert rather than
+        replace: those whose (location, dt) is neither stored nor buffered
+        nor repeated earlier in the table. Call it before `append`, e.g.
+        to fold only new records into the aggregates.
+
+        Args:
+            table (pa.Table): Table following the schema.
+
+        Returns:
+            pa.Table: The rows with a new key.
+        """
+        table = self._keyed(table)
+        seen = {key for part in self._buffer for key in table_keys(part)}
+        exists = f"SELECT 1 FROM {TABLE} WHERE location = ? AND dt = ?"
+        mask = []
+        for key in table_keys(table):
+            new = key not in seen and (
+                self._db.execute(exists, key).fetchone() is None
+            )
+            mask.append(new)
+            seen.add(key)
+        return table.filter(pa.array(mask, type=pa.bool_()))
+
+    def append(self, table: pa.Table) -> None:
+        """
+        Buffer a table and flush if the batch is full.
+
+        Args:
+            table (pa.Table): Table following the schema.
+        """
+        table = self._keyed(table)
+        self._buffer.append(table)
+        self._buffered_rows += table.num_rows
+        if self._buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Upsert all buffered rows in one transaction.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows = self._buffered_rows
+        if not rows:
+            return 0
+        table = pa.concat_tables(self._buffer)
+        self._buffer.clear()
+        self._buffered_rows = 0
+        with self._db:
+            self._db.executemany(self._upsert, table_rows(table))
+        return rows
+
+
+def replace_database(staging: Path, path: Path) -> None:
+    """
+    Move a staged database into place, dropping the write-ahead log of
+    the replaced one so it is not applied to the new file.
+
+    Args:
+        staging (Path): Path to the staged database, closed.
+        path (Path): Path to the live database, replaced.
+    """
+    for suffix in ("-wal", "-shm"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+    staging.replace(path)
+
+
+def day_start(day: date) -> int:
+    """
+    Return the start of a UTC day in Unix seconds.
+
+    Args:
+        day (date): The day.
+
+    Returns:
+        int: Midnight of the day in UTC.
+    """
+    return int(datetime.combine(day, time(), UTC).timestamp())
+
+
+def read_weather_sqlite(
+    path: Path,
+    columns: list[str] | None = None,
+    locations: Iterable[str] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+) -> pa.Table:
+    """
+    Query the SQLite sink through its indexes, reading only the requested
+    columns and the records matching the location and date filters.
+
+    Args:
+        path (Path): Path to the SQLite database.
+        columns (list[str] | None): Columns to read, all if None.
+        locations (Iterable[str] | None): Locations to read, all if None.
+        start (date | None): First day to read, inclusive.
+        end (date | None): Last day to read, inclusive.
+        schema (WeatherSchema): Field schema of the sink.
+
+    Returns:
+        pa.Table: The matching rows ordered by location and time.
+    """
+    if columns is None:
+        columns = schema.names
+
+    # build the conditions on the key and the time index
+    conditions = []
+    params: list = []
+    if locations is not None:
+        locations = list(locations)
+        conditions.append(f"location IN ({', '.join('?' * len(locations))})")
+        params.extend(locations)
+    if start is not None:
+        conditions.append("dt >= ?")
+        params.append(day_start(start))
+    if end is not None:
+        conditions.append("dt < ?")
+        params.append(day_start(end + timedelta(days=1)))
+    selected = ", ".join(f'"{name}"' for name in columns)
+    query = f"SELECT {selected} FROM {TABLE}"
+    if conditions:
+        query += f" WHERE {' AND '.join(conditions)}"
+    query += " ORDER BY location, dt"
+
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute(query, params).fetchall()
+    finally:
+        db.close()
+
+    # convert the rows into typed columns, timestamps from Unix seconds
+    values = list(zip(*rows, strict=True)) or [()] * len(columns)
+    arrays = []
+    for name, column in zip(columns, values, strict=True):
+        field = schema.arrow.field(name)
+        if pa.types.is_timestamp(field.type):
+            arrays.append(pa.array(column, pa.int64()).cast(field.type))
+        else:
+            arrays.append(pa.array(column, field.type))
+    return pa.table(arrays, names=columns)
+
+
+def save_weather_data_sqlite(config: Config) -> int:
+    """
+    Upsert the processed weather data into the SQLite sink, skipping
+    records already in the dedup index if one is configured, and fold the
+    inserted records into the aggregate store if one is configured. A
+    record that replaces the values of a stored key is not aggregated
+    again.
+
+    Args:
+        config (Config): Configuration object containing the processed
+        path and the SQLite sink settings.
+
+    Raises:
+        FileNotFoundError: If the processed data file does not exist.
+
+    Returns:
+        int: Number of rows written.
+    """
+    # extract parameters from config
+    processed_path: Path = config.processed_path
+
+    # ensure processed data file exists
+    if not processed_path.exists():
+        raise FileNotFoundError(
+            f"Processed data file not found: {processed_path}"
+        )
+
+    # stream the file in blocks; each block is written before its keys
+    # are indexed, so an interrupted load can leave a record unindexed but
+    # never indexed and missing
+    schema = schema_for(config)
+    rows = 0
+    with ExitStack() as stack:
+        index = None
+        if config.dedup_index_path is not None:
+            index = stack.enter_context(DedupIndex(config.dedup_index_path))
+        writer = stack.enter_context(
+            SqliteSinkWriter.from_config(config.sqlite, schema)
+        )
+        for table in iter_weather_csv(processed_path, schema):
+            if index is not None:
+                table = filter_new_rows(index, table)
+            inserted = table
+            if config.aggregates_path is not None:
+                inserted = writer.new_rows(table)
+            writer.append(table)
+            rows += writer.flush()
+            if index is not None:
+                add_rows(index, table)
+            update_aggregates(config, inserted)
+    return rows
@@ -1,14 +1,125 @@
-import json
-from datetime import datetime
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.json as pa_json
+
 from .config import Config
+from .metrics import stage_metrics
+from .records import WeatherBatch
+from .schema import (
+    DEFAULT_SCHEMA,
+    PAYLOAD_ERRORS,
+    WeatherSchema,
+    schema_for,
+)
+from .validate import quarantine_records
+
+# parse raw payloads with orjson where it is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# subset of the OpenWeatherMap response needed by the transform with the
+# default fields; other fields are ignored while parsing
+RAW_WEATHER_SCHEMA = DEFAULT_SCHEMA.raw
+
+
+def format_weather_record(
+    data: dict, schema: WeatherSchema = DEFAULT_SCHEMA
+) -> str:
+    """
+    Format a raw weather payload as a semicolon-separated CSV line.
+
+    Args:
+        data (dict): Raw response of the OpenWeatherMap API.
+        schema (WeatherSchema): Field schema selecting the columns.
+
+    Raises:
+        KeyError: If a required field is missing.
+        IndexError: If a required list entry is missing.
+        ValueError: If a value does not fit the type of its field.
+
+    Returns:
+        str: The CSV line, including the trailing newline.
+    """
+    return schema.format_line(data)
+
+
+def transform_weather_records(
+    payloads: Iterable[dict],
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    rejected: list[tuple[object, list[str]]] | None = None,
+) -> Iterator[str]:
+    """
+    Lazily format a stream of raw weather payloads as CSV lines.
+
+    Args:
+        payloads (Iterable[dict]): Raw responses of the OpenWeatherMap API.
+        schema (WeatherSchema): Field schema selecting the columns.
+        rejected (list[tuple[object, list[str]]] | None): Receives the
+        malformed payloads with the reason, e.g. for `quarantine_records`.
+        If None, a malformed payload raises instead.
+
+    Raises:
+        KeyError: If a required field is missing and `rejected` is None.
+        IndexError: If a required list entry is missing and `rejected` is
+        None.
+        ValueError: If a value does not fit the type of its field and
+        `rejected` is None.
+
+    Yields:
+        str: One CSV line per payload.
+    """
+    format_line = schema.format_line
+    if rejected is None:
+        for data in payloads:
+            yield format_line(data)
+        return
+
+    for data in payloads:
+        try:
+            yield format_line(data)
+        except PAYLOAD_ERRORS as e:
+            reason = f"malformed payload: {type(e).__name__} {e}"
+            rejected.append((data, [reason]))
+
+
+def transform_weather_batch(
+    payloads: Iterable[dict],
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    rejected: list[tuple[object, list[str]]] | None = None,
+) -> WeatherBatch:
+    """
+    Transform raw weather payloads into a compact column-backed batch.
+
+    Args:
+        payloads (Iterable[dict]): Raw responses of the OpenWeatherMap API.
+        schema (WeatherSchema): Field schema selecting the columns.
+        rejected (list[tuple[object, list[str]]] | None): Receives the
+        malformed payloads with the reason, e.g. for `quarantine_records`.
+        If None, a malformed payload raises instead.
+
+    Raises:
+        KeyError: If a required field is missing and `rejected` is None.
+        IndexError: If a required list entry is missing and `rejected` is
+        None.
+
+    Returns:
+        WeatherBatch: One record per well-formed payload.
+    """
+    return WeatherBatch.from_payloads(payloads, schema, rejected)
 
 
 def process_weather_data(config: Config) -> None:
     """
     Process the raw weather data and save it to a new file.
 
+    A payload missing a required field is moved to the quarantine file
+    with the reason instead of failing the run, and the processed file is
+    left empty.
+
     Args:
         config (Config): Configuration object containing paths for raw
         and processed data.
@@ -27,40 +138,154 @@ def process_weather_data(config: Config) -> None:
     # ensure the processed_path directory exists
     processed_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # fetch raw data
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    # extract relevant fields
-    loc = data["name"]
-    dt = data["dt"]
-    desc = data["weather"][0]["description"]
-    temp = data["main"]["temp"]
-    clouds = data["clouds"]["all"]
-    humidity = data["main"]["humidity"]
-    wind_speed = data["wind"]["speed"]
-    pressure = data["main"]["pressure"]
-
-    # create csv string
-    csv_string = (
-        f"{loc};"
-        f"{dt};"
-        f"{desc};"
-        f"{temp};"
-        f"{clouds};"
-        f"{humidity};"
-        f"{wind_speed};"
-        f"{pressure}\n"
+    with stage_metrics(config, "transform") as metrics:
+        # fetch raw data
+        raw = raw_path.read_bytes()
+        data = json_loads(raw)
+        metrics.add(records_in=1, bytes_read=len(raw))
+
+        # create csv string, quarantining a malformed payload
+        try:
+            csv_string = format_weather_record(data, schema_for(config))
+        except PAYLOAD_ERRORS as e:
+            reason = f"malformed payload: {type(e).__name__} {e}"
+            quarantine_records(
+                config.validation.quarantine_path, [(data, [reason])], raw_path
+            )
+            metrics.add(records_quarantined=1)
+            csv_string = ""
+
+        # replace the processed file, it can be rebuilt from the archive
+        with open(processed_path, "w") as f:
+            f.write(csv_string)
+            metrics.add(
+                records_out=int(bool(csv_string)), bytes_written=f.tell()
+            )
+
+
+def read_raw_batch(
+    path: Path, schema: WeatherSchema = DEFAULT_SCHEMA
+) -> pa.Table:
+    """
+    Parse a JSONL file of raw payloads into a nested Arrow table using the
+    multithreaded Arrow JSON reader.
+
+    Args:
+        path (Path): Path to the JSONL file, one payload per line.
+        schema (WeatherSchema): Field schema selecting the raw fields.
+
+    Returns:
+        pa.Table: Table following the raw layout of the schema.
+    """
+    return pa_json.read_json(
+        path,
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=schema.raw,
+            unexpected_field_behavior="ignore",
+        ),
     )
 
-    # if file exists, rename it with a date and time suffix
-    if processed_path.exists():
-        today = datetime.now().strftime("%Y%m%d%H%M%S")
-        processed_path.rename(
-            processed_path.with_name(processed_path.stem + f"_{today}.bak")
-        )
 
-    # touch csv file and dump processed data
-    processed_path.touch(exist_ok=False)
-    with open(processed_path, "w") as f:
-        f.write(csv_string)
+def flatten_weather_batch(
+    raw: pa.Table, schema: WeatherSchema = DEFAULT_SCHEMA
+) -> pa.Table:
+    """
+    Flatten nested raw payloads into the typed weather columns.
+
+    All fields are extracted column-wise with Arrow compute kernels, so
+    the cost does not depend on Python-level work per record. Missing
+    fields become their default or nulls instead of raising.
+
+    Args:
+        raw (pa.Table): Table following the raw layout of the schema.
+        schema (WeatherSchema): Field schema selecting the columns.
+
+    Returns:
+        pa.Table: Table following the schema.
+    """
+    return schema.flatten(raw)
+
+
+def process_weather_batch(
+    payloads: Iterable[dict],
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    rejected: list[tuple[object, list[str]]] | None = None,
+) -> pa.Table:
+    """
+    Transform many in-memory raw payloads into one typed table.
+
+    The payloads are converted in one call. If a value does not match the
+    raw type of its field, they are converted again one by one, so only
+    the mismatching payloads are dropped.
+
+    Args:
+        payloads (Iterable[dict]): Raw responses of the OpenWeatherMap API.
+        schema (WeatherSchema): Field schema selecting the columns.
+        rejected (list[tuple[object, list[str]]] | None): Receives the
+        payloads that could not be converted with the reason, e.g. for
+        `quarantine_records`. If None, a mismatch raises instead.
+
+    Raises:
+        pa.ArrowInvalid: If a value does not match its raw type and
+        `rejected` is None.
+
+    Returns:
+        pa.Table: Table following the schema, ready for the sink.
+    """
+    payloads = list(payloads)
+    raw_type = pa.struct(schema.raw)
+    try:
+        raw = pa.array(payloads, type=raw_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if rejected is None:
+            raise
+
+        # convert record by record, so one bad payload does not fail all
+        arrays = []
+        for payload in payloads:
+            try:
+                arrays.append(pa.array([payload], type=raw_type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                reason = f"malformed payload: {type(e).__name__} {e}"
+                rejected.append((payload, [reason]))
+        raw = pa.concat_arrays(arrays) if arrays else pa.array([], raw_type)
+    return flatten_weather_batch(pa.Table.from_struct_array(raw), schema)
+
+
+def process_weather_batch_data(config: Config) -> pa.Table:
+    """
+    Transform the raw JSONL batch written by the batch extractor.
+
+    Args:
+        config (Config): Configuration object containing the raw batch
+        path.
+
+    Raises:
+        FileNotFoundError: If the raw batch file does not exist.
+
+    Returns:
+        pa.Table: Table following the configured fields, ready for the
+        sink.
+    """
+    # extract paths from config
+    raw_batch_path: Path = config.raw_batch_path
+    schema = schema_for(config)
+
+    # ensure file at raw_batch_path exists
+    if not raw_batch_path.exists():
+        raise FileNotFoundError(f"Raw data file not found: {raw_batch_path}")
+
+    with stage_metrics(config, "transform") as metrics:
+        # an empty batch has no rows for the JSON reader to infer from
+        size = raw_batch_path.stat().st_size
+        if size == 0:
+            return process_weather_batch([], schema)
+
+        raw = read_raw_batch(raw_batch_path, schema)
+        table = flatten_weather_batch(raw, schema)
+        metrics.add(
+            records_in=raw.num_rows,
+            records_out=table.num_rows,
+            bytes_read=size,
+        )
+        return table
@@ -0,0 +1,690 @@
+import json
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from .columnar import READ_BLOCK
+from .config import Config, FieldSpec
+from .dedup import DedupIndex, dbm_files, latest_observations
+from .metrics import stage_metrics
+from .records import WeatherBatch
+from .runs import sink_lock
+from .schema import DEFAULT_SCHEMA, WeatherSchema, schema_for
+
+# text of the numbers accepted per field type; integers are limited to 18
+# digits so parsing never overflows before the range of the type is checked
+NUMBER_PATTERNS = {
+    "int16": r"^-?\d{1,18}$",
+    "int32": r"^-?\d{1,18}$",
+    "int64": r"^-?\d{1,18}$",
+    "timestamp": r"^-?\d{1,18}$",
+    "float64": r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$",
+}
+
+# exclusive magnitude limit of the narrow integer field types; 18 digits
+# always fit the 64-bit ones
+INTEGER_LIMITS = {"int16": 1 << 15, "int32": 1 << 31}
+
+# timestamps are shifted by their location's rank times this offset, so a
+# running maximum over all rows never carries over between locations
+LOCATION_OFFSET = 1 << 34
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of validating a batch of records.
+
+    Attributes:
+        records_in (int): Number of records read, malformed lines
+            included.
+        records_out (int): Number of valid records kept.
+        quarantined (int): Number of records moved to the quarantine.
+        reasons (Counter): Number of rejected records per reason.
+    """
+
+    records_in: int = 0
+    records_out: int = 0
+    quarantined: int = 0
+    reasons: Counter = field(default_factory=Counter)
+
+
+def iter_weather_strings(
+    path: Path,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    malformed: list[str] | None = None,
+    block_size: int = READ_BLOCK,
+) -> Iterator[pa.Table]:
+    """
+    Stream a processed CSV file with every column as text, one table per
+    block, so values of the wrong type are kept for validation instead of
+    failing the read and files of any size are read in constant memory.
+
+    Args:
+        path (Path): Path to the processed file.
+        schema (WeatherSchema): Field schema of the CSV columns.
+        malformed (list[str] | None): Receives the text of the lines with
+        a wrong number of fields as their block is read.
+        block_size (int): Approximate number of bytes parsed per table.
+
+    Yields:
+        pa.Table: The well-formed lines of a block with one string column
+        per field, empty values as nulls.
+    """
+    if not path.stat().st_size:
+        return
+
+    def skip(row) -> str:
+        if malformed is not None:
+            malformed.append(row.text)
+        return "skip"
+
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(
+            column_names=schema.names,
+            block_size=block_size,
+            use_threads=False,
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=";", invalid_row_handler=skip
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in schema.names},
+            strings_can_be_null=True,
+        ),
+    )
+    with reader:
+        for batch in reader:
+            yield pa.Table.from_batches([batch])
+
+
+def check_column(
+    spec: FieldSpec, column: pa.ChunkedArray
+) -> tuple[pa.ChunkedArray, list[tuple[pa.ChunkedArray, str]]]:
+    """
+    Parse a text column into its field type and check its values.
+
+    Args:
+        spec (FieldSpec): Field of the column.
+        column (pa.ChunkedArray): Values as text, nulls where empty.
+
+    Returns:
+        tuple[pa.ChunkedArray, list[tuple[pa.ChunkedArray, str]]]: The
+        parsed values, null where invalid, with integer timestamps in
+        Unix seconds, and a mask of the rejected rows per reason.
+    """
+    checks = []
+    if spec.required:
+        checks.append((pc.is_null(column), f"{spec.name}: missing"))
+    if spec.type == "string":
+        return column, checks
+
+    # numbers that do not parse or do not fit the type are type errors
+    parsed = pc.fill_null(
+        pc.match_substring_regex(column, NUMBER_PATTERNS[spec.type]), False
+    )
+    text = pc.if_else(parsed, column, pa.scalar(None, pa.string()))
+    if spec.type == "float64":
+        values = pc.cast(text, pa.float64())
+        fits = pc.fill_null(pc.is_finite(values), False)
+    else:
+        values = pc.cast(text, pa.int64())
+        fits = parsed
+        limit = INTEGER_LIMITS.get(spec.type)
+        if limit is not None:
+            fits = pc.fill_null(
+                pc.and_(
+                    pc.greater_equal(values, -limit), pc.less(values, limit)
+                ),
+                False,
+            )
+    checks.append(
+        (
+            pc.and_(pc.is_valid(column), pc.invert(fits)),
+            f"{spec.name}: not a valid {spec.type}",
+        )
+    )
+    values = pc.if_else(fits, values, pa.scalar(None, values.type))
+    checks.extend(check_range(spec, values))
+    return values, checks
+
+
+def check_range(
+    spec: FieldSpec, values: pa.ChunkedArray
+) -> list[tuple[pa.ChunkedArray, str]]:
+    """
+    Check that the values of a numeric column are plausible, i.e. within
+    the range of the field.
+
+    Args:
+        spec (FieldSpec): Field of the column.
+        values (pa.ChunkedArray): Typed values, timestamps in Unix
+        seconds; nulls pass.
+
+    Returns:
+        list[tuple[pa.ChunkedArray, str]]: A mask of the rejected rows
+        per bound of the field.
+    """
+    checks = []
+    for bound, compare, side in (
+        (spec.minimum, pc.less, "below"),
+        (spec.maximum, pc.greater, "above"),
+    ):
+        if bound is not None:
+            checks.append(
+                (
+                    pc.fill_null(compare(values, bound), False),
+                    f"{spec.name}: {side} {bound:g}",
+                )
+            )
+    return checks
+
+
+def out_of_order(
+    locations: pa.ChunkedArray,
+    dts: pa.ChunkedArray,
+    latest: Mapping[str, int] | None = None,
+) -> pa.Array:
+    """
+    Flag records older than an earlier record of the same location or
+    than the latest one already loaded.
+
+    The loaded observation times are prepended as rows of their own, the
+    rows are stably sorted by location and every timestamp is offset by
+    the rank of its location, so one running maximum over all rows yields
+    the latest earlier observation of every location.
+
+    Args:
+        locations (pa.ChunkedArray): Location of every record.
+        dts (pa.ChunkedArray): Observation time in Unix seconds, null if
+        invalid.
+        latest (Mapping[str, int] | None): Latest observation time loaded
+        per location, e.g. from `latest_loaded`.
+
+    Returns:
+        pa.Array: True for the records out of order, in row order.
+    """
+    loaded = list((latest or {}).items())
+    if len(dts) + min(len(loaded), 1) < 2:
+        return pa.array([False] * len(dts))
+    locations = pa.concat_arrays(
+        [
+            pa.array([location for location, _ in loaded], pa.string()),
+            pc.fill_null(locations, "").combine_chunks().cast(pa.string()),
+        ]
+    )
+    dts = pa.concat_arrays(
+        [
+            pa.array([dt for _, dt in loaded], pa.int64()),
+            dts.combine_chunks().cast(pa.int64()),
+        ]
+    )
+    order = pc.sort_indices(locations)
+    sorted_locations = pc.take(locations, order)
+    sorted_dts = pc.take(dts, order)
+
+    # rank of the location of every row, counted in sorted order
+    starts = pc.not_equal(sorted_locations[1:], sorted_locations[:-1])
+    rank = pc.cumulative_sum(
+        pa.concat_arrays([pa.array([0], pa.int64()), starts.cast(pa.int64())])
+    )
+    keyed = pc.add(
+        pc.multiply(rank, LOCATION_OFFSET),
+        pc.min_element_wise(
+            pc.max_element_wise(pc.fill_null(sorted_dts, 0), 0),
+            LOCATION_OFFSET - 1,
+        ),
+    )
+
+    # compare every row with the running maximum of the rows before it
+    latest = pc.cumulative_max(keyed)
+    earlier = pa.concat_arrays([pa.array([-1], pa.int64()), latest[:-1]])
+    flagged = pc.fill_null(
+        pc.and_(pc.is_valid(sorted_dts), pc.less(keyed, earlier)), False
+    )
+
+    # scatter the flags back into row order, without the loaded rows
+    inverse = pc.sort_indices(order)
+    return pc.take(flagged, inverse)[len(loaded) :]
+
+
+def latest_loaded(config: Config, locations: Iterable[str]) -> dict[str, int]:
+    """
+    Look up the latest observation time loaded per location in the dedup
+    index, holding the sink lock while it is read.
+
+    Args:
+        config (Config): Configuration object containing the dedup index.
+        locations (Iterable[str]): Locations to look up.
+
+    Returns:
+        dict[str, int]: Observation times of the locations with a loaded
+        record; empty without a dedup index.
+    """
+    path = config.dedup_index_path
+    if path is None or not dbm_files(path):
+        return {}
+    with sink_lock(config), DedupIndex(path, readonly=True) as index:
+        return latest_observations(index, locations)
+
+
+def validate_weather_table(
+    strings: pa.Table,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    monotonic: bool = True,
+    latest: Mapping[str, int] | None = None,
+) -> tuple[pa.Table, pa.ChunkedArray, list[list[str]]]:
+    """
+    Check the types, ranges and observation order of a batch of records
+    column by column, in one vectorized pass per check.
+
+    Args:
+        strings (pa.Table): One text column per field, e.g. from
+        `iter_weather_strings`.
+        schema (WeatherSchema): Field schema of the columns.
+        monotonic (bool): Whether to reject a record older than an
+        earlier record of its location or the latest one loaded.
+        latest (Mapping[str, int] | None): Latest observation time loaded
+        per location, e.g. from `latest_loaded`.
+
+    Returns:
+        tuple[pa.Table, pa.ChunkedArray, list[list[str]]]: The valid
+        records following the schema, a mask of the rejected rows and the
+        reasons of each rejected row in order.
+    """
+    columns = {}
+    checks: list[tuple[pa.ChunkedArray | pa.Array, str]] = []
+    for spec in schema.fields:
+        values, column_checks = check_column(spec, strings.column(spec.name))
+        columns[spec.name] = values
+        checks.extend(column_checks)
+    rejected, reasons = reject_rows(columns, checks, monotonic, latest)
+
+    valid = pa.table(columns).filter(pc.invert(rejected))
+    return schema.cast(valid), rejected, reasons
+
+
+def check_weather_table(
+    table: pa.Table,
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    monotonic: bool = True,
+    latest: Mapping[str, int] | None = None,
+) -> tuple[pa.Table, pa.ChunkedArray, list[list[str]]]:
+    """
+    Check the required values, ranges and observation order of typed
+    records with the same vectorized checks as `validate_weather_table`.
+
+    Args:
+        table (pa.Table): Records following the schema, e.g. from
+        `process_weather_batch`.
+        schema (WeatherSchema): Field schema of the columns.
+        monotonic (bool): Whether to reject a record older than an
+        earlier record of its location or the latest one loaded.
+        latest (Mapping[str, int] | None): Latest observation time loaded
+        per location.
+
+    Returns:
+        tuple[pa.Table, pa.ChunkedArray, list[list[str]]]: The valid
+        records, a mask of the rejected rows and the reasons of each
+        rejected row in order.
+    """
+    columns = {}
+    checks: list[tuple[pa.ChunkedArray | pa.Array, str]] = []
+    for spec in schema.fields:
+        values = table.column(spec.name)
+        if spec.type == "timestamp":
+            values = pc.cast(values, pa.int64())
+        columns[spec.name] = values
+        if spec.required:
+            checks.append((pc.is_null(values), f"{spec.name}: missing"))
+        if spec.type == "float64":
+            checks.append(
+                (
+                    pc.fill_null(pc.invert(pc.is_finite(values)), False),
+                    f"{spec.name}: not a valid {spec.type}",
+                )
+            )
+        if spec.type != "string":
+            checks.extend(check_range(spec, values))
+    rejected, reasons = reject_rows(columns, checks, monotonic, latest)
+    return table.filter(pc.invert(rejected)), rejected, reasons
+
+
+def reject_rows(
+    columns: Mapping[str, pa.ChunkedArray],
+    checks: list[tuple[pa.ChunkedArray | pa.Array, str]],
+    monotonic: bool,
+    latest: Mapping[str, int] | None,
+) -> tuple[pa.ChunkedArray, list[list[str]]]:
+    """
+    Combine the masks of the checks, check the observation order of the
+    remaining rows and collect the reasons of the rejected rows.
+
+    Args:
+        columns (Mapping[str, pa.ChunkedArray]): Typed values per field,
+        timestamps in Unix seconds.
+        checks (list[tuple[pa.ChunkedArray | pa.Array, str]]): A mask of
+        the rejected rows per reason.
+        monotonic (bool): Whether to reject a record older than an
+        earlier record of its location or the latest one loaded.
+        latest (Mapping[str, int] | None): Latest observation time loaded
+        per location.
+
+    Returns:
+        tuple[pa.ChunkedArray, list[list[str]]]: A mask of the rejected
+        rows and the reasons of each rejected row in order.
+    """
+    rejected = pa.chunked_array([pa.array([False] * len(columns["dt"]))])
+    for mask, _ in checks:
+        rejected = pc.or_(rejected, mask)
+
+    # order the remaining rows, so a rejected row does not hide others
+    if monotonic:
+        dts = pc.if_else(rejected, pa.scalar(None, pa.int64()), columns["dt"])
+        mask = out_of_order(columns["location"], dts, latest)
+        checks = [
+            *checks,
+            (mask, "dt: before an earlier observation of the location"),
+        ]
+        rejected = pc.or_(rejected, mask)
+
+    # collect the reasons of the rejected rows only
+    positions = pc.indices_nonzero(rejected)
+    reasons: list[list[str]] = [[] for _ in range(len(positions))]
+    for mask, reason in checks:
+        for i, hit in enumerate(pc.take(mask, positions).to_pylist()):
+            if hit:
+                reasons[i].append(reason)
+    return rejected, reasons
+
+
+def rejected_records(
+    table: pa.Table, rejected: pa.ChunkedArray, reasons: list[list[str]]
+) -> list[tuple[dict, list[str]]]:
+    """
+    Pair the rejected rows of a typed table with their reasons, as
+    records that can be written to the quarantine file.
+
+    Args:
+        table (pa.Table): Records following the schema.
+        rejected (pa.ChunkedArray): Mask of the rejected rows.
+        reasons (list[list[str]]): Reasons of each rejected row in order.
+
+    Returns:
+        list[tuple[dict, list[str]]]: Each rejected row as a dict,
+        timestamps in Unix seconds, and its reasons.
+    """
+    rows = table.filter(rejected)
+    for i, column in enumerate(rows.columns):
+        if pa.types.is_timestamp(column.type):
+            rows = rows.set_column(
+                i, rows.field(i).name, pc.cast(column, pa.int64())
+            )
+    return list(zip(rows.to_pylist(), reasons, strict=True))
+
+
+def filter_valid_rows(
+    table: pa.Table,
+    rejected: list[tuple[object, list[str]]],
+    schema: WeatherSchema = DEFAULT_SCHEMA,
+    monotonic: bool = True,
+    index: DedupIndex | None = None,
+) -> pa.Table:
+    """
+    Keep only the valid rows of a weather table, see
+    `check_weather_table`.
+
+    Args:
+        table (pa.Table): Records following the schema.
+        rejected (list[tuple[object, list[str]]]): Receives the rejected
+        rows with their reasons, e.g. for `quarantine_records`.
+        schema (WeatherSchema): Field schema of the columns.
+        monotonic (bool): Whether to reject a record older than an
+        earlier record of its location or the latest one loaded.
+        index (DedupIndex | None): Index of the loaded records to check
+        the observation order against.
+
+    Returns:
+        pa.Table: The valid rows.
+    """
+    latest = None
+    if monotonic and index is not None:
+        locations = pc.unique(table.column("location")).drop_null()
+        latest = latest_observations(index, locations.to_pylist())
+    valid, mask, reasons = check_weather_table(
+        table, schema, monotonic, latest
+    )
+    if reasons:
+        rejected.extend(rejected_records(table, mask, reasons))
+    return valid
+
+
+def filter_valid_records(
+    batch: WeatherBatch,
+    rejected: list[tuple[object, list[str]]],
+    monotonic: bool = True,
+    index: DedupIndex | None = None,
+) -> WeatherBatch:
+    """
+    Keep only the valid records of a batch, see `check_weather_table`.
+
+    Args:
+        batch (WeatherBatch): Batch of weather records.
+        rejected (list[tuple[object, list[str]]]): Receives the rejected
+        records with their reasons, e.g. for `quarantine_records`.
+        monotonic (bool): Whether to reject a record older than an
+        earlier record of its location or the latest one loaded.
+        index (DedupIndex | None): Index of the loaded records to check
+        the observation order against.
+
+    Returns:
+        WeatherBatch: The valid records.
+    """
+    latest = None
+    if monotonic and index is not None:
+        locations = {
+            location for location, _ in batch.keys() if location is not None
+        }
+        latest = latest_observations(index, locations)
+    table = batch.to_arrow()
+    _, mask, reasons = check_weather_table(
+        table, batch.schema, monotonic, latest
+    )
+    if not reasons:
+        return batch
+    rejected.extend(rejected_records(table, mask, reasons))
+    return batch.take(pc.indices_nonzero(pc.invert(mask)).to_pylist())
+
+
+def quarantine_records(
+    path: Path,
+    records: Iterable[tuple[object, list[str]]],
+    source: Path | str,
+) -> int:
+    """
+    Append rejected records with their reasons to the quarantine file.
+
+    Args:
+        path (Path): Path to the JSONL quarantine file.
+        records (Iterable[tuple[object, list[str]]]): Each rejected record,
+        as a CSV line or a raw payload, and the reasons it was rejected.
+        source (Path | str): File the records were read from, or the
+        name of the stage that produced them.
+
+    Returns:
+        int: Number of records appended.
+    """
+    quarantined_at = datetime.now(UTC).isoformat()
+    count = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        for record, reasons in records:
+            entry = {
+                "quarantined_at": quarantined_at,
+                "source": str(source),
+                "reasons": reasons,
+                "record": record,
+            }
+            f.write(json.dumps(entry) + "\n")
+            count += 1
+    return count
+
+
+def latest_valid(table: pa.Table) -> dict[str, int]:
+    """
+    Return the latest observation time per location of valid records.
+
+    Args:
+        table (pa.Table): Records following the schema.
+
+    Returns:
+        dict[str, int]: Observation time in Unix seconds per location.
+    """
+    keys = pa.table(
+        {
+            "location": table.column("location"),
+            "dt": pc.cast(table.column("dt"), pa.int64()),
+        }
+    )
+    latest = keys.group_by("location").aggregate([("dt", "max")])
+    return dict(
+        zip(
+            latest.column("location").to_pylist(),
+            latest.column("dt_max").to_pylist(),
+            strict=True,
+        )
+    )
+
+
+def validate_weather_file(config: Config, path: Path) -> ValidationResult:
+    """
+    Validate a processed CSV file in place: rejected records are moved to
+    the quarantine file with their reasons and the file is rewritten with
+    the valid ones, so one bad record does not fail the load.
+
+    The file is validated block by block in constant memory. The latest
+    valid observation of every location is carried from block to block,
+    so the order check spans the whole file.
+
+    Args:
+        config (Config): Configuration object containing the fields and
+        the validation settings.
+        path (Path): Path to the processed file.
+
+    Returns:
+        ValidationResult: Numbers of records kept and quarantined.
+    """
+    schema = schema_for(config)
+    monotonic = config.validation.monotonic
+    expected = len(schema.names)
+    result = ValidationResult()
+    latest: dict[str, int] = {}
+    looked_up: set[str] = set()
+    malformed: list[str] = []
+
+    def reject(records: list[tuple[str, list[str]]]) -> None:
+        for _, record_reasons in records:
+            result.reasons.update(record_reasons)
+        if records:
+            result.quarantined += quarantine_records(
+                config.validation.quarantine_path, records, path
+            )
+
+    def reject_malformed() -> None:
+        result.records_in += len(malformed)
+        reject(
+            [
+                (line, [f"malformed line: expected {expected} fields"])
+                for line in malformed
+            ]
+        )
+        malformed.clear()
+
+    # write the valid lines of every block to a temporary file
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as out:
+        for strings in iter_weather_strings(path, schema, malformed):
+            reject_malformed()
+            if not strings.num_rows:
+                continue
+
+            # look up the loaded observations of locations seen first
+            if monotonic:
+                locations = pc.unique(strings.column("location"))
+                new = set(locations.drop_null().to_pylist()) - looked_up
+                for location, dt in latest_loaded(config, new).items():
+                    latest[location] = max(dt, latest.get(location, dt))
+                looked_up |= new
+            valid, rejected_rows, reasons = validate_weather_table(
+                strings, schema, monotonic, latest
+            )
+            if monotonic:
+                for location, dt in latest_valid(valid).items():
+                    latest[location] = max(dt, latest.get(location, dt))
+
+            # the lines are rebuilt from the text of the fields, unchanged
+            lines = pc.binary_join_element_wise(
+                *strings.columns, ";", null_handling="replace"
+            )
+            reject(
+                list(
+                    zip(
+                        lines.filter(rejected_rows).to_pylist(),
+                        reasons,
+                        strict=True,
+                    )
+                )
+            )
+            for line in lines.filter(pc.invert(rejected_rows)).to_pylist():
+                out.write(line + "\n")
+            result.records_in += strings.num_rows
+            result.records_out += valid.num_rows
+        reject_malformed()
+
+    # keep the file untouched if every record is valid
+    if result.quarantined:
+        tmp.replace(path)
+    else:
+        tmp.unlink()
+    return result
+
+
+def validate_weather_data(config: Config) -> ValidationResult:
+    """
+    Validate the processed weather data before it is loaded.
+
+    Args:
+        config (Config): Configuration object containing the processed
+        path and the validation settings.
+
+    Raises:
+        FileNotFoundError: If the processed data file does not exist.
+
+    Returns:
+        ValidationResult: Numbers of records kept and quarantined. The
+        rejected records are appended to
+        `config.validation.quarantine_path`.
+    """
+    # extract paths from config
+    processed_path: Path = config.processed_path
+
+    # ensure processed data file exists
+    if not processed_path.exists():
+        raise FileNotFoundError(
+            f"Processed data file not found: {processed_path}"
+        )
+
+    with stage_metrics(config, "validate") as metrics:
+        result = validate_weather_file(config, processed_path)
+        metrics.add(
+            records_in=result.records_in,
+            records_out=result.records_out,
+            records_quarantined=result.quarantined,
+        )
+    return result
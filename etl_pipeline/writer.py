@@ -0,0 +1,446 @@
+import errno
+import fcntl
+import os
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import WriterConfig
+
+# size of the blocks read while searching the sink for its last newline
+TAIL_BLOCK = 64 * 1024
+
+# largest number of bytes moved by one call while copying a file
+COPY_CHUNK = 8 * 1024 * 1024
+
+# errors of a kernel-side copy after which the next method is tried, e.g.
+# copy_file_range across file systems or sendfile on unsupported files
+COPY_FALLBACK_ERRNOS = frozenset(
+    {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+)
+
+
+def segments_dir(sink_path: Path) -> Path:
+    """
+    Return the directory holding the committed segments of a sink.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+
+    Returns:
+        Path: The segments directory next to the sink.
+    """
+    return sink_path.with_name(sink_path.name + ".segments")
+
+
+def fsync_dir(path: Path) -> None:
+    """Persist the entries of a directory, e.g. after a rename."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_all(fd: int, data: bytes) -> None:
+    """Write all bytes to a file descriptor, repeating short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on a lock file, waiting for other
+    processes holding it.
+
+    Args:
+        lock_path (Path): Path to the lock file, created if missing.
+    """
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def copy_range(
+    fd_in: int, fd_out: int, in_offset: int, out_offset: int, count: int
+) -> int:
+    """
+    Copy bytes between file descriptors in chunks of COPY_CHUNK, inside
+    the kernel where possible.
+
+    `os.copy_file_range` is tried first, then `os.sendfile`, then
+    `os.pread` and `os.pwrite`; a method the file systems do not support
+    is dropped for the rest of the copy. Neither file position matters
+    and the source is never read into memory as a whole.
+
+    Args:
+        fd_in (int): Descriptor of the source, opened for reading.
+        fd_out (int): Descriptor of the target, opened for writing
+        without O_APPEND, which the kernel copies reject.
+        in_offset (int): Position in the source to copy from.
+        out_offset (int): Position in the target to copy to.
+        count (int): Number of bytes to copy.
+
+    Returns:
+        int: Number of bytes copied, less than `count` if the source
+        ends early.
+    """
+    methods = ["sendfile", "read"]
+    if hasattr(os, "copy_file_range"):
+        methods.insert(0, "copy_file_range")
+    copied = 0
+    while copied < count:
+        size = min(count - copied, COPY_CHUNK)
+        source = in_offset + copied
+        target = out_offset + copied
+        try:
+            if methods[0] == "copy_file_range":
+                n = os.copy_file_range(fd_in, fd_out, size, source, target)
+            elif methods[0] == "sendfile":
+                # sendfile writes at the current position of the target
+                os.lseek(fd_out, target, os.SEEK_SET)
+                n = os.sendfile(fd_out, fd_in, source, size)
+            else:
+                n = os.pwrite(fd_out, os.pread(fd_in, size, source), target)
+        except OSError as e:
+            if len(methods) == 1 or e.errno not in COPY_FALLBACK_ERRNOS:
+                raise
+            methods.pop(0)
+            continue
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def copy_lines(fd_in: int, fd_out: int, out_offset: int) -> int:
+    """
+    Copy a whole file of lines into the target with `copy_range`. A last
+    line without a newline is terminated, so the target never ends in a
+    partial line that recovery would cut off.
+
+    Args:
+        fd_in (int): Descriptor of the source, opened for reading.
+        fd_out (int): Descriptor of the target, opened for writing
+        without O_APPEND.
+        out_offset (int): Position in the target to copy to.
+
+    Returns:
+        int: Number of bytes written, including an added newline.
+    """
+    copied = copy_range(fd_in, fd_out, 0, out_offset, os.fstat(fd_in).st_size)
+    if copied and os.pread(fd_in, 1, copied - 1) != b"\n":
+        os.pwrite(fd_out, b"\n", out_offset + copied)
+        copied += 1
+    return copied
+
+
+def append_file(sink_path: Path, source: Path, sync: bool) -> int:
+    """
+    Append a whole file to the sink with kernel-side copies, in constant
+    memory regardless of its size.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+        source (Path): File of lines to append; a missing newline at its
+        end is added.
+        sync (bool): Whether to fsync before returning.
+
+    Returns:
+        int: Number of bytes appended.
+    """
+    fd_in = os.open(source, os.O_RDONLY)
+    try:
+        fd_out = os.open(sink_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            copied = copy_lines(fd_in, fd_out, os.fstat(fd_out).st_size)
+            if sync:
+                os.fsync(fd_out)
+        finally:
+            os.close(fd_out)
+    finally:
+        os.close(fd_in)
+    return copied
+
+
+def count_lines(path: Path) -> int:
+    """
+    Count the lines of a file, reading it in chunks of COPY_CHUNK. A last
+    line without a newline is counted too.
+
+    Args:
+        path (Path): Path to the file.
+
+    Returns:
+        int: Number of lines.
+    """
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(COPY_CHUNK):
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    return count + (last != b"\n")
+
+
+def append_bytes(sink_path: Path, data: bytes, sync: bool) -> None:
+    """
+    Append bytes to the sink with a single write call.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+        data (bytes): Complete lines to append.
+        sync (bool): Whether to fsync before returning.
+    """
+    fd = os.open(sink_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        write_all(fd, data)
+        if sync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_segment(sink_path: Path, data: bytes | Path) -> Path:
+    """
+    Commit bytes as a new segment, written to a temporary file and
+    renamed into place so a segment is either complete or absent.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+        data (bytes | Path): Complete lines to commit, or a file of them
+        copied with kernel-side copies.
+
+    Returns:
+        Path: Path to the segment.
+    """
+    directory = segments_dir(sink_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    segment = directory / f"{time.time_ns():020d}-{uuid.uuid4().hex}.csv"
+    tmp = segment.with_suffix(".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        if isinstance(data, Path):
+            with open(data, "rb") as f:
+                copy_lines(f.fileno(), fd, 0)
+        else:
+            write_all(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    tmp.rename(segment)
+    fsync_dir(directory)
+    return segment
+
+
+def fold_segments(sink_path: Path) -> int:
+    """
+    Append the committed segments to the sink in commit order.
+
+    Before a segment is appended it is renamed to record the sink size,
+    so `recover_sink` can undo a fold that was interrupted and retry it
+    without duplicating lines.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+
+    Returns:
+        int: Number of segments folded.
+    """
+    directory = segments_dir(sink_path)
+    if not directory.exists():
+        return 0
+    segments = sorted(directory.glob("*.csv"))
+    for segment in segments:
+        offset = sink_path.stat().st_size if sink_path.exists() else 0
+        folding = segment.with_suffix(f".folding-{offset}")
+        segment.rename(folding)
+        append_file(sink_path, folding, sync=True)
+        folding.unlink()
+    return len(segments)
+
+
+def truncate_torn_tail(sink_path: Path) -> int:
+    """
+    Cut a partially written last line off the sink.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+
+    Returns:
+        int: Number of bytes removed.
+    """
+    if not sink_path.exists():
+        return 0
+    with open(sink_path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - TAIL_BLOCK)
+            f.seek(start)
+            block = f.read(end - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+            os.fsync(f.fileno())
+    return size - end
+
+
+def recover_sink(sink_path: Path) -> None:
+    """
+    Bring the sink into a consistent state after a crash.
+
+    An interrupted fold is rolled back and its segment restored, a torn
+    last line is removed, uncommitted temporary segments are deleted and
+    all committed segments are folded into the sink.
+
+    Args:
+        sink_path (Path): Path to the CSV sink.
+    """
+    directory = segments_dir(sink_path)
+    if directory.exists():
+        # roll back a fold that did not finish
+        for folding in directory.glob("*.folding-*"):
+            offset = int(folding.suffix.removeprefix(".folding-"))
+            if sink_path.exists():
+                os.truncate(sink_path, offset)
+            folding.rename(folding.with_suffix(".csv"))
+
+        # drop segments that were never committed
+        for tmp in directory.glob("*.tmp"):
+            tmp.unlink()
+
+    truncate_torn_tail(sink_path)
+    fold_segments(sink_path)
+
+
+class SinkWriter:
+    """Group-commit writer of CSV lines into the sink.
+
+    Lines are buffered and committed together once `batch_records` lines
+    or `batch_bytes` bytes are buffered, or the oldest buffered line is
+    older than `max_age` seconds when the next one arrives. Every commit
+    is a single write in the configured durability mode:
+
+    - "append" appends to the sink without syncing,
+    - "fsync" appends to the sink and fsyncs it,
+    - "segments" writes a new segment file and renames it into place;
+      segments are folded into the sink on close.
+
+    The sink is recovered on open, so it never keeps a partial line. Use
+    it as a context manager to commit the remainder on exit.
+
+    Attributes:
+        sink_path (Path): Path to the CSV sink.
+        config (WriterConfig): Batching and durability settings.
+        commits (int): Number of commits so far.
+    """
+
+    def __init__(
+        self,
+        sink_path: Path,
+        config: WriterConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sink_path = sink_path
+        self.config = config or WriterConfig()
+        self.commits = 0
+        self._clock = clock
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        self._oldest = 0.0
+
+        sink_path.parent.mkdir(parents=True, exist_ok=True)
+        recover_sink(sink_path)
+
+    def __enter__(self) -> "SinkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, line: str) -> None:
+        """
+        Buffer a line and commit if the group is full or old enough.
+
+        Args:
+            line (str): CSV line ending in a newline.
+        """
+        if not self._buffer:
+            self._oldest = self._clock()
+        data = line.encode()
+        self._buffer.append(data)
+        self._buffered_bytes += len(data)
+        if (
+            len(self._buffer) >= self.config.batch_records
+            or self._buffered_bytes >= self.config.batch_bytes
+            or self._clock() - self._oldest >= self.config.max_age
+        ):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Commit all buffered lines.
+
+        Returns:
+            int: Number of bytes committed.
+        """
+        if not self._buffer:
+            return 0
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_bytes = 0
+
+        if self.config.durability == "segments":
+            write_segment(self.sink_path, data)
+        else:
+            append_bytes(
+                self.sink_path, data, sync=self.config.durability == "fsync"
+            )
+        self.commits += 1
+        return len(data)
+
+    def append_file(self, source: Path) -> int:
+        """
+        Commit a whole file of lines after the buffered ones, copied
+        inside the kernel in the configured durability mode. Outside the
+        "segments" mode the copy writes at the end of the sink rather than
+        appending, so the sink must be locked against other writers.
+
+        Args:
+            source (Path): File of lines; a missing newline at its end
+            is added.
+
+        Returns:
+            int: Number of bytes committed.
+        """
+        self.flush()
+        if not source.stat().st_size:
+            return 0
+        if self.config.durability == "segments":
+            size = write_segment(self.sink_path, source).stat().st_size
+        else:
+            size = append_file(
+                self.sink_path,
+                source,
+                sync=self.config.durability == "fsync",
+            )
+        self.commits += 1
+        return size
+
+    def close(self) -> None:
+        """Commit the remaining lines and fold committed segments."""
+        self.flush()
+        if self.config.durability == "segments":
+            fold_segments(self.sink_path)
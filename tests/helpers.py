@@ -0,0 +1,95 @@
+"""Builders and stand-ins shared by the test modules."""
+
+from collections.abc import Callable
+
+from etl_pipeline.config import Config, SecretsConfig
+from pydantic import SecretStr
+
+# two locations, e.g. one answered and one failing in `fake_api`
+LOCATIONS = [
+    {"name": "a", "latitude": 1.0, "longitude": 1.0},
+    {"name": "b", "latitude": 2.0, "longitude": 2.0},
+]
+
+# observation time of the payloads returned by `fake_api`
+FAKE_DT = 1609459200
+
+
+class FakeClock:
+    """Manually advanced clock whose sleep moves time forward."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    """Minimal stand-in for requests.Response."""
+
+    def __init__(self, status_code, text="", payload=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def make_config(tmp_path, **overrides) -> Config:
+    """Create a config keeping every file below tmp_path."""
+    settings = {
+        "raw_path": tmp_path / "raw.json",
+        "raw_batch_path": tmp_path / "raw.jsonl",
+        "processed_path": tmp_path / "processed.csv",
+        "sink_path": tmp_path / "data.csv",
+        "columnar": {"path": tmp_path / "columnar"},
+        "sqlite": {"path": tmp_path / "weather.sqlite"},
+        "validation": {"quarantine_path": tmp_path / "quarantine.jsonl"},
+        **overrides,
+    }
+    return Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)), **settings
+    )
+
+
+def payload(location: str, dt: int, temp: float = 20.0, **extra) -> dict:
+    """Build a raw response."""
+    return {
+        "name": location,
+        "dt": dt,
+        "weather": [{"description": "clear sky"}],
+        "main": {"temp": temp, "humidity": 50, "pressure": 1012},
+        "clouds": {"all": 1},
+        "wind": {"speed": 5.0},
+        **extra,
+    }
+
+
+def line(location: str, dt: int, temp: float = 20.0) -> str:
+    """Build the sink line of a raw response."""
+    return f"{location};{dt};clear sky;{temp};1;50;5.0;1012\n"
+
+
+def fake_api(*failing: str) -> Callable:
+    """
+    Build a stand-in for Session.get answering with a payload named after
+    the requested latitude, and with a 404 for the `failing` latitudes.
+    """
+
+    def get(url, timeout):
+        lat = url.split("lat=")[1].split("&")[0]
+        if lat in failing:
+            return Response(status_code=404, text="Not Found")
+        return Response(
+            status_code=200, payload=payload(f"site-{lat}", FAKE_DT)
+        )
+
+    return get
@@ -0,0 +1,85 @@
+from datetime import UTC, datetime
+
+import pytest
+from etl_pipeline.aggregates import (
+    Aggregate,
+    AggregateStore,
+    rebuild_aggregates,
+)
+from etl_pipeline.columnar import read_weather_csv
+from etl_pipeline.load import save_weather_data
+
+from helpers import line, make_config
+
+# 2024-01-01T00:00:00Z
+DAY = 1704067200
+
+
+def test_aggregate_merge_and_statistics():
+    """
+    Test that merging two aggregates equals aggregating all values.
+    """
+    a = Aggregate(count=2, sum=3.0, sumsq=5.0, min=1.0, max=2.0)
+    b = Aggregate(count=1, sum=3.0, sumsq=9.0, min=3.0, max=3.0)
+
+    merged = a.merge(b)
+
+    assert merged == Aggregate(count=3, sum=6.0, sumsq=14.0, min=1.0, max=3.0)
+    assert merged.mean == 2.0
+    assert merged.std == pytest.approx((2 / 3) ** 0.5)
+    assert Aggregate().mean is None
+
+
+@pytest.mark.parametrize("sink_backend", ["csv", "parquet"])
+def test_load_updates_aggregates_incrementally(tmp_path, sink_backend):
+    """
+    Test that consecutive loads fold their records into the hourly and
+    daily aggregates, skipping duplicates when dedup is enabled.
+    """
+    config = make_config(
+        tmp_path,
+        aggregates_path=tmp_path / "aggregates.sqlite",
+        sink_backend=sink_backend,
+        dedup_index_path=tmp_path / "dedup" / "index",
+    )
+    batches = [
+        [line("a", DAY, 10.0), line("a", DAY + 600, 14.0)],
+        [line("a", DAY + 600, 14.0), line("a", DAY + 3600, 30.0)],
+    ]
+    for batch in batches:
+        config.processed_path.write_text("".join(batch))
+        save_weather_data(config=config)
+
+    at = datetime.fromtimestamp(DAY, UTC)
+    with AggregateStore(config.aggregates_path) as store:
+        hour = store.get("a", "hour", at, "temp")
+        day = store.get("a", "day", at, "temp")
+        assert store.get("b", "day", at, "temp") is None
+
+    assert (hour.count, hour.mean, hour.min, hour.max) == (2, 12.0, 10.0, 14.0)
+    assert (day.count, day.mean, day.min, day.max) == (3, 18.0, 10.0, 30.0)
+
+
+def test_rebuild_aggregates_from_sink(tmp_path):
+    """
+    Test that rebuilding from the sink reproduces the stored aggregates.
+    """
+    config = make_config(
+        tmp_path, aggregates_path=tmp_path / "aggregates.sqlite"
+    )
+    config.processed_path.write_text(
+        line("a", DAY, 10.0) + line("b", DAY + 60, 20.0)
+    )
+    save_weather_data(config=config)
+
+    at = datetime.fromtimestamp(DAY, UTC)
+    with AggregateStore(config.aggregates_path) as store:
+        before = store.get("b", "hour", at, "pressure")
+
+    records = rebuild_aggregates(
+        config.aggregates_path, [read_weather_csv(config.sink_path)]
+    )
+
+    assert records == 2
+    with AggregateStore(config.aggregates_path) as store:
+        assert store.get("b", "hour", at, "pressure") == before
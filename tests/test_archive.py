@@ -0,0 +1,106 @@
+import gzip
+import json
+from datetime import UTC, datetime
+
+from etl_pipeline.archive import INDEX_NAME, RawArchive
+from etl_pipeline.config import ArchiveConfig, Config, SecretsConfig
+from etl_pipeline.extract import fetch_weather_data
+from pydantic import SecretStr
+
+from helpers import FakeClock
+
+
+def payloads(stop: int, start: int = 0) -> list[dict]:
+    """Build distinct raw responses."""
+    return [{"name": "a", "dt": i} for i in range(start, stop)]
+
+
+def test_archive_groups_are_indexed_and_replayable(tmp_path):
+    """
+    Test that each group is one gzip member whose range in the index can
+    be read on its own, and that segments are whole gzip files.
+    """
+    clock = FakeClock(1_700_000_000.0)
+    with RawArchive(tmp_path, clock=clock) as archive:
+        archive.append(payloads(3))
+        clock.now += 60
+        archive.append(payloads(5, 3))
+
+    archive = RawArchive(tmp_path)
+    first, second = archive.entries()
+
+    assert first.segment == second.segment
+    assert (first.records, second.records) == (3, 2)
+    assert second.offset == first.length
+    assert list(archive.read(second)) == payloads(5, 3)
+    assert list(archive.replay()) == payloads(5)
+    since = datetime.fromtimestamp(clock.now, UTC)
+    assert list(archive.replay(since=since)) == payloads(5, 3)
+    with gzip.open(tmp_path / first.segment) as f:
+        assert [json.loads(line) for line in f] == payloads(5)
+
+
+def test_archive_rolls_segments_by_size_and_age(tmp_path):
+    """
+    Test that a new segment is started once the current one is too large
+    or too old, and that buffered writes are grouped by batch size.
+    """
+    clock = FakeClock(1_700_000_000.0)
+    config = ArchiveConfig(segment_bytes=1 << 20, segment_age=3600)
+    with RawArchive(tmp_path, config, clock=clock) as archive:
+        archive.append(payloads(1))
+        clock.now += 3600
+        archive.append(payloads(2, 1))
+
+    config = ArchiveConfig(segment_bytes=1, batch_records=2)
+    with RawArchive(tmp_path, config, clock=clock) as archive:
+        for payload in payloads(5, 2):
+            archive.write(payload)
+
+    entries = RawArchive(tmp_path).entries()
+    assert [e.records for e in entries] == [1, 1, 2, 1]
+    assert len({e.segment for e in entries}) == 4
+    assert list(RawArchive(tmp_path).replay()) == payloads(5)
+
+
+def test_archive_ignores_torn_index_line(tmp_path):
+    """
+    Test that a partially written index line is dropped on open, leaving
+    the archive appendable.
+    """
+    with RawArchive(tmp_path) as archive:
+        archive.append(payloads(1))
+    with open(tmp_path / INDEX_NAME, "a") as f:
+        f.write("raw-1;12")
+
+    with RawArchive(tmp_path) as archive:
+        archive.append(payloads(2, 1))
+
+    assert list(RawArchive(tmp_path).replay()) == payloads(2)
+
+
+def test_fetch_archives_instead_of_backup_files(mocker, tmp_path):
+    """
+    Test that repeated fetches keep one raw file and archive every
+    response instead of renaming the previous file.
+    """
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        raw_path=tmp_path / "raw" / "raw.json",
+        sink_path=tmp_path / "data.csv",
+    )
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=[
+            mocker.Mock(status_code=200, json=mocker.Mock(return_value=p))
+            for p in payloads(3)
+        ],
+    )
+
+    for _ in range(3):
+        fetch_weather_data(config=config)
+
+    assert [p.name for p in (tmp_path / "raw").iterdir()] == ["raw.json"]
+    assert json.loads(config.raw_path.read_text()) == payloads(3)[-1]
+    archive = RawArchive(tmp_path / "archive")
+    assert list(archive.replay()) == payloads(3)
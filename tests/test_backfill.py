@@ -0,0 +1,122 @@
+from datetime import UTC, datetime
+
+import pyarrow.compute as pc
+from benchmarks.stub_server import StubSettings, run_stub_server
+from etl_pipeline.backfill import BackfillProgress, plan_chunks, run_backfill
+from etl_pipeline.columnar import read_weather_dataset
+from etl_pipeline.config import Config, Location
+
+from helpers import LOCATIONS, make_config
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+END = datetime(2024, 1, 4, tzinfo=UTC)
+
+
+def make_backfill_config(tmp_path, base_url, **overrides) -> Config:
+    """Create a config with two locations backfilled in 24 hour chunks."""
+    settings = {"sink_backend": "parquet", **overrides}
+    return make_config(
+        tmp_path,
+        locations=LOCATIONS,
+        fetch={"max_retries": 0, "breaker_threshold": 100},
+        backfill={
+            "base_url": base_url,
+            "chunk_hours": 24,
+            "progress_path": tmp_path / "progress.json",
+        },
+        columnar={"path": tmp_path / "columnar", "batch_rows": 50},
+        archive={"path": tmp_path / "archive"},
+        **settings,
+    )
+
+
+def test_plan_chunks_splits_range():
+    """
+    Test that a range is split into aligned chunks per location and the
+    last chunk is cut at the end of the range.
+    """
+    location = Location(name="a", latitude=1.0, longitude=1.0)
+
+    chunks = plan_chunks(
+        [location], START, datetime(2024, 1, 3, 12, tzinfo=UTC), 24
+    )
+
+    assert [(c.end - c.start) // 3600 for c in chunks] == [24, 24, 12]
+    assert chunks[0].start == int(START.timestamp())
+    assert chunks[0].key == f"a|{chunks[0].start}|{chunks[0].end}"
+
+
+def test_backfill_writes_date_partitions(tmp_path):
+    """
+    Test that a backfill loads every hour of the range into the date
+    partitions of each location.
+    """
+    with run_stub_server() as server:
+        config = make_backfill_config(tmp_path, server.base_url)
+        result = run_backfill(config, START, END)
+
+        assert server.requests == 6
+
+    assert result.failures == {}
+    assert result.chunks == 6
+    assert result.records == 2 * 72
+
+    table = read_weather_dataset(config.columnar.path)
+    assert table.num_rows == 2 * 72
+    assert sorted(set(table.column("date").to_pylist())) == [
+        "2024-01-01",
+        "2024-01-02",
+        "2024-01-03",
+    ]
+    assert pc.min(table.column("dt")).as_py() == START
+    assert sorted((tmp_path / "columnar").glob("location=a/*")) == [
+        tmp_path / "columnar" / "location=a" / f"date=2024-01-0{i}"
+        for i in (1, 2, 3)
+    ]
+
+
+def test_backfill_resumes_after_failures(tmp_path):
+    """
+    Test that failed chunks are not recorded as done and that a second
+    run fetches only the chunks missing from the first.
+    """
+    with run_stub_server(StubSettings(error_rate=0.5)) as server:
+        config = make_backfill_config(tmp_path, server.base_url)
+        first = run_backfill(config, START, END)
+
+    progress = BackfillProgress(config.backfill.progress_path)
+    assert first.chunks + len(first.failures) == 6
+    assert first.chunks == sum(
+        chunk in progress
+        for chunk in plan_chunks(config.locations, START, END, 24)
+    )
+
+    with run_stub_server() as server:
+        config = make_backfill_config(tmp_path, server.base_url)
+        second = run_backfill(config, START, END)
+
+        assert server.requests == len(first.failures)
+
+    assert second.skipped == first.chunks
+    assert read_weather_dataset(config.columnar.path).num_rows == 2 * 72
+
+
+def test_backfill_writes_configured_sink(tmp_path):
+    """
+    Test that a backfill appends to the CSV sink when it is configured,
+    without writing the Parquet dataset.
+    """
+    with run_stub_server() as server:
+        config = make_backfill_config(
+            tmp_path,
+            server.base_url,
+            sink_backend="csv",
+            sink_path=tmp_path / "data.csv",
+        )
+        result = run_backfill(config, START, END)
+
+    assert result.records == 2 * 72
+    lines = config.sink_path.read_text().splitlines()
+    assert len(lines) == 2 * 72
+    assert {line.split(";")[0] for line in lines} == {"a", "b"}
+    assert not config.columnar.path.exists()
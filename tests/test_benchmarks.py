@@ -0,0 +1,68 @@
+import json
+
+from benchmarks.bench_pipeline import compare, main
+from benchmarks.bench_records import run_benchmarks
+from benchmarks.stub_server import StubSettings, run_stub_server
+from etl_pipeline.config import Config, SecretsConfig
+from etl_pipeline.extract import fetch_weather_batch
+from pydantic import SecretStr
+
+
+def test_stub_server_serves_weather_and_errors(tmp_path):
+    """
+    Test that the extractor can fetch from the stub and that the stub
+    injects errors at the configured rate.
+    """
+    config = Config(
+        locations=[
+            {"name": "a", "latitude": 1.0, "longitude": 1.0},
+            {"name": "b", "latitude": 2.0, "longitude": 2.0},
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        raw_batch_path=tmp_path / "raw.jsonl",
+        archive={"path": tmp_path / "archive"},
+    )
+
+    with run_stub_server(StubSettings(payload_size=2048)) as server:
+        config.fetch.base_url = server.base_url
+        result = fetch_weather_batch(config=config)
+        assert server.requests == 2
+
+    assert result.failures == {}
+    assert result.payloads["a"]["name"] == "a"
+    # the stub pads its body to 2048 bytes, before the name is replaced
+    assert len(json.dumps(result.payloads["b"])) >= 2000
+
+    with run_stub_server(StubSettings(error_rate=1.0)) as server:
+        config.fetch.base_url = server.base_url
+        config.fetch.max_retries = 0
+        result = fetch_weather_batch(config=config)
+
+    assert result.failures["a"].startswith("Error fetching data: 503")
+
+
+def test_benchmark_writes_json_results(tmp_path, capsys):
+    """
+    Test a minimal benchmark run and the comparison with a baseline.
+    """
+    output = tmp_path / "bench.json"
+
+    main(["--locations", "2", "--repeat", "1", "--output", str(output)])
+
+    report = json.loads(output.read_text())
+    stages = {r["stage"] for r in report["results"]}
+    assert "chain[fused csv]" in stages
+    assert all(r["locations"] == 2 for r in report["results"])
+    assert len(compare(report, report)) == len(report["results"])
+    assert "Results written to" in capsys.readouterr().out
+
+
+def test_batch_holds_less_memory_than_dicts():
+    """
+    Test that the record benchmark measures the batch well below dicts.
+    """
+    results = {r["name"]: r for r in run_benchmarks(50, 4)}
+
+    dicts = results["dict per record"]["bytes_per_record"]
+    assert results["WeatherBatch"]["bytes_per_record"] < dicts / 4
+    assert results["slots record"]["bytes_per_record"] < dicts
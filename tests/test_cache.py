@@ -0,0 +1,177 @@
+from etl_pipeline.cache import (
+    ResponseCache,
+    commit_observations,
+    grid_cell,
+    group_by_cell,
+)
+from etl_pipeline.config import Config, Location, SecretsConfig
+from etl_pipeline.extract import (
+    FetchResult,
+    fetch_weather_batch,
+    fetch_weather_data,
+)
+from pydantic import SecretStr
+
+from helpers import FakeClock
+
+
+def make_response(mocker, dt):
+    """Create a successful mock response with the given observation time."""
+    return mocker.Mock(
+        status_code=200,
+        json=mocker.Mock(return_value={"name": "x", "dt": dt}),
+    )
+
+
+def test_nearby_locations_share_a_cell():
+    """
+    Test that locations closer than the grid size map to the same cell.
+    """
+    a = Location(name="a", latitude=52.5201, longitude=13.4041)
+    b = Location(name="b", latitude=52.5199, longitude=13.4044)
+    c = Location(name="c", latitude=48.137, longitude=11.575)
+
+    assert grid_cell(a, 0.01) == grid_cell(b, 0.01)
+    assert list(group_by_cell([a, b, c], 0.01).values()) == [[a, b], [c]]
+
+
+def test_cache_expires_and_persists(tmp_path):
+    """
+    Test that responses expire after the TTL, observations count as seen
+    only once committed and state is persisted.
+    """
+    clock = FakeClock(1000.0)
+    cache = ResponseCache(tmp_path / "cache.json", 60, 0.01, clock=clock)
+    cache.put("cell", {"dt": 1})
+    assert cache.is_new("a", 1)
+    cache.observe("a", 1)
+    cache.save()
+
+    reloaded = ResponseCache(tmp_path / "cache.json", 60, 0.01, clock=clock)
+    assert reloaded.get("cell") == {"dt": 1}
+    assert reloaded.is_new("a", 1)
+    assert reloaded.commit() == 1
+    assert not reloaded.is_new("a", 1)
+    clock.now += 61
+    assert reloaded.get("cell") is None
+
+
+def test_save_merges_changes_of_other_caches(tmp_path):
+    """
+    Test that saving a cache keeps the commits and responses another
+    cache saved to the same file since it was loaded.
+    """
+    path = tmp_path / "cache.json"
+    clock = FakeClock(1000.0)
+    ResponseCache(path, 60, 0.01, clock=clock).observe("a", 1)
+    first = ResponseCache(path, 60, 0.01, clock=clock)
+    second = ResponseCache(path, 60, 0.01, clock=clock)
+
+    first.commit({"a": 1})
+    first.save()
+    second.put("cell", {"dt": 2})
+    second.observe("b", 2)
+    second.save()
+
+    reloaded = ResponseCache(path, 60, 0.01, clock=clock)
+    assert not reloaded.is_new("a", 1)
+    assert reloaded.get("cell") == {"dt": 2}
+    assert reloaded.commit() == 1
+    assert not reloaded.is_new("b", 2)
+
+
+def test_batch_shares_calls_and_skips_unchanged(mocker, tmp_path):
+    """
+    Test that locations in one grid cell share a request but get their
+    own payloads, cached responses are reused and observations are not
+    written again once committed.
+    """
+    config = Config(
+        locations=[
+            {"name": "a", "latitude": 52.5201, "longitude": 13.4041},
+            {"name": "b", "latitude": 52.5199, "longitude": 13.4044},
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        cache={"path": tmp_path / "cache.json", "ttl": 600},
+        raw_batch_path=tmp_path / "raw.jsonl",
+        archive={"path": tmp_path / "archive"},
+    )
+    mock_get = mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        return_value=make_response(mocker, 100),
+    )
+
+    first = fetch_weather_batch(config=config)
+    retried = fetch_weather_batch(config=config)
+    commit_observations(config.cache, retried.observed)
+    second = fetch_weather_batch(config=config)
+
+    assert mock_get.call_count == 1
+    assert {k: p["name"] for k, p in first.payloads.items()} == {
+        "a": "a",
+        "b": "b",
+    }
+    assert retried.observed == {"a": 100, "b": 100}
+    assert second.payloads == {}
+    assert second.unchanged == ["a", "b"]
+    assert (tmp_path / "raw.jsonl").read_text() == ""
+
+
+def test_single_fetch_short_circuits_unchanged(mocker, tmp_path):
+    """
+    Test that fetch_weather_data reports an unchanged observation after
+    it was loaded, the cached response expired and the API returned the
+    same dt, without creating the directory of the raw file.
+    """
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        cache={"path": tmp_path / "cache.json", "ttl": 0},
+        raw_path=tmp_path / "raw.json",
+        archive={"path": tmp_path / "archive"},
+    )
+    mock_get = mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=[
+            make_response(mocker, 100),
+            make_response(mocker, 100),
+            make_response(mocker, 200),
+        ],
+    )
+
+    assert fetch_weather_data(config=config)
+    commit_observations(config.cache)
+    run = config.model_copy(update={"raw_path": tmp_path / "run" / "raw.json"})
+    assert not fetch_weather_data(config=run)
+    assert not run.raw_path.parent.exists()
+    assert fetch_weather_data(config=config)
+    assert mock_get.call_count == 3
+
+
+def test_single_fetch_commits_only_its_observation(mocker, tmp_path):
+    """
+    Test that committing the observation reported by one run leaves the
+    newer observation of an overlapping run pending, so it is not
+    reported as unchanged before it is loaded.
+    """
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        cache={"path": tmp_path / "cache.json", "ttl": 0},
+        raw_path=tmp_path / "raw.json",
+        archive={"path": tmp_path / "archive"},
+    )
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=[
+            make_response(mocker, 100),
+            make_response(mocker, 200),
+            make_response(mocker, 200),
+        ],
+    )
+    first, second = FetchResult(), FetchResult()
+
+    assert fetch_weather_data(config=config, report=first)
+    assert fetch_weather_data(config=config, report=second)
+    commit_observations(config.cache, first.observed)
+
+    assert first.observed == {"0.0,0.0": 100}
+    assert fetch_weather_data(config=config)
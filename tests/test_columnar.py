@@ -0,0 +1,148 @@
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from etl_pipeline.columnar import (
+    WEATHER_SCHEMA,
+    ColumnarSinkWriter,
+    compact_partitions,
+    read_weather_csv,
+    read_weather_dataset,
+)
+from etl_pipeline.config import Config, SecretsConfig
+from etl_pipeline.load import save_weather_data
+from pydantic import SecretStr
+
+LINES = (
+    "Berlin;1609459200;clear sky;20.0;1;50;5.0;1012\n"
+    "Berlin;1609545600;rain;10.5;90;80;3.0;1000\n"
+    "Munich;1609459200;snow;-2.0;75;60;1.5;990\n"
+)
+
+
+def test_read_weather_csv_is_typed(tmp_path):
+    """
+    Test that the semicolon CSV is parsed into the typed schema.
+    """
+    path = tmp_path / "processed.csv"
+    path.write_text(LINES)
+
+    table = read_weather_csv(path)
+
+    assert table.schema == WEATHER_SCHEMA
+    assert table.num_rows == 3
+    assert table.column("pressure").to_pylist() == [1012, 1000, 990]
+
+
+def test_writer_batches_and_partitions(tmp_path):
+    """
+    Test that the writer buffers until the batch is full and writes one
+    file per location and date partition.
+    """
+    path = tmp_path / "processed.csv"
+    path.write_text(LINES)
+    table = read_weather_csv(path)
+    root = tmp_path / "columnar"
+
+    with ColumnarSinkWriter(root, batch_rows=10) as writer:
+        writer.append(table)
+        assert not root.exists()
+
+    partitions = sorted(
+        str(p.parent.relative_to(root)) for p in root.rglob("*.parquet")
+    )
+    assert partitions == [
+        "location=Berlin/date=2021-01-01",
+        "location=Berlin/date=2021-01-02",
+        "location=Munich/date=2021-01-01",
+    ]
+
+
+def test_read_prunes_partitions_and_columns(tmp_path):
+    """
+    Test that reads can be limited to locations, dates and columns.
+    """
+    path = tmp_path / "processed.csv"
+    path.write_text(LINES)
+    root = tmp_path / "columnar"
+    with ColumnarSinkWriter(root) as writer:
+        writer.append(read_weather_csv(path))
+
+    table = read_weather_dataset(
+        root,
+        columns=["dt", "temp"],
+        locations=["Berlin"],
+        start=date(2021, 1, 2),
+    )
+
+    assert table.column_names == ["dt", "temp"]
+    assert table.column("temp").to_pylist() == [10.5]
+
+
+def test_compact_partitions_merges_files(tmp_path):
+    """
+    Test that compaction leaves one file per partition with all rows.
+    """
+    path = tmp_path / "processed.csv"
+    path.write_text(LINES)
+    table = read_weather_csv(path)
+    root = tmp_path / "columnar"
+    for _ in range(3):
+        with ColumnarSinkWriter(root) as writer:
+            writer.append(table)
+
+    removed = compact_partitions(root)
+
+    assert removed == 9
+    assert len(list(root.rglob("*.parquet"))) == 3
+    assert read_weather_dataset(root).num_rows == 9
+
+
+def test_compaction_stages_files_hidden_from_readers(mocker, tmp_path):
+    """
+    Test that a reader scanning the dataset while a merged file is being
+    written sees only the original files.
+    """
+    path = tmp_path / "processed.csv"
+    path.write_text(LINES)
+    root = tmp_path / "columnar"
+    for _ in range(2):
+        with ColumnarSinkWriter(root) as writer:
+            writer.append(read_weather_csv(path))
+    write_table = pq.write_table
+    scanned = []
+
+    def write_and_scan(table, where, **kwargs):
+        write_table(table, where, **kwargs)
+        scanned.append(read_weather_dataset(root).num_rows)
+
+    mocker.patch(
+        "etl_pipeline.columnar.pq.write_table", side_effect=write_and_scan
+    )
+
+    compact_partitions(root)
+
+    assert scanned == [6, 6, 6]
+    assert read_weather_dataset(root).num_rows == 6
+
+
+def test_save_weather_data_parquet_backend(tmp_path):
+    """
+    Test that the load step writes to the columnar dataset when selected.
+    """
+    processed_path = tmp_path / "processed.csv"
+    processed_path.write_text(LINES)
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        processed_path=processed_path,
+        sink_path=tmp_path / "data.csv",
+        sink_backend="parquet",
+        columnar={"path": tmp_path / "columnar", "compression": "none"},
+    )
+
+    save_weather_data(config=config)
+
+    assert not config.sink_path.exists()
+    table = read_weather_dataset(config.columnar.path)
+    assert table.num_rows == 3
+    assert isinstance(table.column("dt").type, pa.TimestampType)
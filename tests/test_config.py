@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -8,7 +9,7 @@ from pydantic import SecretStr
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from utils.config import Config, SecretsConfig
+from etl_pipeline.config import Config, SecretsConfig, load_config
 
 
 def test_config_from_file_not_found():
@@ -35,7 +36,7 @@ def test_config_from_file_valid(mocker):
     Test case for Config.from_file with a valid configuration file.
     This should return a Config object with the expected parameters.
     """
-    mock_secrets = mocker.patch("utils.config.SecretsConfig")
+    mock_secrets = mocker.patch("etl_pipeline.config.SecretsConfig")
     mock_secrets.return_value = SecretsConfig(api_key=SecretStr("x" * 32))
 
     config = Config.from_file(path=Path("tests/valid_config.yaml"))
@@ -51,3 +52,78 @@ def test_config_from_file_valid(mocker):
         == Path("./data/processed/processed.csv").absolute()
     )
     assert config.sink_path.absolute() == Path("./data/data.csv").absolute()
+
+
+def test_config_default_locations():
+    """
+    Test case for Config without explicit locations. This should fall back
+    to the single location given by latitude and longitude.
+    """
+    config = Config(
+        latitude=1.5,
+        longitude=2.5,
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+    )
+
+    assert len(config.locations) == 1
+    assert config.locations[0].latitude == 1.5
+    assert config.locations[0].longitude == 2.5
+    assert config.locations[0].key == "1.5,2.5"
+
+
+def test_config_explicit_locations():
+    """
+    Test case for Config with a list of locations.
+    """
+    config = Config(
+        locations=[
+            {"name": "Berlin", "latitude": 52.52, "longitude": 13.405},
+            {"latitude": 48.137, "longitude": 11.575},
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+    )
+
+    assert [loc.key for loc in config.locations] == [
+        "Berlin",
+        "48.137,11.575",
+    ]
+
+
+def test_config_rejects_duplicate_location_keys():
+    """
+    Test case for Config with two locations sharing a key. This should
+    raise a validation error.
+    """
+    with pytest.raises(ValueError, match="location keys must be unique"):
+        Config(
+            locations=[
+                {"name": "Berlin", "latitude": 52.52, "longitude": 13.405},
+                {"name": "Berlin", "latitude": 52.5, "longitude": 13.4},
+            ],
+            secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        )
+
+
+def test_load_config_cached_by_mtime(mocker, tmp_path):
+    """
+    Test case for load_config. The file should be parsed once and parsed
+    again only after it was modified.
+    """
+    mock_secrets = mocker.patch("etl_pipeline.config.SecretsConfig")
+    mock_secrets.return_value = SecretsConfig(api_key=SecretStr("x" * 32))
+    mock_secrets.model_config = SecretsConfig.model_config
+    path = tmp_path / "config.yaml"
+    path.write_text("latitude: 1.0\nlongitude: 2.0\n")
+    from_file = mocker.spy(Config, "from_file")
+
+    first = load_config(path)
+    assert load_config(str(path)) is first
+    assert from_file.call_count == 1
+
+    path.write_text("latitude: 3.0\nlongitude: 2.0\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = load_config(path)
+    assert second.latitude == 3.0
+    assert from_file.call_count == 2
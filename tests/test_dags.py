@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("airflow")
+
+project_root = Path(__file__).parent.parent
+
+
+@pytest.mark.parametrize(
+    "dag_file",
+    [
+        "dags/dag.py",
+        "dags/fused_dag.py",
+        "dags/backfill_dag.py",
+        "dags/replay_dag.py",
+        "dags/sharded_dag.py",
+        "dags/retention_dag.py",
+    ],
+)
+def test_dag_parse_is_lazy(dag_file):
+    """
+    Test that parsing a DAG file imports no pipeline module, so neither
+    the config is loaded nor the pipeline dependencies are imported.
+    """
+    code = (
+        "import runpy, sys\n"
+        f"runpy.run_path({dag_file!r})\n"
+        "print(','.join(m for m in sys.modules if m.startswith('etl_')))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert out.stdout.strip() == ""
@@ -0,0 +1,114 @@
+from etl_pipeline.columnar import iter_dataset_keys, read_weather_dataset
+from etl_pipeline.dedup import DedupIndex, iter_sink_keys, rebuild_dedup_index
+from etl_pipeline.load import save_weather_data
+
+from helpers import make_config
+
+LINE_A = "Berlin;1609459200;clear sky;20.0;1;50;5.0;1012\n"
+LINE_B = "Berlin;1609459800;clear sky;21.0;1;50;5.0;1012\n"
+
+
+def test_index_persists_keys(tmp_path):
+    """
+    Test that keys survive reopening the index.
+    """
+    path = tmp_path / "keys"
+    with DedupIndex(path) as index:
+        assert index.add("Berlin", 1)
+        assert not index.add("Berlin", 1)
+
+    with DedupIndex(path) as index:
+        assert ("Berlin", 1) in index
+        assert ("Berlin", 2) not in index
+
+
+def test_load_skips_duplicates(tmp_path):
+    """
+    Test that loading the same processed file twice, e.g. after a retry,
+    appends each record once.
+    """
+    config = make_config(
+        tmp_path, dedup_index_path=tmp_path / "index" / "keys"
+    )
+    config.processed_path.write_text(LINE_A)
+
+    save_weather_data(config=config)
+    save_weather_data(config=config)
+    config.processed_path.write_text(LINE_A + LINE_B + LINE_B)
+    save_weather_data(config=config)
+
+    assert config.sink_path.read_text() == LINE_A + LINE_B
+
+
+def test_load_parquet_skips_duplicates(tmp_path):
+    """
+    Test that the Parquet backend skips duplicates too.
+    """
+    config = make_config(
+        tmp_path,
+        dedup_index_path=tmp_path / "index" / "keys",
+        sink_backend="parquet",
+    )
+    config.processed_path.write_text(LINE_A + LINE_B)
+
+    save_weather_data(config=config)
+    save_weather_data(config=config)
+
+    assert read_weather_dataset(config.columnar.path).num_rows == 2
+
+
+def test_rebuild_from_csv_sink(tmp_path):
+    """
+    Test that the index can be rebuilt from the CSV sink.
+    """
+    config = make_config(
+        tmp_path, dedup_index_path=tmp_path / "index" / "keys"
+    )
+    config.sink_path.write_text(LINE_A + LINE_B + LINE_A)
+
+    count = rebuild_dedup_index(
+        config.dedup_index_path, iter_sink_keys(config.sink_path)
+    )
+
+    assert count == 2
+    with DedupIndex(config.dedup_index_path) as index:
+        assert ("Berlin", 1609459800) in index
+
+
+def test_rebuild_from_parquet_sink(tmp_path):
+    """
+    Test that the index can be rebuilt from the Parquet sink.
+    """
+    config = make_config(
+        tmp_path,
+        dedup_index_path=tmp_path / "index" / "keys",
+        sink_backend="parquet",
+    )
+    config.processed_path.write_text(LINE_A + LINE_B)
+    save_weather_data(config=config)
+
+    count = rebuild_dedup_index(
+        config.dedup_index_path, iter_dataset_keys(config.columnar.path)
+    )
+
+    assert count == 2
+    with DedupIndex(config.dedup_index_path) as index:
+        assert ("Berlin", 1609459200) in index
+
+
+def test_rebuild_keeps_neighbouring_files(tmp_path):
+    """
+    Test that rebuilding an index removes only its own dbm files, not
+    files that share its name as a prefix.
+    """
+    index_path = tmp_path / "data"
+    neighbour = tmp_path / "data.csv"
+    neighbour.write_text(LINE_A)
+    rebuild_dedup_index(index_path, [("Berlin", 1)])
+
+    count = rebuild_dedup_index(index_path, iter_sink_keys(neighbour))
+
+    assert count == 1
+    assert neighbour.read_text() == LINE_A
+    with DedupIndex(index_path) as index:
+        assert ("Berlin", 1) not in index
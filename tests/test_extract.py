@@ -3,7 +3,11 @@ from pathlib import Path
 
 import pytest
 from etl_pipeline.config import Config, SecretsConfig
-from etl_pipeline.extract import fetch_weather_data
+from etl_pipeline.extract import (
+    create_session,
+    fetch_weather_batch,
+    fetch_weather_data,
+)
 from pydantic import SecretStr
 
 
@@ -14,7 +18,7 @@ def test_request_invalid_status_code(mocker):
     message.
     """
     # Mock the SecretsConfig to return a valid API key
-    mock_secrets = mocker.patch("utils.config.SecretsConfig")
+    mock_secrets = mocker.patch("etl_pipeline.config.SecretsConfig")
     mock_secrets.return_value = SecretsConfig(api_key=SecretStr("x" * 32))
 
     # Create a mock Config object with valid parameters
@@ -29,7 +33,7 @@ def test_request_invalid_status_code(mocker):
 
     # Mock the requests.get call to return a response with an error status code
     mocker.patch(
-        "utils.extract.requests.get",
+        "etl_pipeline.extract.requests.Session.get",
         return_value=mocker.Mock(status_code=404, text="Not Found"),
     )
 
@@ -46,7 +50,7 @@ def test_request_success(mocker):
     This should write the weather data to a JSON file.
     """
     # Mock the SecretsConfig to return a valid API key
-    mock_secrets = mocker.patch("utils.config.SecretsConfig")
+    mock_secrets = mocker.patch("etl_pipeline.config.SecretsConfig")
     mock_secrets.return_value = SecretsConfig(api_key=SecretStr("x" * 32))
 
     # Create a mock Config object with valid parameters
@@ -57,6 +61,7 @@ def test_request_success(mocker):
         raw_path=Path("data/raw/raw.json"),
         processed_path=Path("data/processed/processed.csv"),
         sink_path=Path("data/data.csv"),
+        archive={"enabled": False},
     )
 
     # Mock the requests.get call to return a successful response
@@ -64,34 +69,34 @@ def test_request_success(mocker):
     mock_response.status_code = 200
     mock_response.json.return_value = {"weather": "sunny"}
     mocker.patch(
-        "utils.extract.requests.get",
+        "etl_pipeline.extract.requests.Session.get",
         return_value=mock_response,
     )
 
     # Mock the Path.exists method to simulate that the file does not exist
     mock_path_exists = mocker.patch(
-        "utils.extract.Path.exists", return_value=False
+        "etl_pipeline.extract.Path.exists", return_value=False
     )
 
-    # Mock the Path.rename method to simulate renaming the file
-    mock_path_rename = mocker.patch("utils.extract.Path.rename")
+    # Mock the Path.rename method to check no backup file is created
+    mock_path_rename = mocker.patch("etl_pipeline.extract.Path.rename")
 
     # Mock the Path.mkdir method to simulate creating the directory
-    mock_mkdir = mocker.patch("utils.extract.Path.mkdir")
+    mock_mkdir = mocker.patch("etl_pipeline.extract.Path.mkdir")
 
     # Mock the open function to simulate writing to a file
     mock_open = mocker.mock_open()
     mocker.patch("builtins.open", mock_open)
 
     # Mock json.dump to simulate writing JSON data
-    mock_json_dump = mocker.patch("utils.extract.json.dump")
+    mock_json_dump = mocker.patch("etl_pipeline.extract.json.dump")
 
     # Call the fetch_weather_data function
     fetch_weather_data(config=mock_config)
 
     # Assertions to check if the function behaved as expected
     mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-    mock_path_exists.assert_called_once()
+    mock_path_exists.assert_not_called()
     mock_path_rename.assert_not_called()
     mock_open.assert_called_once_with(mock_config.raw_path, "w")
     mock_json_dump.assert_called_once_with({"weather": "sunny"}, mock_open())
@@ -103,7 +108,7 @@ def test_request_invalid_json(mocker):
     This should raise an Exception with the appropriate error message.
     """
     # Mock the SecretsConfig to return a valid API key
-    mock_secrets = mocker.patch("utils.config.SecretsConfig")
+    mock_secrets = mocker.patch("etl_pipeline.config.SecretsConfig")
     mock_secrets.return_value = SecretsConfig(api_key=SecretStr("x" * 32))
 
     # Create a mock Config object with valid parameters
@@ -123,10 +128,84 @@ def test_request_invalid_json(mocker):
         "Expecting value", "doc", 0
     )
     mocker.patch(
-        "utils.extract.requests.get",
+        "etl_pipeline.extract.requests.Session.get",
         return_value=mock_response,
     )
 
     # Call the fetch_weather_data function and expect it to raise an Exception
     with pytest.raises(Exception, match="Invalid JSON in response"):
         fetch_weather_data(config=mock_config)
+
+
+def test_fetch_batch_reports_failures_per_location(mocker, tmp_path):
+    """
+    Test case for fetch_weather_batch with one failing location. The
+    successful locations should be written as JSONL and the failing one
+    reported without aborting the batch.
+    """
+    config = Config(
+        locations=[
+            {"name": "a", "latitude": 1.0, "longitude": 1.0},
+            {"name": "b", "latitude": 2.0, "longitude": 2.0},
+            {"name": "c", "latitude": 3.0, "longitude": 3.0},
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        fetch={"max_retries": 0},
+        raw_batch_path=tmp_path / "raw.jsonl",
+        archive={"path": tmp_path / "archive"},
+    )
+
+    # Mock the session to fail for the second location only
+    def fake_get(url, timeout):
+        if "lat=2.0" in url:
+            return mocker.Mock(status_code=500, text="Server Error")
+        return mocker.Mock(
+            status_code=200, json=mocker.Mock(return_value={"url": url})
+        )
+
+    mock_get = mocker.patch(
+        "etl_pipeline.extract.requests.Session.get", side_effect=fake_get
+    )
+
+    result = fetch_weather_batch(config=config)
+
+    assert mock_get.call_count == 3
+    assert set(result.payloads) == {"a", "c"}
+    assert result.failures == {"b": "Error fetching data: 500 - Server Error"}
+    lines = (tmp_path / "raw.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        result.payloads["a"],
+        result.payloads["c"],
+    ]
+
+
+def test_fetch_single_rejects_several_locations(tmp_path):
+    """
+    Test case for fetch_weather_data with several configured locations.
+    This should raise instead of fetching only one of them.
+    """
+    config = Config(
+        locations=[
+            {"name": "a", "latitude": 1.0, "longitude": 1.0},
+            {"name": "b", "latitude": 2.0, "longitude": 2.0},
+        ],
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        raw_path=tmp_path / "raw.json",
+    )
+
+    with pytest.raises(ValueError, match="single location"):
+        fetch_weather_data(config=config)
+
+
+def test_create_session_pool_size():
+    """
+    Test that the session connection pool is sized to the concurrency.
+    """
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        fetch={"max_concurrency": 3},
+    )
+
+    session = create_session(config)
+
+    assert session.get_adapter("https://example.com")._pool_maxsize == 3
@@ -0,0 +1,229 @@
+import pytest
+import requests
+from etl_pipeline.config import FetchConfig
+from etl_pipeline.fetch import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FetchEngine,
+    FetchError,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
+
+from helpers import FakeClock
+
+
+def make_engine(mocker, responses, **overrides):
+    """Create an engine on a fake clock whose session returns responses."""
+    clock = FakeClock()
+    session = mocker.Mock()
+    session.get.side_effect = responses
+    config = FetchConfig(**{"backoff_base": 1.0, **overrides})
+    engine = FetchEngine(config, session, sleep=clock.sleep, clock=clock)
+    return engine, session, clock
+
+
+def response(mocker, status_code, headers=None):
+    """Create a mock response."""
+    return mocker.Mock(
+        status_code=status_code, text="text", headers=headers or {}
+    )
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    """
+    Test that the bucket lets a burst through and then enforces the rate.
+    """
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits == [0.0, 0.0, 0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_circuit_breaker_opens_and_probes():
+    """
+    Test that the breaker opens after the threshold, lets a single probe
+    through after the reset timeout and closes on success.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, clock=clock
+    )
+
+    breaker.record_failure()
+    assert breaker.allow() == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is None
+
+    clock.now = 10
+    assert breaker.allow() == "probe"
+    assert breaker.allow() is None
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_parse_retry_after():
+    """
+    Test parsing of Retry-After headers.
+    """
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    """
+    Test that the delay is drawn below the capped exponential bound and
+    never below Retry-After, up to the cap.
+    """
+    assert backoff_delay(3, base=1.0, cap=5.0, rng=lambda: 0.5) == 2.5
+    assert backoff_delay(1, base=1.0, cap=5.0, rng=lambda: 0.999) < 2.0
+    assert backoff_delay(0, 1.0, 5.0, retry_after=4, rng=lambda: 0.5) == 4
+    assert backoff_delay(0, 1.0, 5.0, retry_after=30, rng=lambda: 0.5) == 5
+
+
+def test_engine_retries_and_honours_retry_after(mocker):
+    """
+    Test that a 429 is retried after at least the Retry-After delay.
+    """
+    ok = response(mocker, 200)
+    engine, session, clock = make_engine(
+        mocker,
+        [response(mocker, 429, {"Retry-After": "12"}), ok],
+    )
+
+    assert engine.get("http://x") is ok
+    assert session.get.call_count == 2
+    assert clock.sleeps == [12.0]
+
+
+def test_engine_does_not_retry_client_errors(mocker):
+    """
+    Test that a 404 fails immediately with the status code attached.
+    """
+    engine, session, _ = make_engine(mocker, [response(mocker, 404)])
+
+    with pytest.raises(FetchError, match="404") as exc_info:
+        engine.get("http://x")
+
+    assert exc_info.value.status_code == 404
+    assert session.get.call_count == 1
+    assert engine.breaker.state == "closed"
+
+
+def test_engine_gives_up_after_max_retries(mocker):
+    """
+    Test that connection errors are retried up to max_retries times.
+    """
+    engine, session, _ = make_engine(
+        mocker,
+        requests.ConnectionError("boom"),
+        max_retries=2,
+        breaker_threshold=10,
+    )
+
+    with pytest.raises(FetchError, match="boom"):
+        engine.get("http://x")
+
+    assert session.get.call_count == 3
+
+
+def test_engine_fails_fast_when_circuit_is_open(mocker):
+    """
+    Test that once the breaker opens, requests are rejected without
+    touching the provider.
+    """
+    engine, session, _ = make_engine(
+        mocker,
+        [response(mocker, 503)] * 10,
+        max_retries=5,
+        breaker_threshold=2,
+        breaker_reset_timeout=1000,
+    )
+
+    with pytest.raises(CircuitOpenError):
+        engine.get("http://x")
+    with pytest.raises(CircuitOpenError):
+        engine.get("http://x")
+
+    assert session.get.call_count == 2
+
+
+def test_engine_gives_up_on_long_retry_after(mocker):
+    """
+    Test that a Retry-After beyond backoff_max fails instead of parking
+    the worker, and that a 429 does not open the breaker.
+    """
+    engine, session, clock = make_engine(
+        mocker,
+        [response(mocker, 429, {"Retry-After": "7200"})],
+        breaker_threshold=1,
+    )
+
+    with pytest.raises(FetchError, match="429"):
+        engine.get("http://x")
+
+    assert clock.sleeps == []
+    assert engine.breaker.state == "closed"
+
+
+def test_engine_releases_probe_on_unexpected_error(mocker):
+    """
+    Test that a half-open probe raising an unexpected error does not
+    leave the breaker rejecting every later request.
+    """
+    ok = response(mocker, 200)
+    engine, session, clock = make_engine(
+        mocker,
+        [
+            response(mocker, 503),
+            requests.TooManyRedirects("loop"),
+            ok,
+        ],
+        max_retries=0,
+        breaker_threshold=1,
+        breaker_reset_timeout=10,
+    )
+
+    with pytest.raises(FetchError, match="503"):
+        engine.get("http://x")
+    clock.now = 10
+    with pytest.raises(requests.TooManyRedirects):
+        engine.get("http://x")
+
+    assert engine.get("http://x") is ok
+    assert engine.breaker.state == "closed"
+
+
+def test_engine_keeps_probe_of_another_request(mocker):
+    """
+    Test that a request sent before the breaker opened does not release
+    the probe of another request when it ends during the half-open state.
+    """
+    engine, session, clock = make_engine(
+        mocker,
+        [],
+        max_retries=0,
+        breaker_threshold=1,
+        breaker_reset_timeout=10,
+    )
+
+    def slow_get(url, timeout):
+        # the breaker opens and lets another request probe meanwhile
+        engine.breaker.record_failure()
+        clock.now += 10
+        assert engine.breaker.allow() == "probe"
+        return response(mocker, 429)
+
+    session.get.side_effect = slow_get
+
+    with pytest.raises(FetchError, match="429"):
+        engine.get("http://x")
+
+    assert engine.breaker.allow() is None
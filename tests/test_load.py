@@ -1,6 +1,7 @@
 import pytest
 from etl_pipeline.config import Config, SecretsConfig
 from etl_pipeline.load import save_weather_data
+from etl_pipeline.sink_index import SinkIndex
 from pydantic import SecretStr
 
 
@@ -50,8 +51,9 @@ def test_successful_save_new_file(tmp_path):
     # Run function
     save_weather_data(config=config)
 
-    # Verify the sink file contains the processed data
-    assert sink_path.read_text() == processed_data
+    # Verify the sink file contains the processed data, the last line
+    # terminated
+    assert sink_path.read_text() == processed_data + "\n"
 
 
 def test_append_to_existing_file(tmp_path):
@@ -80,4 +82,63 @@ def test_append_to_existing_file(tmp_path):
     # Run function to append data
     save_weather_data(config=config)
 
-    assert sink_path.read_text() == existing_data + new_data
+    assert sink_path.read_text() == existing_data + new_data + "\n"
+
+
+def test_save_streams_in_chunks_with_dedup(tmp_path):
+    """
+    Test that a file loaded in chunks skips records already in the sink
+    or earlier in the file and keeps the sink index current.
+    """
+    processed_path = tmp_path / "processed.csv"
+    sink_path = tmp_path / "data.csv"
+    rows = [
+        f"a;{1609459200 + i * 3600};clear sky;20.0;1;50;5.0;1012\n"
+        for i in range(5)
+    ]
+    config = Config(
+        latitude=0.0,
+        longitude=0.0,
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        processed_path=processed_path,
+        sink_path=sink_path,
+        sink_index_path=tmp_path / "sink_index",
+        dedup_index_path=tmp_path / "dedup",
+        writer={"batch_records": 2},
+    )
+
+    processed_path.write_text("".join(rows[:2]))
+    save_weather_data(config=config)
+    processed_path.write_text("".join(rows[1:] + rows[3:]))
+    save_weather_data(config=config)
+
+    assert sink_path.read_text() == "".join(rows)
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.covered == sink_path.stat().st_size
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_last_line_without_newline_is_kept(tmp_path, dedup):
+    """
+    Test that a processed file whose last line lacks a newline is loaded
+    as a complete line, which the next load keeps.
+    """
+    processed_path = tmp_path / "processed.csv"
+    sink_path = tmp_path / "data.csv"
+    rows = [
+        f"a;{1609459200 + i * 3600};clear sky;20.0;1;50;5.0;1012\n"
+        for i in range(2)
+    ]
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        processed_path=processed_path,
+        sink_path=sink_path,
+        dedup_index_path=tmp_path / "dedup" if dedup else None,
+    )
+
+    processed_path.write_text(rows[0].rstrip("\n"))
+    save_weather_data(config=config)
+    processed_path.write_text(rows[1])
+    save_weather_data(config=config)
+
+    assert sink_path.read_text() == "".join(rows)
@@ -0,0 +1,108 @@
+import json
+
+from etl_pipeline.config import Config, FetchConfig
+from etl_pipeline.fetch import FetchEngine
+from etl_pipeline.metrics import (
+    NULL_METRICS,
+    REGISTRY,
+    StageMetrics,
+    stage_metrics,
+)
+from etl_pipeline.pipeline import run_fused_pipeline
+
+from helpers import LOCATIONS, fake_api, make_config
+
+
+def make_metrics_config(tmp_path, **metrics) -> Config:
+    """Create a config with two locations writing below tmp_path."""
+    return make_config(
+        tmp_path,
+        locations=LOCATIONS,
+        fetch={"max_retries": 0},
+        metrics=metrics,
+    )
+
+
+def test_stage_metrics_disabled_is_noop(tmp_path):
+    """
+    Test that disabled metrics yield the null recorder and export nothing.
+    """
+    config = make_metrics_config(tmp_path, path=tmp_path / "metrics")
+
+    with stage_metrics(config, "extract") as metrics:
+        metrics.add(records_out=1)
+
+    assert metrics is NULL_METRICS
+    assert not (tmp_path / "metrics").exists()
+
+
+def test_stage_metrics_exports_prometheus_and_json(tmp_path):
+    """
+    Test that an enabled stage writes its counters, duration and latency
+    histogram as Prometheus textfile and JSON.
+    """
+    config = make_metrics_config(
+        tmp_path, enabled=True, path=tmp_path / "metrics"
+    )
+
+    with stage_metrics(config, "load") as metrics:
+        metrics.add(records_out=3, bytes_written=120)
+        metrics.observe_request(200, 0.03)
+
+    assert REGISTRY["load"] is metrics
+    data = json.loads((tmp_path / "metrics" / "load.json").read_text())
+    assert data["counters"] == {"records_out": 3, "bytes_written": 120}
+    assert data["status_codes"] == {"200": 1}
+    assert data["seconds"] > 0
+
+    prom = (tmp_path / "metrics" / "load.prom").read_text()
+    assert 'weather_etl_records_out{stage="load"} 3' in prom
+    assert (
+        'weather_etl_http_request_seconds_bucket{stage="load",le="0.05"} 1'
+        in prom
+    )
+    assert (
+        'weather_etl_http_request_seconds_bucket{stage="load",le="0.025"} 0'
+        in prom
+    )
+
+
+def test_fetch_engine_records_status_codes(mocker):
+    """
+    Test that the engine records every attempt with its status code.
+    """
+    session = mocker.Mock()
+    session.get.side_effect = [
+        mocker.Mock(status_code=503, text="", headers={}),
+        mocker.Mock(status_code=200, text="", headers={}),
+    ]
+    metrics = StageMetrics("extract")
+    engine = FetchEngine(
+        FetchConfig(backoff_base=0),
+        session,
+        sleep=lambda seconds: None,
+        metrics=metrics,
+    )
+
+    engine.get("http://example.invalid")
+
+    assert metrics.status_codes == {"503": 1, "200": 1}
+    assert metrics.latency.count == 2
+
+
+def test_fused_pipeline_records_metrics(mocker, tmp_path):
+    """
+    Test that the fused pipeline counts requests and loaded records.
+    """
+    config = make_metrics_config(tmp_path, enabled=True)
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api("2.0"),
+    )
+
+    run_fused_pipeline(config=config)
+
+    metrics = REGISTRY["fused"].to_dict()
+    assert metrics["status_codes"] == {"200": 1, "404": 1}
+    assert metrics["counters"]["records_out"] == 1
+    assert metrics["counters"]["records_loaded"] == 1
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from etl_pipeline.columnar import read_weather_dataset
+from etl_pipeline.dedup import DedupIndex
+from etl_pipeline.pipeline import run_fused_pipeline
+
+from helpers import FAKE_DT, LOCATIONS, fake_api, line, make_config
+
+
+def test_fused_pipeline_writes_only_sink(mocker, tmp_path):
+    """
+    Test that the fused pipeline appends one line per successful location
+    to the sink without creating intermediate files.
+    """
+    config = make_config(
+        tmp_path,
+        locations=LOCATIONS,
+        fetch={"max_retries": 0},
+        raw_path=tmp_path / "raw" / "raw.json",
+        raw_batch_path=tmp_path / "raw" / "raw.jsonl",
+        processed_path=tmp_path / "processed" / "processed.csv",
+    )
+
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api("2.0"),
+    )
+
+    result = run_fused_pipeline(config=config)
+
+    assert result.records == 1
+    assert result.failures == {"b": "Error fetching data: 404 - Not Found"}
+    assert config.sink_path.read_text() == line("a", FAKE_DT)
+    assert not (tmp_path / "raw").exists()
+    assert not (tmp_path / "processed").exists()
+
+
+def test_fused_pipeline_parquet_backend(mocker, tmp_path):
+    """
+    Test that the fused pipeline writes batches to the Parquet sink.
+    """
+    config = make_config(
+        tmp_path,
+        locations=LOCATIONS,
+        fetch={"max_retries": 0},
+        sink_backend="parquet",
+    )
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api("2.0"),
+    )
+
+    result = run_fused_pipeline(config=config)
+
+    assert result.records == 1
+    table = read_weather_dataset(config.columnar.path)
+    assert table.column("location").to_pylist() == ["a"]
+    assert not config.sink_path.exists()
+
+
+@pytest.mark.parametrize("sink_backend", ["csv", "parquet"])
+def test_fused_pipeline_quarantines_old_records(
+    mocker, tmp_path, sink_backend
+):
+    """
+    Test that the fused pipeline checks new records against the latest
+    loaded observation of their location and quarantines older ones.
+    """
+    config = make_config(
+        tmp_path,
+        locations=LOCATIONS[:1],
+        fetch={"max_retries": 0},
+        sink_backend=sink_backend,
+        dedup_index_path=tmp_path / "index",
+    )
+    with DedupIndex(config.dedup_index_path) as index:
+        index.add("a", FAKE_DT + 3600)
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api(),
+    )
+
+    result = run_fused_pipeline(config=config)
+
+    assert (result.records, result.quarantined) == (0, 1)
+    with open(config.validation.quarantine_path) as f:
+        (entry,) = [json.loads(text) for text in f]
+    assert entry["source"] == "fused"
+    assert entry["reasons"] == [
+        "dt: before an earlier observation of the location"
+    ]
+    assert entry["record"]["dt"] == FAKE_DT
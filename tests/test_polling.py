@@ -0,0 +1,134 @@
+from etl_pipeline.config import Config, Location, PollConfig
+from etl_pipeline.extract import fetch_weather_batch
+from etl_pipeline.polling import PollSchedule
+
+from helpers import FakeClock, make_config
+
+
+def make_polling_config(tmp_path) -> Config:
+    """Create a config polling three locations, two per run."""
+    return make_config(
+        tmp_path,
+        locations=[
+            {"name": name, "latitude": float(i), "longitude": 0.0}
+            for i, name in enumerate("abc")
+        ],
+        polling={"path": tmp_path / "schedule.json", "budget": 2},
+        archive={"enabled": False},
+    )
+
+
+def patch_api(mocker):
+    """Answer every request with an observation newer than any other."""
+    return mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        return_value=mocker.Mock(
+            status_code=200,
+            json=mocker.Mock(return_value={"name": "x", "dt": 2**40}),
+        ),
+    )
+
+
+def test_schedule_learns_update_interval(tmp_path):
+    """
+    Test that a location is due just after its next expected update,
+    shortly after a late one, and that the schedule is persisted.
+    """
+    clock = FakeClock(10_000.0)
+    config = PollConfig(path=tmp_path / "schedule.json", lag=60)
+    schedule = PollSchedule(config.path, config, clock=clock)
+    location = Location(name="a", latitude=0.0, longitude=0.0)
+
+    assert schedule.due([location]) == [location]
+    assert schedule.interval("a") == config.default_interval
+
+    # updates every 1200s, polled every 1200s and once in between
+    for dt in (8800, 8800, 10_000):
+        schedule.observe("a", dt)
+    assert schedule.interval("a") == 1200
+    assert schedule.next_poll("a") == 10_000 + 1200 + 60
+    clock.now = 11_200
+    assert schedule.due([location]) == []
+
+    # the update is late, so look again after the shortest interval
+    clock.now = 11_300
+    schedule.observe("a", 10_000)
+    assert schedule.next_poll("a") == 11_300 + config.min_interval
+
+    schedule.save()
+    reloaded = PollSchedule(config.path, config, clock=clock)
+    assert reloaded.next_poll("a") == schedule.next_poll("a")
+
+
+def test_batch_polls_due_locations_within_budget(mocker, tmp_path):
+    """
+    Test that a run sends at most the budgeted requests, defers the rest
+    to the next run and skips locations that are not due.
+    """
+    config = make_polling_config(tmp_path)
+    mock_get = patch_api(mocker)
+
+    first = fetch_weather_batch(config=config)
+    second = fetch_weather_batch(config=config)
+
+    assert mock_get.call_count == 3
+    assert sorted(first.payloads) == ["a", "b"]
+    assert first.deferred == ["c"]
+    assert list(second.payloads) == ["c"]
+    assert sorted(second.deferred) == ["a", "b"]
+
+
+def test_schedule_ignores_irregular_and_backwards_gaps(tmp_path):
+    """
+    Test that the interval is the shortest positive gap between
+    observations and that older, repeated or missing observation times
+    are not recorded.
+    """
+    clock = FakeClock(10_000.0)
+    config = PollConfig(path=tmp_path / "schedule.json", lag=60)
+    schedule = PollSchedule(config.path, config, clock=clock)
+
+    # irregular gaps of 2400s, 600s and 1800s
+    for dt in (5000, 7400, 8000, 9800):
+        schedule.observe("a", dt)
+    assert schedule.interval("a") == 600
+
+    # a provider going back in time does not shorten the interval
+    for dt in (9000, 9800, None):
+        schedule.observe("a", dt)
+    assert schedule.interval("a") == 600
+    assert schedule.next_poll("a") == 9800 + 600 + 60
+
+    # a gap shorter than the lower bound is clamped to it
+    schedule.observe("a", 9900)
+    assert schedule.interval("a") == config.min_interval
+
+
+def test_budget_polls_most_overdue_first(mocker, tmp_path):
+    """
+    Test that due locations are ordered by how long they are overdue and
+    that the budget is spent on the most overdue ones.
+    """
+    config = make_polling_config(tmp_path)
+    clock = FakeClock(1000.0)
+    schedule = PollSchedule(config.polling.path, config.polling, clock=clock)
+    for key, dt in (("c", 900), ("b", 950), ("a", 990)):
+        schedule.observe(key, dt)
+    schedule.save()
+
+    # every location is next expected 660s after its last observation
+    clock.now = 1600
+    assert [loc.key for loc in schedule.due(config.locations)] == ["c"]
+    clock.now = 2000
+    assert [loc.key for loc in schedule.due(config.locations)] == [
+        "c",
+        "b",
+        "a",
+    ]
+
+    mock_get = patch_api(mocker)
+    result = fetch_weather_batch(config=config)
+
+    assert mock_get.call_count == 2
+    assert sorted(result.payloads) == ["b", "c"]
+    assert result.deferred == ["a"]
@@ -0,0 +1,98 @@
+import pytest
+from etl_pipeline.config import WEATHER_FIELDS, FieldSpec
+from etl_pipeline.dedup import DedupIndex, add_records, filter_new_records
+from etl_pipeline.records import WeatherBatch
+from etl_pipeline.schema import DEFAULT_SCHEMA, compile_schema
+from etl_pipeline.transform import process_weather_batch
+
+from helpers import payload
+
+
+def test_batch_matches_line_and_table_transforms():
+    """
+    Test that a batch formats the same lines and builds the same table
+    as the line and table transforms, and yields slotted records.
+    """
+    payloads = [payload("a", 1), payload("b", 2), payload("a", 3)]
+
+    batch = WeatherBatch.from_payloads(payloads)
+
+    assert len(batch) == 3
+    assert list(batch.lines()) == [
+        DEFAULT_SCHEMA.format_line(p) for p in payloads
+    ]
+    assert batch.to_arrow().equals(process_weather_batch(payloads))
+    assert list(batch.keys()) == [("a", 1), ("b", 2), ("a", 3)]
+    record = batch[-1]
+    assert (record.location, record.dt, record.pressure) == ("a", 3, 1012)
+    assert not hasattr(record, "__dict__")
+    assert batch[0].location is batch[2].location
+
+
+def test_batch_formats_whole_numbers_like_line_transform():
+    """
+    Test that a whole number in a float field formats the same in batch
+    lines and payload lines.
+    """
+    payloads = [payload("a", 1, temp=20), payload("a", 2, temp="21.5")]
+
+    lines = list(WeatherBatch.from_payloads(payloads).lines())
+
+    assert lines == [DEFAULT_SCHEMA.format_line(p) for p in payloads]
+    assert lines[0].split(";")[3] == "20.0"
+    assert lines[1].split(";")[3] == "21.5"
+
+
+def test_batch_keeps_missing_values():
+    """
+    Test that missing optional values round-trip as null and empty CSV
+    values.
+    """
+    schema = compile_schema(
+        WEATHER_FIELDS
+        + (
+            FieldSpec(name="rain", path="rain.1h", type="float64"),
+            FieldSpec(name="gust", path="wind.gust", type="int16"),
+        )
+    )
+    payloads = [payload("a", 1), payload("a", 2, rain={"1h": 0.5})]
+
+    batch = WeatherBatch.from_payloads(payloads, schema)
+
+    assert list(batch.lines()) == [schema.format_line(p) for p in payloads]
+    assert batch.to_arrow().column("rain").to_pylist() == [None, 0.5]
+    assert batch.to_arrow().equals(process_weather_batch(payloads, schema))
+    assert [r.rain for r in batch] == [None, 0.5]
+
+
+def test_failed_append_leaves_batch_intact():
+    """
+    Test that a record with a value that does not fit its field is
+    rejected as a whole.
+    """
+    batch = WeatherBatch.from_payloads([payload("a", 1)])
+
+    with pytest.raises(OverflowError):
+        batch.append(("a", 2, "x", 1.0, 1 << 20, 1, 1.0, 1))
+    with pytest.raises(ValueError, match="invalid literal"):
+        batch.append(("a", 2, "x", 1.0, "many", 1, 1.0, 1))
+
+    assert len(batch) == 1
+    assert batch.to_arrow().num_rows == 1
+
+
+def test_filter_new_records(tmp_path):
+    """
+    Test that indexed and repeated keys are dropped from a batch.
+    """
+    batch = WeatherBatch.from_payloads(
+        [payload("a", 1), payload("b", 1), payload("b", 1), payload("a", 2)]
+    )
+
+    with DedupIndex(tmp_path / "index") as index:
+        index.add("a", 1)
+        new = filter_new_records(index, batch)
+        add_records(index, new)
+
+        assert list(new.keys()) == [("b", 1), ("a", 2)]
+        assert ("a", 2) in index
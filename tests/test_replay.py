@@ -0,0 +1,158 @@
+import json
+from datetime import UTC, datetime
+
+import pytest
+from etl_pipeline.aggregates import AggregateStore
+from etl_pipeline.archive import ArchiveEntry, RawArchive
+from etl_pipeline.columnar import read_weather_dataset
+from etl_pipeline.config import Config
+from etl_pipeline.dedup import DedupIndex
+from etl_pipeline.replay import plan_replay_chunks, run_replay
+from etl_pipeline.sink_index import SinkIndex
+from etl_pipeline.sqlite_sink import read_weather_sqlite
+
+from helpers import FakeClock, line, make_config, payload
+
+# 2024-01-01T00:00:00Z
+DAY = 1704067200
+
+# replay in small chunks over two workers
+REPLAY = {"workers": 2, "chunk_records": 2, "max_pending": 1}
+
+
+def fill_archive(config: Config, clock: FakeClock) -> None:
+    """Archive responses over three hours, one duplicate and one broken."""
+    with RawArchive(config.sink_path.parent / "archive", clock=clock) as a:
+        a.append([payload("a", DAY, 10.0), payload("b", DAY, 20.0)])
+        clock.now += 3600
+        a.append([payload("a", DAY + 3600, 30.0), {"name": "broken"}])
+        a.append([payload("a", DAY + 3600, 30.0)])
+        clock.now += 3600
+        a.append([payload("b", DAY + 7200, 40.0)])
+
+
+def test_plan_replay_chunks():
+    """
+    Test that entries are grouped without splitting them.
+    """
+    entries = [ArchiveEntry("s", 0, 1, n, 0) for n in (1, 3, 1, 1, 1)]
+
+    chunks = plan_replay_chunks(entries, chunk_records=2)
+
+    assert [[e.records for e in c] for c in chunks] == [[1, 3], [1, 1], [1]]
+
+
+def test_replay_rebuilds_csv_sink_and_indexes(tmp_path):
+    """
+    Test that the sink, dedup index, sink index and aggregates are
+    rebuilt from the archive in archive order and swapped in.
+    """
+    config = make_config(
+        tmp_path,
+        replay=REPLAY,
+        dedup_index_path=tmp_path / "dedup" / "index",
+        sink_index_path=tmp_path / "sink_index" / "index",
+        aggregates_path=tmp_path / "aggregates.sqlite",
+    )
+    config.sink_path.write_text(line("stale", 0))
+    fill_archive(config, FakeClock(DAY))
+
+    result = run_replay(config)
+
+    assert (result.payloads, result.records, result.skipped) == (6, 4, 1)
+    assert config.sink_path.read_text() == (
+        line("a", DAY, 10.0)
+        + line("b", DAY, 20.0)
+        + line("a", DAY + 3600, 30.0)
+        + line("b", DAY + 7200, 40.0)
+    )
+    assert not list(tmp_path.rglob("*.replay*"))
+    with DedupIndex(config.dedup_index_path) as index:
+        assert ("a", DAY + 3600) in index
+        assert ("stale", 0) not in index
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.covered == config.sink_path.stat().st_size
+    with AggregateStore(config.aggregates_path) as store:
+        day = store.get("a", "day", datetime.fromtimestamp(DAY, UTC), "temp")
+    assert (day.count, day.mean) == (2, 20.0)
+    with open(config.validation.quarantine_path) as f:
+        entries = [json.loads(entry) for entry in f]
+    assert [(e["source"], e["record"]) for e in entries] == [
+        ("replay", {"name": "broken"})
+    ]
+
+
+def test_replay_quarantines_invalid_values(tmp_path):
+    """
+    Test that a CSV replay checks the values of the records, but not
+    their order, like the table replay.
+    """
+    config = make_config(tmp_path, replay=REPLAY)
+    with RawArchive(config.sink_path.parent / "archive") as archive:
+        archive.append([payload("a", DAY + 3600), payload("z", DAY, -300.0)])
+        archive.append([payload("a", DAY)])
+
+    result = run_replay(config)
+
+    assert (result.records, result.skipped) == (2, 1)
+    assert config.sink_path.read_text() == (
+        line("a", DAY + 3600) + line("a", DAY)
+    )
+    with open(config.validation.quarantine_path) as f:
+        entries = [json.loads(entry) for entry in f]
+    assert [(e["source"], e["record"]["temp"]) for e in entries] == [
+        ("replay", -300.0)
+    ]
+
+
+def test_replay_rebuilds_parquet_sink(tmp_path):
+    """
+    Test that the partitioned dataset is rebuilt from the archive.
+    """
+    config = make_config(tmp_path, replay=REPLAY, sink_backend="parquet")
+    fill_archive(config, FakeClock(DAY))
+
+    result = run_replay(config)
+
+    table = read_weather_dataset(config.columnar.path, locations=["b"])
+    assert result.payloads == 6
+    assert sorted(table.column("temp").to_pylist()) == [20.0, 40.0]
+
+
+def test_replay_rebuilds_sqlite_sink(tmp_path):
+    """
+    Test that the SQLite database is rebuilt from the archive, with the
+    duplicate upserted once and the broken response dropped.
+    """
+    config = make_config(
+        tmp_path,
+        replay=REPLAY,
+        sink_backend="sqlite",
+        sqlite={"path": tmp_path / "weather.sqlite"},
+    )
+    fill_archive(config, FakeClock(DAY))
+
+    result = run_replay(config)
+
+    table = read_weather_sqlite(config.sqlite.path, columns=["temp"])
+    assert result.payloads == 6
+    assert table.column("temp").to_pylist() == [10.0, 30.0, 20.0, 40.0]
+    assert not list(tmp_path.glob("weather.sqlite.replay*"))
+
+
+def test_replay_range_into_processed_file(tmp_path):
+    """
+    Test that a time range of the archive can be replayed into the
+    processed file, but not into the sink.
+    """
+    config = make_config(tmp_path, replay=REPLAY)
+    fill_archive(config, FakeClock(DAY))
+    since = datetime.fromtimestamp(DAY + 3600, UTC)
+    until = datetime.fromtimestamp(DAY + 7200, UTC)
+
+    result = run_replay(config, target="processed", since=since, until=until)
+
+    assert result.records == 2
+    assert config.processed_path.read_text() == 2 * line("a", DAY + 3600, 30.0)
+    with pytest.raises(ValueError, match="full archive"):
+        run_replay(config, since=since)
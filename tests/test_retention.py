@@ -0,0 +1,100 @@
+import os
+
+from etl_pipeline.config import Config
+from etl_pipeline.retention import apply_retention
+
+from helpers import make_config
+
+# current time of the sweeps in seconds since the epoch
+NOW = 1_700_000_000.0
+
+
+def make_files(root, ages: dict[str, float], size: int = 10) -> None:
+    """Create files of `size` bytes aged in seconds relative to NOW."""
+    for name, age in ages.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        os.utime(path, (NOW - age, NOW - age))
+
+
+def make_retention_config(tmp_path, **retention) -> Config:
+    """Create a config sweeping tmp_path/runs."""
+    return make_config(
+        tmp_path, retention={"paths": [tmp_path / "runs"], **retention}
+    )
+
+
+def remaining(root) -> list[str]:
+    """List the files below root relative to it."""
+    return sorted(
+        str(path.relative_to(root))
+        for path in root.rglob("*")
+        if path.is_file()
+    )
+
+
+def test_retention_removes_files_by_age(tmp_path):
+    """
+    Test that files older than max_age are removed with the directories
+    they leave empty, and that lock files are kept.
+    """
+    root = tmp_path / "runs"
+    make_files(
+        root,
+        {"a/raw.json": 90_000, "a/sink.lock": 90_000, "b/raw.json": 60},
+    )
+    make_files(root, {"c/raw.json": 90_000, "c/processed.csv": 90_000})
+    config = make_retention_config(tmp_path, max_age=86400.0)
+
+    report = apply_retention(config, now=NOW)
+
+    assert remaining(root) == ["a/sink.lock", "b/raw.json"]
+    assert report.files_scanned == 4
+    assert report.files_removed == 3
+    assert report.bytes_reclaimed == 30
+    assert report.dirs_removed == 1
+    assert root.exists()
+
+
+def test_retention_removes_oldest_beyond_budgets(tmp_path):
+    """
+    Test that the oldest files are removed until the size and count
+    budgets are met, except files younger than min_age.
+    """
+    root = tmp_path / "runs"
+    ages = {f"{i}.csv": 1000.0 * (i + 1) for i in range(5)}
+    make_files(root, ages)
+
+    config = make_retention_config(tmp_path, max_age=None, max_bytes=35)
+    by_bytes = apply_retention(config, now=NOW, dry_run=True)
+    assert by_bytes.files_removed == 2
+    assert len(remaining(root)) == 5
+
+    report = apply_retention(
+        make_retention_config(
+            tmp_path, max_age=None, max_files=1, min_age=2500.0
+        ),
+        now=NOW,
+    )
+    assert report.files_removed == 3
+    assert remaining(root) == ["0.csv", "1.csv"]
+
+
+def test_retention_removes_old_empty_dirs(tmp_path):
+    """
+    Test that directories that were already empty are removed once they
+    are older than min_age, with the parents they leave empty.
+    """
+    root = tmp_path / "runs"
+    old, young = root / "a" / "old", root / "young"
+    for directory, age in ((old, 90_000), (young, 60)):
+        directory.mkdir(parents=True)
+        os.utime(directory, (NOW - age, NOW - age))
+    config = make_retention_config(tmp_path, max_age=86400.0, min_age=600.0)
+
+    assert apply_retention(config, now=NOW, dry_run=True).dirs_removed == 0
+    report = apply_retention(config, now=NOW)
+
+    assert report.dirs_removed == 2
+    assert sorted(p.name for p in root.iterdir()) == ["young"]
@@ -0,0 +1,118 @@
+import fcntl
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from etl_pipeline.cleanup import cleanup_weather_files
+from etl_pipeline.dedup import DedupIndex
+from etl_pipeline.load import save_weather_data
+from etl_pipeline.runs import (
+    run_config,
+    run_dir,
+    sink_lock,
+    sink_lock_path,
+    store_lock_paths,
+)
+from etl_pipeline.sink_index import SinkIndex
+
+from helpers import make_config
+
+
+def test_run_configs_are_isolated(tmp_path):
+    """
+    Test that runs get their own working files but share the sink.
+    """
+    config = make_config(tmp_path, runs_dir=tmp_path / "runs")
+
+    run_id = "scheduled__2024-01-01T00:00:00+00:00"
+    first = run_config(config, run_id)
+    second = run_config(config, "scheduled__2024-01-01T00:05:00+00:00")
+
+    assert first.raw_path.parent == run_dir(config, run_id)
+    assert run_dir(config, run_id).parent == config.runs_dir
+    assert ":" not in run_dir(config, run_id).name
+    for attr in ("raw_path", "raw_batch_path", "processed_path"):
+        assert getattr(first, attr) != getattr(second, attr)
+        assert getattr(first, attr).name == getattr(config, attr).name
+    assert first.sink_path == second.sink_path == config.sink_path
+
+
+def test_cleanup_removes_only_its_run(tmp_path):
+    """
+    Test that cleaning up a run removes its directory and leaves the
+    files of an overlapping run alone.
+    """
+    config = make_config(tmp_path, runs_dir=tmp_path / "runs")
+    runs = [run_config(config, run_id) for run_id in ("a", "b")]
+    for run in runs:
+        run.raw_path.parent.mkdir(parents=True)
+        run.raw_path.write_text("{}")
+        run.processed_path.write_text("a;1\n")
+
+    cleanup_weather_files(runs[0])
+
+    assert not run_dir(config, "a").exists()
+    assert runs[1].raw_path.exists()
+    assert runs[1].processed_path.exists()
+    assert config.runs_dir.exists()
+
+
+def test_overlapping_loads_are_serialized(tmp_path):
+    """
+    Test that runs loading into the sink at the same time leave the sink,
+    dedup index and sink index consistent.
+    """
+    config = make_config(
+        tmp_path,
+        runs_dir=tmp_path / "runs",
+        dedup_index_path=tmp_path / "dedup" / "index",
+        sink_index_path=tmp_path / "sink_index" / "index",
+        writer={"batch_records": 7},
+    )
+    runs = [run_config(config, f"run-{i}") for i in range(8)]
+    for i, run in enumerate(runs):
+        # every run shares half its records with the next one
+        run.processed_path.parent.mkdir(parents=True)
+        run.processed_path.write_text(
+            "".join(
+                f"loc;{dt};clear sky;20.0;1;50;5.0;1012\n"
+                for dt in range(i * 50, i * 50 + 100)
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=len(runs)) as executor:
+        list(executor.map(save_weather_data, runs))
+
+    lines = config.sink_path.read_text().splitlines()
+    dts = sorted(int(line.split(";")[1]) for line in lines)
+    assert dts == list(range(450))
+    assert sink_lock_path(config).exists()
+    with DedupIndex(config.dedup_index_path) as index:
+        assert ("loc", 449) in index
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.covered == config.sink_path.stat().st_size
+
+
+def test_sink_lock_covers_shared_stores(tmp_path):
+    """
+    Test that loads into different sink backends exclude each other on
+    the dedup index and aggregates they share.
+    """
+    csv = make_config(
+        tmp_path,
+        runs_dir=tmp_path / "runs",
+        dedup_index_path=tmp_path / "dedup" / "index",
+        aggregates_path=tmp_path / "aggregates.db",
+    )
+    sqlite = csv.model_copy(update={"sink_backend": "sqlite"})
+    assert sink_lock_path(csv) != sink_lock_path(sqlite)
+    assert store_lock_paths(csv) == store_lock_paths(sqlite)
+
+    with sink_lock(csv):
+        for path in store_lock_paths(sqlite):
+            fd = os.open(path, os.O_RDWR)
+            try:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.close(fd)
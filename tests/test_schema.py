@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from etl_pipeline.columnar import read_weather_dataset
+from etl_pipeline.config import WEATHER_FIELDS
+from etl_pipeline.load import save_weather_data
+from etl_pipeline.schema import compile_schema, parse_path, schema_for
+from etl_pipeline.transform import (
+    process_weather_batch,
+    process_weather_batch_data,
+    process_weather_data,
+)
+from pydantic import ValidationError
+
+from helpers import make_config
+
+PAYLOAD = {
+    "name": "Test City",
+    "dt": 1609459200,
+    "weather": [{"description": "clear sky"}],
+    "main": {
+        "temp": 20.0,
+        "feels_like": 19.5,
+        "humidity": 50,
+        "pressure": 1012,
+    },
+    "clouds": {"all": 1},
+    "wind": {"speed": 5.0},
+    "visibility": 10000,
+}
+
+# default fields plus optional ones that are not always in a payload
+EXTRA_FIELDS = [
+    *WEATHER_FIELDS,
+    {"name": "feels_like", "path": "main.feels_like", "type": "float64"},
+    {"name": "visibility", "path": "visibility", "type": "int32"},
+    {"name": "rain", "path": "rain.1h", "type": "float64", "default": 0.0},
+]
+
+
+def test_parse_path():
+    """
+    Test that paths are split into keys and list indices.
+    """
+    assert parse_path("weather[0].description") == (
+        "weather",
+        0,
+        "description",
+    )
+    assert parse_path("rain.1h") == ("rain", "1h")
+    for path in ("", "[0].a", "a..b", "a.", "a[x]"):
+        with pytest.raises(ValueError, match="Invalid field path"):
+            parse_path(path)
+
+
+def test_extra_fields_with_defaults(tmp_path):
+    """
+    Test that configured fields extend the CSV line, with defaults for
+    missing values and empty columns for missing values without one.
+    """
+    config = make_config(tmp_path, fields=EXTRA_FIELDS)
+    payload = {k: v for k, v in PAYLOAD.items() if k != "visibility"}
+    config.raw_path.write_text(json.dumps(payload))
+
+    process_weather_data(config=config)
+
+    assert config.processed_path.read_text() == (
+        "Test City;1609459200;clear sky;20.0;1;50;5.0;1012;19.5;;0.0\n"
+    )
+
+
+def test_line_and_batch_extraction_agree(tmp_path):
+    """
+    Test that the row-wise and the column-wise extraction produce the
+    same values.
+    """
+    config = make_config(tmp_path, fields=EXTRA_FIELDS)
+    schema = schema_for(config)
+    payloads = [PAYLOAD, PAYLOAD | {"rain": {"1h": 0.4}}]
+    config.raw_batch_path.write_text(
+        "".join(json.dumps(p) + "\n" for p in payloads)
+    )
+
+    table = process_weather_batch_data(config)
+
+    assert table.schema == schema.arrow
+    assert table.equals(process_weather_batch(payloads, schema))
+    assert table.column("rain").to_pylist() == [0.0, 0.4]
+    assert [schema.extract(p)[-3:] for p in payloads] == [
+        (19.5, 10000, 0.0),
+        (19.5, 10000, 0.4),
+    ]
+
+
+def test_required_field_missing_raises():
+    """
+    Test that a payload missing a required field is rejected.
+    """
+    schema = compile_schema(WEATHER_FIELDS)
+
+    with pytest.raises(KeyError):
+        schema.format_line({k: v for k, v in PAYLOAD.items() if k != "wind"})
+
+
+def test_custom_fields_drive_parquet_layout(tmp_path):
+    """
+    Test that the columnar sink stores the configured columns.
+    """
+    fields = [
+        *WEATHER_FIELDS[:2],
+        {"name": "temp", "path": "main.temp", "type": "float64"},
+        {"name": "visibility", "path": "visibility", "type": "int32"},
+    ]
+    config = make_config(tmp_path, fields=fields, sink_backend="parquet")
+    config.raw_path.write_text(json.dumps(PAYLOAD))
+
+    process_weather_data(config=config)
+    save_weather_data(config=config)
+
+    assert config.processed_path.read_text() == (
+        "Test City;1609459200;20.0;10000\n"
+    )
+    table = read_weather_dataset(
+        config.columnar.path, schema=schema_for(config)
+    )
+    assert table.column_names == [
+        "location",
+        "dt",
+        "temp",
+        "visibility",
+        "date",
+    ]
+    assert table.column("visibility").to_pylist() == [10000]
+
+
+def test_fields_must_start_with_key(tmp_path):
+    """
+    Test that the fields are rejected unless they start with the record
+    key and have unique names.
+    """
+    with pytest.raises(ValidationError, match="must start with"):
+        make_config(tmp_path, fields=list(reversed(WEATHER_FIELDS)))
+    with pytest.raises(ValidationError, match="unique"):
+        make_config(tmp_path, fields=[*WEATHER_FIELDS, WEATHER_FIELDS[-1]])
@@ -0,0 +1,145 @@
+import json
+
+import pytest
+from etl_pipeline.config import Config
+from etl_pipeline.shards import (
+    merge_shards,
+    plan_shards,
+    run_shard,
+    shard_config,
+    shard_of,
+)
+
+from helpers import FAKE_DT, Response, fake_api, make_config
+
+
+def make_shard_config(tmp_path) -> Config:
+    """Create a config with nine locations in three shards."""
+    return make_config(
+        tmp_path,
+        locations=[
+            {"name": f"l{i}", "latitude": float(i), "longitude": 0.0}
+            for i in range(1, 10)
+        ],
+        fetch={"max_retries": 0},
+        cache={"path": tmp_path / "cache.json"},
+        dedup_index_path=tmp_path / "dedup" / "index",
+        shards={"count": 3, "work_dir": tmp_path / "shards"},
+    )
+
+
+def test_shard_configs_are_isolated(tmp_path):
+    """
+    Test that every location is in exactly one shard and that shards
+    share no working file but the sink.
+    """
+    config = make_shard_config(tmp_path)
+    shards = plan_shards(config)
+    configs = [shard_config(config, shard) for shard in shards]
+
+    keys = [loc.key for cfg in configs for loc in cfg.locations]
+    assert sorted(keys) == sorted(loc.key for loc in config.locations)
+    for attr in ("raw_batch_path", "processed_path"):
+        assert len({getattr(cfg, attr) for cfg in configs}) == len(shards)
+    assert len({cfg.cache.path for cfg in configs}) == len(shards)
+    assert {cfg.sink_path for cfg in configs} == {config.sink_path}
+    for cfg, shard in zip(configs, shards, strict=True):
+        assert {shard_of(loc, 3) for loc in cfg.locations} == {shard}
+
+
+def test_shards_fan_in_to_sink(mocker, tmp_path):
+    """
+    Test that the shard outputs are merged into the sink once and that a
+    failing location does not stop its shard.
+    """
+    config = make_shard_config(tmp_path)
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api("9.0"),
+    )
+
+    results = [run_shard(config, shard) for shard in plan_shards(config)]
+    merged = merge_shards(config, plan_shards(config))
+
+    assert sum(r.records for r in results) == merged == 8
+    failures = {k: v for r in results for k, v in r.failures.items()}
+    assert failures == {"l9": "Error fetching data: 404 - Not Found"}
+    lines = config.sink_path.read_text().splitlines()
+    assert sorted(line.split(";")[0] for line in lines) == [
+        f"l{i}" for i in range(1, 9)
+    ]
+    assert merge_shards(config, plan_shards(config)) == 0
+
+
+def test_unmerged_shard_output_is_kept(mocker, tmp_path):
+    """
+    Test that a shard run appends to an output that was not merged yet
+    and that the merge loads both runs once.
+    """
+    config = make_shard_config(tmp_path)
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get",
+        side_effect=fake_api("9.0"),
+    )
+
+    first = run_shard(config, 0)
+    second = run_shard(config, 0)
+
+    processed = shard_config(config, 0).processed_path
+    lines = processed.read_text().splitlines()
+    assert first.records == second.records
+    assert len(lines) == first.records + second.records
+    assert merge_shards(config, [0]) == len(lines)
+    assert len(config.sink_path.read_text().splitlines()) == first.records
+
+
+def test_malformed_payload_is_quarantined(mocker, tmp_path):
+    """
+    Test that a malformed payload is quarantined instead of failing its
+    shard.
+    """
+    config = make_shard_config(tmp_path)
+    get = fake_api()
+
+    def malformed(url, timeout):
+        if "lat=1.0&" in url:
+            return Response(status_code=200, payload={"dt": FAKE_DT})
+        return get(url, timeout)
+
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get", side_effect=malformed
+    )
+    shard = shard_of(config.locations[0], 3)
+
+    result = run_shard(config, shard)
+
+    assert result.quarantined == 1
+    assert result.records == len(shard_config(config, shard).locations) - 1
+    quarantine = config.validation.quarantine_path.read_text().splitlines()
+    assert [json.loads(entry)["source"] for entry in quarantine] == ["shard"]
+
+
+def test_failed_shard_is_fetched_again(mocker, tmp_path):
+    """
+    Test that the response cache of a shard is saved only once its output
+    is written, so a failed run does not report its locations unchanged.
+    """
+    config = make_shard_config(tmp_path)
+    mocker.patch(
+        "etl_pipeline.extract.requests.Session.get", side_effect=fake_api()
+    )
+    shard_cfg = shard_config(config, 0)
+    transform = mocker.patch(
+        "etl_pipeline.shards.transform_weather_records",
+        side_effect=OSError("disk full"),
+    )
+
+    with pytest.raises(OSError, match="disk full"):
+        run_shard(config, 0)
+    assert not shard_cfg.cache.path.exists()
+
+    mocker.stop(transform)
+    result = run_shard(config, 0)
+    assert result.unchanged == []
+    assert result.records == len(shard_cfg.locations)
+    assert shard_cfg.cache.path.exists()
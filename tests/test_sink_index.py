@@ -0,0 +1,80 @@
+from datetime import UTC, datetime
+
+from etl_pipeline.load import append_weather_records, save_weather_data
+from etl_pipeline.sink_index import (
+    SinkIndex,
+    read_weather_range,
+    rebuild_sink_index,
+)
+
+from helpers import line, make_config
+
+# 2024-01-01T00:00:00Z
+DAY = 1704067200
+
+
+def test_save_updates_index_and_range_query(tmp_path):
+    """
+    Test that loads keep the index current and a range query returns the
+    lines of one location inside the range only.
+    """
+    config = make_config(tmp_path, sink_index_path=tmp_path / "index" / "sink")
+    batches = [
+        [line("a", DAY), line("b", DAY), line("a", DAY + 3600)],
+        [line("a", DAY + 7200), line("a", DAY + 86400)],
+    ]
+    for batch in batches:
+        config.processed_path.write_text("".join(batch))
+        save_weather_data(config=config)
+
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.covered == config.sink_path.stat().st_size
+        spans = index.spans("a", "2024-01-01")
+    assert len(spans) == 2
+
+    lines = list(
+        read_weather_range(
+            config.sink_path,
+            config.sink_index_path,
+            "a",
+            datetime.fromtimestamp(DAY + 3600, UTC),
+            datetime.fromtimestamp(DAY + 86400 + 1, UTC),
+        )
+    )
+    assert lines == [
+        line("a", DAY + 3600),
+        line("a", DAY + 7200),
+        line("a", DAY + 86400),
+    ]
+
+
+def test_index_catches_up_with_unindexed_appends(tmp_path):
+    """
+    Test that lines appended without the index are returned by a query
+    without writing the index, and that catching up and a rebuild yield
+    the same ranges.
+    """
+    config = make_config(tmp_path, sink_index_path=tmp_path / "index" / "sink")
+    append_weather_records(
+        config.sink_path, [line("a", DAY)], config.sink_index_path
+    )
+    append_weather_records(config.sink_path, [line("a", DAY + 60)])
+
+    lines = list(
+        read_weather_range(
+            config.sink_path,
+            config.sink_index_path,
+            "a",
+            datetime.fromtimestamp(DAY, UTC),
+            datetime.fromtimestamp(DAY + 86400, UTC),
+        )
+    )
+    assert lines == [line("a", DAY), line("a", DAY + 60)]
+
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.covered == len(line("a", DAY))
+        assert index.catch_up(config.sink_path) == 1
+        before = index.spans("a", "2024-01-01")
+    assert rebuild_sink_index(config.sink_index_path, config.sink_path) == 2
+    with SinkIndex(config.sink_index_path) as index:
+        assert index.spans("a", "2024-01-01") == before
@@ -0,0 +1,109 @@
+import sqlite3
+from contextlib import closing
+from datetime import UTC, date, datetime
+
+from etl_pipeline.aggregates import AggregateStore
+from etl_pipeline.load import save_weather_data
+from etl_pipeline.sqlite_sink import TABLE, read_weather_sqlite
+
+from helpers import line, make_config
+
+# 2024-01-01T00:00:00Z
+DAY = 1704067200
+
+
+def test_sqlite_sink_upserts_by_key(tmp_path):
+    """
+    Test that loading a record again replaces it instead of adding a
+    duplicate, and that the database is in WAL mode.
+    """
+    config = make_config(tmp_path, sink_backend="sqlite")
+    config.processed_path.write_text(line("a", DAY) + line("b", DAY))
+    save_weather_data(config)
+    config.processed_path.write_text(line("a", DAY, 30.0))
+    save_weather_data(config)
+
+    table = read_weather_sqlite(config.sqlite.path)
+
+    assert table.column("location").to_pylist() == ["a", "b"]
+    assert table.column("temp").to_pylist() == [30.0, 20.0]
+    assert table.schema.field("dt").type.tz == "UTC"
+    with closing(sqlite3.connect(config.sqlite.path)) as db:
+        assert db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert not config.sink_path.exists()
+
+
+def test_sqlite_sink_skips_indexed_duplicates(tmp_path):
+    """
+    Test that records in the dedup index are not written again, so the
+    first value is kept.
+    """
+    config = make_config(
+        tmp_path, sink_backend="sqlite", dedup_index_path=tmp_path / "index"
+    )
+    config.processed_path.write_text(line("a", DAY))
+    save_weather_data(config)
+    config.processed_path.write_text(line("a", DAY, 30.0))
+    save_weather_data(config)
+
+    table = read_weather_sqlite(config.sqlite.path, columns=["temp"])
+
+    assert table.column("temp").to_pylist() == [20.0]
+
+
+def test_sqlite_sink_aggregates_inserted_rows_only(tmp_path):
+    """
+    Test that a record replacing a stored key, or repeating one in its
+    batch, is not folded into the aggregates again.
+    """
+    config = make_config(
+        tmp_path,
+        sink_backend="sqlite",
+        aggregates_path=tmp_path / "agg.sqlite",
+    )
+    config.processed_path.write_text(line("a", DAY) + line("a", DAY))
+    save_weather_data(config)
+    save_weather_data(config)
+
+    at = datetime.fromtimestamp(DAY, UTC)
+    with AggregateStore(config.aggregates_path) as store:
+        assert store.get("a", "hour", at, "temp").count == 1
+
+
+def test_read_weather_sqlite_uses_indexes(tmp_path):
+    """
+    Test that location and day filters select the matching records and
+    are answered from the key and the time index.
+    """
+    config = make_config(tmp_path, sink_backend="sqlite")
+    config.processed_path.write_text(
+        "".join(
+            line(location, DAY + day * 86400)
+            for location in ("a", "b")
+            for day in range(3)
+        )
+    )
+    save_weather_data(config)
+
+    table = read_weather_sqlite(
+        config.sqlite.path,
+        columns=["location", "dt"],
+        locations=["b"],
+        start=date(2024, 1, 2),
+        end=date(2024, 1, 3),
+    )
+    empty = read_weather_sqlite(config.sqlite.path, locations=["c"])
+
+    assert table.column("location").to_pylist() == ["b", "b"]
+    assert [t.day for t in table.column("dt").to_pylist()] == [2, 3]
+    assert empty.num_rows == 0
+    with closing(sqlite3.connect(config.sqlite.path)) as db:
+        plans = [
+            db.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+            for query in (
+                f"SELECT * FROM {TABLE} WHERE location = 'a' AND dt > 0",
+                f"SELECT * FROM {TABLE} WHERE dt > 0",
+            )
+        ]
+    assert "PRIMARY KEY" in plans[0][0][3]
+    assert f"{TABLE}_dt" in plans[1][0][3]
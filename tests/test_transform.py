@@ -1,8 +1,14 @@
 import json
 
+import pyarrow as pa
 import pytest
+from etl_pipeline.columnar import WEATHER_SCHEMA
 from etl_pipeline.config import Config, SecretsConfig
-from etl_pipeline.transform import process_weather_data
+from etl_pipeline.transform import (
+    process_weather_batch,
+    process_weather_batch_data,
+    process_weather_data,
+)
 from pydantic import SecretStr
 
 
@@ -62,3 +68,68 @@ def test_successful_processing_new_file(tmp_path):
     assert processed_path.exists()
     expected_csv = "Test City;1609459200;clear sky;20.0;1;50;5.0;1012\n"
     assert processed_path.read_text() == expected_csv
+
+
+def test_batch_processing_matches_records(tmp_path):
+    """
+    Test that in-memory and JSONL batches produce the same typed table.
+    """
+    payloads = [
+        {
+            "name": f"City {i}",
+            "dt": 1609459200 + i,
+            "weather": [{"id": 800, "description": "clear sky"}],
+            "main": {"temp": 20 + i, "humidity": 50, "pressure": 1012},
+            "clouds": {"all": 1},
+            "wind": {"speed": 5.0, "deg": 90},
+            "visibility": 10000,
+        }
+        for i in range(3)
+    ]
+    raw_batch_path = tmp_path / "raw.jsonl"
+    raw_batch_path.write_text(
+        "".join(json.dumps(payload) + "\n" for payload in payloads)
+    )
+    config = Config(
+        secrets=SecretsConfig(api_key=SecretStr("x" * 32)),
+        raw_batch_path=raw_batch_path,
+    )
+
+    from_memory = process_weather_batch(payloads)
+    from_file = process_weather_batch_data(config=config)
+
+    assert from_memory.schema == WEATHER_SCHEMA
+    assert from_memory.equals(from_file)
+    assert from_memory.column("temp").to_pylist() == [20.0, 21.0, 22.0]
+    assert from_memory.column("description").to_pylist() == ["clear sky"] * 3
+
+
+def test_batch_processing_missing_fields_are_null():
+    """
+    Test that incomplete payloads yield nulls instead of raising.
+    """
+    table = process_weather_batch([{"name": "Broken", "weather": []}])
+
+    assert table.num_rows == 1
+    assert table.column("location").to_pylist() == ["Broken"]
+    assert table.column("description").to_pylist() == [None]
+    assert table.column("temp").to_pylist() == [None]
+
+
+def test_batch_processing_rejects_mistyped_payloads():
+    """
+    Test that a payload with a value of the wrong type is rejected with
+    its reason while the others are kept.
+    """
+    good = {"name": "Good", "dt": 1, "main": {"temp": 1.5}}
+    bad = {"name": "Bad", "dt": 2, "main": {"temp": "warm"}}
+    rejected = []
+
+    table = process_weather_batch([good, bad, good], rejected=rejected)
+
+    assert table.column("location").to_pylist() == ["Good", "Good"]
+    [(payload, [reason])] = rejected
+    assert payload == bad
+    assert reason.startswith("malformed payload: Arrow")
+    with pytest.raises(pa.ArrowInvalid):
+        process_weather_batch([good, bad])
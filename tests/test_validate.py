@@ -0,0 +1,165 @@
+import json
+from functools import partial
+
+from etl_pipeline import validate
+from etl_pipeline.config import Config
+from etl_pipeline.load import save_weather_data
+from etl_pipeline.schema import DEFAULT_SCHEMA
+from etl_pipeline.transform import process_weather_batch, process_weather_data
+from etl_pipeline.validate import filter_valid_rows, validate_weather_data
+
+from helpers import make_config, payload
+
+
+def read_quarantine(config: Config) -> list[dict]:
+    """Read the entries of the quarantine file."""
+    with open(config.validation.quarantine_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_validation_quarantines_bad_rows(tmp_path):
+    """
+    Test that rows with missing, mistyped, implausible or out-of-order
+    values are quarantined with their reasons and the rest are kept.
+    """
+    config = make_config(tmp_path)
+    good = [
+        "a;1700003600;clear sky;20.5;10;50;3.0;1012\n",
+        "b;1700000000;rain;-2.5;100;90;12.0;990\n",
+    ]
+    bad = [
+        "a;1700000000;clear sky;20.5;10;50;3.0;1012\n",
+        "b;1700003600;rain;-300;10;150;3.0;1012\n",
+        "c;1700000000;;x;10;50;3.0;1012\n",
+        "c;1700000000;rain;1.0;10;50;3.0\n",
+    ]
+    config.processed_path.write_text(
+        good[0] + bad[0] + bad[1] + good[1] + bad[2] + bad[3]
+    )
+
+    result = validate_weather_data(config)
+
+    assert config.processed_path.read_text() == "".join(good)
+    assert (result.records_in, result.records_out) == (6, 2)
+    assert result.quarantined == 4
+    reasons = {e["record"]: e["reasons"] for e in read_quarantine(config)}
+    assert reasons == {
+        bad[3].rstrip("\n"): ["malformed line: expected 8 fields"],
+        bad[0].rstrip("\n"): [
+            "dt: before an earlier observation of the location"
+        ],
+        bad[1].rstrip("\n"): ["temp: below -100", "humidity: above 100"],
+        bad[2].rstrip("\n"): [
+            "description: missing",
+            "temp: not a valid float64",
+        ],
+    }
+
+
+def test_validation_compares_with_loaded_observations(tmp_path):
+    """
+    Test that a record older than the latest loaded observation of its
+    location is quarantined in a later batch, while a repeated one is
+    left for deduplication.
+    """
+    config = make_config(tmp_path, dedup_index_path=tmp_path / "index")
+    loaded = "a;1700003600;clear sky;20.5;10;50;3.0;1012\n"
+    config.processed_path.write_text(loaded)
+    save_weather_data(config)
+
+    older = "a;1700000000;clear sky;20.5;10;50;3.0;1012\n"
+    other = "b;1700000000;clear sky;20.5;10;50;3.0;1012\n"
+    config.processed_path.write_text(older + loaded + other)
+    result = validate_weather_data(config)
+
+    assert result.quarantined == 1
+    assert config.processed_path.read_text() == loaded + other
+    [entry] = read_quarantine(config)
+    assert entry["record"] == older.rstrip("\n")
+
+
+def test_malformed_payload_is_quarantined(tmp_path):
+    """
+    Test that a payload missing a required field is quarantined instead
+    of failing the transform.
+    """
+    config = make_config(tmp_path)
+    broken = {"name": "Test City", "dt": 1609459200}
+    config.raw_path.write_text(json.dumps(broken))
+
+    process_weather_data(config=config)
+
+    assert config.processed_path.read_text() == ""
+    [entry] = read_quarantine(config)
+    assert entry["record"] == broken
+    assert entry["reasons"][0].startswith("malformed payload: KeyError")
+
+
+def test_validation_streams_blocks(tmp_path, monkeypatch):
+    """
+    Test that a file read in several blocks is validated as a whole: the
+    order check spans blocks and malformed lines of any block are kept.
+    """
+    config = make_config(tmp_path)
+    blocks = []
+    iter_small = partial(validate.iter_weather_strings, block_size=64)
+
+    def iter_strings(*args, **kwargs):
+        for table in iter_small(*args, **kwargs):
+            blocks.append(table.num_rows)
+            yield table
+
+    monkeypatch.setattr(validate, "iter_weather_strings", iter_strings)
+    good = [
+        "a;1700003600;clear sky;20.5;10;50;3.0;1012\n",
+        "b;1700000000;rain;-2.5;100;90;12.0;990\n",
+        "a;1700007200;clear sky;21.0;10;50;3.0;1012\n",
+    ]
+    bad = [
+        "a;1700000000;clear sky;20.5;10;50;3.0;1012\n",
+        "b;1700000000;rain;1.0;10;50;3.0\n",
+    ]
+    config.processed_path.write_text(
+        good[0] + good[1] + bad[0] + bad[1] + good[2]
+    )
+
+    result = validate_weather_data(config)
+
+    assert len(blocks) > 1
+    assert config.processed_path.read_text() == "".join(good)
+    assert (result.records_in, result.records_out) == (5, 3)
+    assert {e["record"] for e in read_quarantine(config)} == {
+        line.rstrip("\n") for line in bad
+    }
+
+
+def test_typed_rows_are_checked_like_lines():
+    """
+    Test that typed rows are checked for missing and implausible values,
+    with the order check optional, and rejected as JSON-safe records.
+    """
+    payloads = [
+        payload("a", 1700003600),
+        payload("a", 1700000000),
+        payload("b", 1700000000, -300.0),
+    ]
+    table = process_weather_batch(payloads, DEFAULT_SCHEMA)
+
+    rejected = []
+    valid = filter_valid_rows(table, rejected, monotonic=False)
+
+    assert valid.column("location").to_pylist() == ["a", "a"]
+    assert [(r["location"], r["dt"]) for r, _ in rejected] == [
+        ("b", 1700000000)
+    ]
+    assert [reasons for _, reasons in rejected] == [["temp: below -100"]]
+    json.dumps(rejected)
+
+    rejected = []
+    valid = filter_valid_rows(table, rejected)
+
+    assert valid.num_rows == 1
+    assert [reasons for _, reasons in rejected] == [
+        ["dt: before an earlier observation of the location"],
+        ["temp: below -100"],
+    ]
@@ -0,0 +1,160 @@
+import errno
+import os
+
+import pytest
+from etl_pipeline.config import WriterConfig
+from etl_pipeline.writer import (
+    SinkWriter,
+    append_file,
+    recover_sink,
+    segments_dir,
+    write_segment,
+)
+
+from helpers import FakeClock
+
+
+def lines(stop: int, start: int = 0) -> list[str]:
+    """Build distinct sink lines."""
+    return [
+        f"a;{i};clear sky;20.0;1;50;5.0;1012\n" for i in range(start, stop)
+    ]
+
+
+@pytest.mark.parametrize("durability", ["append", "fsync", "segments"])
+def test_writer_commits_in_groups(tmp_path, mocker, durability):
+    """
+    Test that lines are committed once per group with the configured
+    durability mode and all end up in the sink in order.
+    """
+    sink_path = tmp_path / "data.csv"
+    fsync = mocker.spy(os, "fsync")
+    config = WriterConfig(durability=durability, batch_records=3, max_age=60)
+
+    with SinkWriter(sink_path, config, clock=FakeClock()) as writer:
+        for line in lines(7):
+            writer.write(line)
+        assert writer.commits == 2
+        if durability == "segments":
+            assert len(list(segments_dir(sink_path).glob("*.csv"))) == 2
+
+    assert writer.commits == 3
+    assert sink_path.read_text() == "".join(lines(7))
+    assert not list(segments_dir(sink_path).glob("*"))
+    if durability == "append":
+        fsync.assert_not_called()
+    else:
+        assert fsync.call_count >= 3
+
+
+def test_writer_commits_by_age(tmp_path):
+    """
+    Test that a group is committed once its oldest line is too old.
+    """
+    clock = FakeClock()
+    config = WriterConfig(batch_records=100, max_age=1.0)
+
+    with SinkWriter(tmp_path / "data.csv", config, clock=clock) as writer:
+        writer.write(lines(1)[0])
+        clock.now = 0.5
+        writer.write(lines(2, 1)[0])
+        assert writer.commits == 0
+        clock.now = 1.0
+        writer.write(lines(3, 2)[0])
+        assert writer.commits == 1
+
+
+def test_recover_sink_after_crash(tmp_path):
+    """
+    Test that recovery removes a torn line, rolls back and redoes an
+    interrupted fold and drops uncommitted segments.
+    """
+    sink_path = tmp_path / "data.csv"
+    sink_path.write_text("".join(lines(2)))
+    offset = sink_path.stat().st_size
+
+    # a fold that appended half of its segment before the crash
+    segment = write_segment(sink_path, "".join(lines(4, 2)).encode())
+    folding = segment.with_suffix(f".folding-{offset}")
+    segment.rename(folding)
+    with open(sink_path, "a") as f:
+        f.write("".join(lines(4, 2))[:50])
+
+    # a segment that was never renamed into place
+    (segments_dir(sink_path) / "uncommitted.tmp").write_text(lines(5, 4)[0])
+
+    recover_sink(sink_path)
+
+    assert sink_path.read_text() == "".join(lines(4))
+    assert not list(segments_dir(sink_path).glob("*"))
+
+
+def test_recover_sink_truncates_torn_tail(tmp_path):
+    """
+    Test that a partial last line is cut off when the writer opens.
+    """
+    sink_path = tmp_path / "data.csv"
+    sink_path.write_text("".join(lines(2)) + "a;2;clear")
+
+    with SinkWriter(sink_path) as writer:
+        writer.write(lines(3, 2)[0])
+
+    assert sink_path.read_text() == "".join(lines(3))
+
+
+@pytest.mark.parametrize("durability", ["append", "fsync", "segments"])
+def test_writer_appends_files(tmp_path, durability):
+    """
+    Test that a file is committed after the buffered lines in every
+    durability mode.
+    """
+    sink_path = tmp_path / "data.csv"
+    source = tmp_path / "processed.csv"
+    source.write_text("".join(lines(5, 2)))
+    config = WriterConfig(durability=durability, max_age=60)
+
+    with SinkWriter(sink_path, config, clock=FakeClock()) as writer:
+        for line in lines(2):
+            writer.write(line)
+        assert writer.append_file(source) == source.stat().st_size
+
+    assert sink_path.read_text() == "".join(lines(5))
+
+
+@pytest.mark.parametrize("durability", ["append", "fsync", "segments"])
+def test_appended_file_keeps_its_last_line(tmp_path, durability):
+    """
+    Test that a file whose last line lacks a newline is committed with
+    one, so recovering the sink keeps that line.
+    """
+    sink_path = tmp_path / "data.csv"
+    source = tmp_path / "processed.csv"
+    source.write_text("".join(lines(2)).rstrip("\n"))
+    config = WriterConfig(durability=durability)
+
+    with SinkWriter(sink_path, config, clock=FakeClock()) as writer:
+        assert writer.append_file(source) == source.stat().st_size + 1
+    with SinkWriter(sink_path, config, clock=FakeClock()) as writer:
+        writer.write(lines(3, 2)[0])
+
+    assert sink_path.read_text() == "".join(lines(3))
+
+
+@pytest.mark.parametrize("unsupported", ["copy_file_range", "sendfile"])
+def test_append_file_falls_back(tmp_path, mocker, unsupported):
+    """
+    Test that a file is copied by the next method if a kernel-side copy
+    is not supported between the files.
+    """
+    sink_path = tmp_path / "data.csv"
+    sink_path.write_text("".join(lines(1)))
+    source = tmp_path / "processed.csv"
+    source.write_text("".join(lines(4, 1)))
+    error = OSError(errno.EXDEV, "cross-device copy")
+    mocker.patch("os.copy_file_range", side_effect=error, create=True)
+    if unsupported == "sendfile":
+        mocker.patch("os.sendfile", side_effect=error)
+
+    append_file(sink_path, source, sync=False)
+
+    assert sink_path.read_text() == "".join(lines(4))